@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+"""
+Functions to save and restore the state of a vtkCamera as a fixed
+length numpy array, and a class to record and replay sequences of
+camera states, e.g. to reproduce a surgical session.
+
+The layout of the array is given by CAMERA_STATE_LAYOUT, i.e.
+Position (3), FocalPoint (3), ViewUp (3), ViewAngle, ParallelProjection,
+ParallelScale, ClippingRange (2), EyeAngle, EyeSeparation,
+UseOffAxisProjection.
+"""
+
+import time
+import numpy as np
+import vtk
+
+CAMERA_STATE_LAYOUT = [("Position", 3),
+                       ("FocalPoint", 3),
+                       ("ViewUp", 3),
+                       ("ViewAngle", 1),
+                       ("ParallelProjection", 1),
+                       ("ParallelScale", 1),
+                       ("ClippingRange", 2),
+                       ("EyeAngle", 1),
+                       ("EyeSeparation", 1),
+                       ("UseOffAxisProjection", 1)]
+
+CAMERA_STATE_SIZE = 17
+
+
+def _validate_camera(vtk_camera):
+    """
+    Checks that vtk_camera is a vtkCamera.
+
+    :raises TypeError:
+    """
+    if not isinstance(vtk_camera, vtk.vtkCamera):
+        raise TypeError('Invalid camera object passed')
+
+
+def get_camera_state_array(vtk_camera, output=None):
+    """
+    Returns the state of a vtkCamera as a 1D numpy array of
+    CAMERA_STATE_SIZE floats.
+
+    :param vtk_camera: vtkCamera
+    :param output: optional pre-allocated float array to fill in
+    :return: 1D numpy ndarray
+    """
+    _validate_camera(vtk_camera)
+
+    if output is None:
+        output = np.zeros(CAMERA_STATE_SIZE)
+    elif output.shape != (CAMERA_STATE_SIZE,):
+        raise ValueError('Output should have shape ('
+                         + str(CAMERA_STATE_SIZE) + ',)')
+
+    output[0:3] = vtk_camera.GetPosition()
+    output[3:6] = vtk_camera.GetFocalPoint()
+    output[6:9] = vtk_camera.GetViewUp()
+    output[9] = vtk_camera.GetViewAngle()
+    output[10] = vtk_camera.GetParallelProjection()
+    output[11] = vtk_camera.GetParallelScale()
+    output[12:14] = vtk_camera.GetClippingRange()
+    output[14] = vtk_camera.GetEyeAngle()
+    output[15] = vtk_camera.GetEyeSeparation()
+    output[16] = vtk_camera.GetUseOffAxisProjection()
+    return output
+
+
+def set_camera_state_array(vtk_camera, state):
+    """
+    Restores the state of a vtkCamera from an array
+    created by get_camera_state_array.
+
+    :param vtk_camera: vtkCamera
+    :param state: 1D array of CAMERA_STATE_SIZE floats
+    """
+    _validate_camera(vtk_camera)
+
+    if len(state) != CAMERA_STATE_SIZE:
+        raise ValueError('State should have '
+                         + str(CAMERA_STATE_SIZE) + ' elements')
+
+    vtk_camera.SetPosition(state[0], state[1], state[2])
+    vtk_camera.SetFocalPoint(state[3], state[4], state[5])
+    vtk_camera.SetViewUp(state[6], state[7], state[8])
+    vtk_camera.SetViewAngle(state[9])
+    vtk_camera.SetParallelProjection(int(state[10]))
+    vtk_camera.SetParallelScale(state[11])
+    vtk_camera.SetClippingRange(state[12], state[13])
+    vtk_camera.SetEyeAngle(state[14])
+    vtk_camera.SetEyeSeparation(state[15])
+    vtk_camera.SetUseOffAxisProjection(int(state[16]))
+
+
+class CameraStateRecorder:
+    """
+    Records a sequence of camera states, with timestamps, into
+    a contiguous numpy array, which can be saved, loaded and replayed.
+
+    :param capacity: initial number of states to allocate space for.
+    """
+    def __init__(self, capacity=1000):
+        if capacity < 1:
+            raise ValueError('Capacity should be >= 1')
+
+        self.states = np.zeros((int(capacity), CAMERA_STATE_SIZE))
+        self.timestamps = np.zeros(int(capacity))
+        self.number_of_states = 0
+
+    def __len__(self):
+        return self.number_of_states
+
+    def record(self, vtk_camera, timestamp=None):
+        """
+        Appends the current state of vtk_camera.
+
+        :param vtk_camera: vtkCamera
+        :param timestamp: seconds, defaults to time.time()
+        """
+        if self.number_of_states == self.states.shape[0]:
+            self.states = np.concatenate((self.states,
+                                          np.zeros_like(self.states)))
+            self.timestamps = np.concatenate((self.timestamps,
+                                              np.zeros_like(self.timestamps)))
+
+        get_camera_state_array(vtk_camera,
+                               self.states[self.number_of_states])
+
+        if timestamp is None:
+            timestamp = time.time()
+        self.timestamps[self.number_of_states] = timestamp
+        self.number_of_states += 1
+
+    def clear(self):
+        """
+        Discards all recorded states, keeping the allocated memory.
+        """
+        self.number_of_states = 0
+
+    def get_states(self):
+        """
+        Returns the recorded states.
+
+        :return: [N x CAMERA_STATE_SIZE] numpy ndarray (a view, not a copy)
+        """
+        return self.states[:self.number_of_states]
+
+    def get_timestamps(self):
+        """
+        Returns the recorded timestamps.
+
+        :return: [N] numpy ndarray (a view, not a copy)
+        """
+        return self.timestamps[:self.number_of_states]
+
+    def apply(self, vtk_camera, index):
+        """
+        Sets vtk_camera to the recorded state at index.
+
+        :param vtk_camera: vtkCamera
+        :param index: index of recorded state
+        """
+        if index < 0 or index >= self.number_of_states:
+            raise IndexError('Camera state index out of range:' + str(index))
+        set_camera_state_array(vtk_camera, self.states[index])
+
+    def replay(self, vtk_camera):
+        """
+        Generator that applies each recorded state in turn to vtk_camera,
+        yielding the index and timestamp, so the caller can render.
+
+        :param vtk_camera: vtkCamera
+        """
+        for index in range(self.number_of_states):
+            set_camera_state_array(vtk_camera, self.states[index])
+            yield index, self.timestamps[index]
+
+    def save(self, file_name):
+        """
+        Saves the recorded states and timestamps to a .npz file.
+
+        :param file_name: file name
+        """
+        np.savez(file_name,
+                 states=self.get_states(),
+                 timestamps=self.get_timestamps())
+
+    def load(self, file_name):
+        """
+        Replaces the recorded states with those from a .npz file
+        written by save().
+
+        :param file_name: file name
+        """
+        with np.load(file_name) as data:
+            states = data['states']
+            timestamps = data['timestamps']
+
+        # An empty recording may not keep its shape.
+        if states.size == 0:
+            states = states.reshape(0, CAMERA_STATE_SIZE)
+            timestamps = timestamps.reshape(0)
+
+        if states.ndim != 2 or states.shape[1] != CAMERA_STATE_SIZE:
+            raise ValueError('Invalid camera states in:' + str(file_name))
+
+        # Allocate at least one state, so record() can grow the arrays.
+        number_of_states = states.shape[0]
+        self.states = np.zeros((max(number_of_states, 1), CAMERA_STATE_SIZE))
+        self.timestamps = np.zeros(max(number_of_states, 1))
+        self.states[:number_of_states] = states
+        self.timestamps[:number_of_states] = timestamps
+        self.number_of_states = number_of_states
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+"""
+On-disk cache of surface models, after normals have been computed,
+so that loading a large mesh a second time skips parsing the original
+file, and skips vtkPolyDataNormals.
+
+Expected usage:
+
+::
+
+    cache = MeshCache('~/.cache/sksurgeryvtk', max_size_bytes=2 * 1024**3)
+    loader = SurfaceModelLoader(config_data, mesh_cache=cache)
+"""
+
+import os
+import json
+import glob
+import hashlib
+import tempfile
+import vtk
+import sksurgerycore.utilities.validate_file as vf
+import sksurgeryvtk.models.vtk_surface_model as sm
+import sksurgeryvtk.models.parallel_model_reader as pmr
+
+
+def get_normals_options():
+    """
+    Returns the settings of the filter from
+    vtk_surface_model.create_normals_filter(). These form part of each
+    cache key, so changing that filter invalidates the cache.
+
+    :return: dictionary of setting name to value
+    """
+    normals = sm.create_normals_filter()
+    return {'feature_angle': normals.GetFeatureAngle(),
+            'splitting': normals.GetSplitting(),
+            'consistency': normals.GetConsistency(),
+            'auto_orient_normals': normals.GetAutoOrientNormals(),
+            'flip_normals': normals.GetFlipNormals(),
+            'non_manifold_traversal': normals.GetNonManifoldTraversal(),
+            'compute_point_normals': normals.GetComputePointNormals(),
+            'compute_cell_normals': normals.GetComputeCellNormals()}
+
+
+class MeshCache:
+    """
+    Stores polydata as uncompressed, binary, .vtp files, named by a hash of
+    the source file's absolute path, modification time and size, and the
+    options used to process it. Editing the source file therefore
+    changes the key, so stale entries are never returned.
+
+    When the cache grows beyond max_size_bytes, the least recently used
+    entries are deleted. Each entry's file modification time records when
+    it was last used.
+
+    Writes go to a temporary file that is then renamed, so several
+    processes, e.g. from parallel_model_reader, can share one cache.
+
+    :param cache_dir: directory to store the cache, created if necessary
+    :param max_size_bytes: maximum total size of cached files
+    """
+    def __init__(self, cache_dir, max_size_bytes=1024 ** 3):
+        if max_size_bytes < 0:
+            raise ValueError('max_size_bytes should be >= 0')
+
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_size_bytes = max_size_bytes
+        self.normals_options = get_normals_options()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_cache_file(self, file_name, options=None):
+        """
+        Returns the cache file name for a source file.
+
+        :param file_name: source model file
+        :param options: optional JSON serialisable dictionary, of any
+            other options that affect the processed polydata
+        :return: path of the cache file, which may not exist
+        """
+        all_options = dict(self.normals_options)
+        if options is not None:
+            all_options.update(options)
+
+        status = os.stat(file_name)
+        key = json.dumps([os.path.abspath(file_name),
+                          status.st_mtime_ns,
+                          status.st_size,
+                          all_options], sort_keys=True)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest + '.vtp')
+
+    def load(self, file_name, options=None):
+        """
+        Returns the cached polydata for a source file, if present.
+
+        :param file_name: source model file
+        :param options: as for get_cache_file()
+        :return: vtkPolyData, or None if not cached
+        """
+        cache_file = self.get_cache_file(file_name, options)
+        if not os.path.isfile(cache_file):
+            return None
+
+        reader = vtk.vtkXMLPolyDataReader()
+        reader.SetFileName(cache_file)
+        reader.Update()
+        if reader.GetErrorCode() != 0:
+            return None
+
+        # Mark as recently used.
+        try:
+            os.utime(cache_file)
+        except OSError:
+            pass
+        return reader.GetOutput()
+
+    def save(self, file_name, polydata, options=None):
+        """
+        Stores polydata for a source file, then evicts the least
+        recently used entries if the cache is too big.
+
+        :param file_name: source model file
+        :param polydata: vtkPolyData to store
+        :param options: as for get_cache_file()
+        """
+        cache_file = self.get_cache_file(file_name, options)
+
+        handle, temporary_file = tempfile.mkstemp(suffix='.vtp',
+                                                  dir=self.cache_dir)
+        os.close(handle)
+        try:
+            writer = vtk.vtkXMLPolyDataWriter()
+            writer.SetFileName(temporary_file)
+            writer.SetInputData(polydata)
+            writer.SetDataModeToAppended()
+            writer.EncodeAppendedDataOff()
+            writer.SetCompressorTypeToNone()
+            if writer.Write() != 1:
+                raise IOError('Failed to write:' + temporary_file)
+            os.replace(temporary_file, cache_file)
+        finally:
+            if os.path.exists(temporary_file):
+                os.remove(temporary_file)
+
+        self.evict()
+
+    def read_polydata_with_normals(self, file_name):
+        """
+        Returns polydata for a model file, with normals, from the cache
+        if possible, otherwise reading it, and storing it in the cache.
+
+        :param file_name: .vtk, .stl, .ply or .vtp file
+        :return: vtkPolyData
+        :raises: ValueError if the file doesn't exist or isn't a supported type
+        """
+        vf.validate_is_file(file_name)
+
+        polydata = self.load(file_name)
+        if polydata is None:
+            polydata = pmr.read_polydata_with_normals(file_name)
+            self.save(file_name, polydata)
+        return polydata
+
+    def get_size(self):
+        """
+        Returns the total size of the cached files, in bytes.
+        """
+        return sum(os.path.getsize(cache_file)
+                   for cache_file in self.__get_cache_files())
+
+    def __get_cache_files(self):
+        """
+        Returns all cache files, excluding temporary files being written.
+        """
+        return [cache_file for cache_file
+                in glob.glob(os.path.join(self.cache_dir, '*.vtp'))
+                if not os.path.basename(cache_file).startswith('tmp')]
+
+    def evict(self):
+        """
+        Deletes the least recently used entries, until the
+        cache is no bigger than max_size_bytes.
+        """
+        entries = []
+        for cache_file in self.__get_cache_files():
+            try:
+                status = os.stat(cache_file)
+            except OSError:
+                continue
+            entries.append((status.st_mtime, status.st_size, cache_file))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, cache_file in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(cache_file)
+            except OSError:
+                pass
+            total_size -= size
+
+    def clear(self):
+        """
+        Deletes all cache files.
+        """
+        for cache_file in self.__get_cache_files():
+            try:
+                os.remove(cache_file)
+            except OSError:
+                pass
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""
+Reads surface model files in parallel worker processes, returning
+vtkPolyData, with normals, ready to pass to VTKSurfaceModel.
+
+Expected usage:
+
+::
+
+    results = read_polydata_files(file_names, number_of_workers=8)
+    for file_name in file_names:
+        polydata, seconds = results[file_name]
+        model = VTKSurfaceModel(file_name, colour, polydata=polydata)
+
+Each worker reads a file and, if it has no normals, runs the same
+vtkPolyDataNormals filter as VTKSurfaceModel, then returns the result to
+the calling process as a binary string, using vtkCommunicator's marshalling.
+"""
+
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+import sksurgeryvtk.models.vtk_surface_model as sm
+
+
+def read_polydata_with_normals(file_name):
+    """
+    Reads a surface model file, adding normals if there are none.
+
+    :param file_name: .vtk, .stl, .ply or .vtp file
+    :return: vtkPolyData
+    :raises: ValueError if the file doesn't exist or isn't a supported type
+    """
+    reader = sm.create_reader(file_name)
+    reader.Update()
+    polydata = reader.GetOutput()
+
+    if polydata.GetPointData().GetNormals() is None:
+        normals = sm.create_normals_filter()
+        normals.SetInputData(polydata)
+        normals.Update()
+        polydata = normals.GetOutput()
+
+    return polydata
+
+
+def marshal_polydata(polydata):
+    """
+    Serialises a vtkPolyData to bytes.
+
+    :param polydata: vtkPolyData
+    :return: bytes
+    """
+    array = vtk.vtkCharArray()
+    vtk.vtkCommunicator.MarshalDataObject(polydata, array)
+    return numpy_support.vtk_to_numpy(array).tobytes()
+
+
+def unmarshal_polydata(data):
+    """
+    De-serialises bytes from marshal_polydata() to a vtkPolyData.
+
+    :param data: bytes
+    :return: vtkPolyData
+    """
+    array = vtk.vtkCharArray()
+    array.SetNumberOfTuples(len(data))
+    numpy_support.vtk_to_numpy(array)[:] = np.frombuffer(data, dtype=np.int8)
+    polydata = vtk.vtkPolyData()
+    vtk.vtkCommunicator.UnMarshalDataObject(array, polydata)
+    return polydata
+
+
+def _read_in_worker(file_name, mesh_cache):
+    """
+    Runs in a worker process.
+
+    :return: (marshalled vtkPolyData, seconds taken)
+    """
+    start = time.perf_counter()
+    if mesh_cache is not None:
+        polydata = mesh_cache.read_polydata_with_normals(file_name)
+    else:
+        polydata = read_polydata_with_normals(file_name)
+    data = marshal_polydata(polydata)
+    return data, time.perf_counter() - start
+
+
+def read_polydata_files(file_names, number_of_workers,
+                        progress_callback=None, mesh_cache=None):
+    """
+    Reads each file in a pool of worker processes, started with the
+    'spawn' method, as for VTKRenderPool.
+
+    If a file fails to read, its result is the exception instead of a
+    vtkPolyData, so the caller can decide whether that is an error, e.g.
+    VTKSurfaceModelDirectoryLoader skips files that raise ValueError.
+
+    :param file_names: list of file names, duplicates are only read once
+    :param number_of_workers: number of processes
+    :param progress_callback: optional function, called in this process as
+        each file finishes, as progress_callback(number_done, total,
+        file_name)
+    :param mesh_cache: optional MeshCache, used by each worker
+    :return: dictionary of file name to (vtkPolyData or Exception, seconds)
+    """
+    if number_of_workers < 1:
+        raise ValueError('number_of_workers should be >= 1')
+
+    unique_names = list(dict.fromkeys(file_names))
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=number_of_workers,
+                             mp_context=context) as executor:
+        futures = {executor.submit(_read_in_worker, file_name, mesh_cache):
+                   file_name for file_name in unique_names}
+        for number_done, future in enumerate(as_completed(futures), 1):
+            file_name = futures[future]
+            # pylint: disable=broad-except
+            try:
+                data, seconds = future.result()
+                start = time.perf_counter()
+                polydata = unmarshal_polydata(data)
+                results[file_name] = \
+                    (polydata, seconds + time.perf_counter() - start)
+            except Exception as error:
+                results[file_name] = (error, 0.0)
+            if progress_callback is not None:
+                progress_callback(number_done, len(unique_names), file_name)
+
+    return results
@@ -4,12 +4,14 @@
 Module to load VTK surfaces using dictionary from ConfigurationManager.
 """
 
-# pylint: disable=too-many-branches
+# pylint: disable=too-many-branches, too-many-locals
 
 import logging
 import os
+import time
 import vtk
 import sksurgeryvtk.models.vtk_surface_model as sm
+import sksurgeryvtk.models.parallel_model_reader as pmr
 
 LOGGER = logging.getLogger(__name__)
 
@@ -45,30 +47,83 @@ class SurfaceModelLoader:
         }
 
     """
-    def __init__(self, data, directory_prefix=None):
+    # pylint: disable=too-many-arguments
+    def __init__(self, data, directory_prefix=None, number_of_workers=1,
+                 progress_callback=None, mesh_cache=None):
         """
         Loads surface models and (optionally) assemblies from
         dictionary loaded by sksurgerycore.ConfigurationManager.
 
+        If number_of_workers > 1, the files are read, and normals computed,
+        in that many worker processes, see parallel_model_reader, and
+        the models are then assembled in this process.
+
         :param data: data from sksurgerycore.ConfigurationManager
         :param prefix: directory name prefix as string
+        :param number_of_workers: number of processes to read files with
+        :param progress_callback: optional function, called as
+            progress_callback(number_done, total, surface_name) as each
+            surface is read
+        :param mesh_cache: optional MeshCache, to store each model after
+            reading and computing normals, and re-use it next time
         """
         self.named_assemblies = {}
         self.named_surfaces = {}
+        self.load_times = {}
         self.directory_prefix = directory_prefix
+        self.mesh_cache = mesh_cache
 
         if 'surfaces' in data.keys():
             surfaces = data['surfaces']
         else:
             raise KeyError("No 'surfaces' section defined in config")
 
+        # Read files in parallel, if requested.
+        read_results = {}
+        if number_of_workers > 1:
+            # Several surfaces may share a file, which is only read once.
+            file_names = {}
+            for surface_name in surfaces:
+                file_name = self.__get_file_name(surfaces[surface_name])
+                file_names.setdefault(file_name, []).append(surface_name)
+            surfaces_read = []
+
+            def on_read(number_done, total, file_name):
+                # pylint: disable=unused-argument
+                for surface_name in file_names[file_name]:
+                    surfaces_read.append(surface_name)
+                    progress_callback(len(surfaces_read), len(surfaces),
+                                      surface_name)
+
+            read_results = pmr.read_polydata_files(
+                list(file_names.keys()), number_of_workers,
+                on_read if progress_callback is not None else None,
+                self.mesh_cache)
+
         # Load surfaces
-        for surface_name in surfaces:
+        for number_done, surface_name in enumerate(surfaces, 1):
             config = surfaces[surface_name]
-            surface = self.__load_surface(config)
+            start = time.perf_counter()
+
+            read_seconds = 0.0
+            polydata = None
+            if read_results:
+                polydata, read_seconds = \
+                    read_results[self.__get_file_name(config)]
+                if isinstance(polydata, Exception):
+                    raise polydata
+
+            surface = self.__load_surface(config, polydata)
             surface.set_name(surface_name)
             self.named_surfaces[surface_name] = surface
 
+            self.load_times[surface_name] = \
+                read_seconds + time.perf_counter() - start
+            LOGGER.info("Loaded surface: %s in %.3f seconds",
+                        surface_name, self.load_times[surface_name])
+            if progress_callback is not None and not read_results:
+                progress_callback(number_done, len(surfaces), surface_name)
+
         if 'assemblies' in data.keys():
             assemblies = data['assemblies']
             self.__check_assembly_duplicates(assemblies)
@@ -95,13 +150,24 @@ class SurfaceModelLoader:
 
                 self.named_assemblies[assembly] = new_assembly
 
-    def __load_surface(self, config):
-
+    def __get_file_name(self, config):
+        """
+        Returns the model file name from a surface's config,
+        including any directory prefix.
+        """
         if 'file' in config.keys():
             file_name = config['file']
         else:
             raise KeyError("No 'file' section defined in config")
 
+        if self.directory_prefix is not None:
+            file_name = os.path.join(self.directory_prefix, file_name)
+        return file_name
+
+    def __load_surface(self, config, polydata=None):
+
+        file_name = self.__get_file_name(config)
+
         if 'opacity' in config.keys():
             opacity = config['opacity']
         else:
@@ -127,15 +193,15 @@ class SurfaceModelLoader:
                            colour[2] / 255.0
                            ]
 
-        tmp_name = file_name
-        if self.directory_prefix is not None:
-            tmp_name = os.path.join(self.directory_prefix, tmp_name)
+        if polydata is None and self.mesh_cache is not None:
+            polydata = self.mesh_cache.read_polydata_with_normals(file_name)
 
-        model = sm.VTKSurfaceModel(tmp_name,
+        model = sm.VTKSurfaceModel(file_name,
                                    colour_as_float,
                                    visibility,
                                    opacity,
-                                   pickable)
+                                   pickable,
+                                   polydata)
 
         if 'texture' in config.keys():
             texture_file = config['texture']
@@ -199,6 +265,15 @@ class SurfaceModelLoader:
         """
         return self.named_surfaces.keys()
 
+    def get_load_times(self):
+        """
+        Returns the time taken to load each model, including reading the
+        file, computing normals and creating the VTKSurfaceModel.
+
+        :return: dictionary of model name to seconds
+        """
+        return dict(self.load_times)
+
     def get_surface_models(self):
         """
         Convenience method, to get all models.
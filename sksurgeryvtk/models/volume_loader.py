@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+"""
+Loads volumetric data (a DICOM directory or NIfTI file) in a background
+thread, so that a viewer can be shown as soon as the metadata is known,
+and refreshed as slices arrive.
+
+Expected usage:
+
+::
+
+    loader = load_volume('path/to/dicom/directory')
+    producer = loader.get_output_producer()   # use like a vtkReader
+    ...
+    # Then, regularly, in the GUI thread
+    if loader.update():
+        render_window.Render()
+
+Loaders are cached by path, so opening the same series again, e.g. in a
+second viewer, re-uses the volume that has already been decoded.
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+import os
+import threading
+import vtk
+from vtk.util import numpy_support
+
+
+def create_volume_reader(input_data):
+    """
+    Creates a VTK reader for a DICOM directory or NIfTI file.
+
+    :param input_data: path to DICOM directory, or .nii/.nii.gz file
+    :return: vtkDICOMImageReader or vtkNIFTIImageReader, not yet updated
+    :raises ValueError: if the path is not a directory or NIfTI file
+    """
+    if os.path.isdir(input_data):
+        reader = vtk.vtkDICOMImageReader()
+        reader.SetDirectoryName(input_data)
+        return reader
+
+    if input_data.endswith(('.nii', '.nii.gz')):
+        reader = vtk.vtkNIFTIImageReader()
+        reader.SetFileName(input_data)
+        return reader
+
+    raise ValueError('Expecting DICOM directory or NIfTI file:'
+                     + str(input_data))
+
+
+class VolumeLoader:
+    """
+    Reads the volume metadata straight away, allocates an empty
+    vtkImageData of the right size, then fills it in chunks of slices
+    from a background thread, started by start().
+
+    vtkDICOMImageReader decodes the whole series whatever extent is
+    requested, as does a compressed .nii.gz file, so for these, the
+    default is to read everything in one chunk, in the background.
+
+    The volume is only marked as modified, for VTK, by update(),
+    which should be called from the GUI thread.
+
+    :param input_data: path to DICOM directory, or .nii/.nii.gz file
+    :param chunk_size: number of slices per read, default depends on format
+    """
+    def __init__(self, input_data, chunk_size=None):
+
+        self.input_data = input_data
+        self.reader = create_volume_reader(input_data)
+        self.reader.UpdateInformation()
+
+        info = self.reader.GetOutputInformation(0)
+        self.whole_extent = info.Get(
+            vtk.vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT())
+        self.number_of_slices = \
+            self.whole_extent[5] - self.whole_extent[4] + 1
+
+        if chunk_size is None:
+            if isinstance(self.reader, vtk.vtkDICOMImageReader) \
+                    or input_data.endswith('.gz'):
+                chunk_size = self.number_of_slices
+            else:
+                chunk_size = 8
+        if chunk_size < 1:
+            raise ValueError('chunk_size should be >= 1')
+        self.chunk_size = chunk_size
+
+        self.volume = vtk.vtkImageData()
+        self.volume.SetExtent(self.whole_extent)
+        self.volume.SetSpacing(info.Get(vtk.vtkDataObject.SPACING()))
+        self.volume.SetOrigin(info.Get(vtk.vtkDataObject.ORIGIN()))
+        self.volume.AllocateScalars(info)
+        self.voxels = self.__get_voxels(self.volume)
+        self.voxels.fill(0)
+
+        self.producer = vtk.vtkTrivialProducer()
+        self.producer.SetOutput(self.volume)
+        self.producer.Update()
+
+        self.slices_loaded = 0
+        self.slices_shown = 0
+        self.error = None
+        self.thread = None
+
+    @staticmethod
+    def __get_voxels(image):
+        """
+        Returns a numpy view of the scalars of image, as [z, y, x, c].
+        """
+        extent = image.GetExtent()
+        scalars = numpy_support.vtk_to_numpy(
+            image.GetPointData().GetScalars())
+        return scalars.reshape(extent[5] - extent[4] + 1,
+                               extent[3] - extent[2] + 1,
+                               extent[1] - extent[0] + 1,
+                               -1)
+
+    def get_output_producer(self):
+        """
+        Returns an algorithm producing the (partially loaded) volume,
+        which can be used in place of a VTK reader, e.g. by
+        VTKResliceWidget.
+
+        :return: vtkTrivialProducer
+        """
+        return self.producer
+
+    def get_volume(self):
+        """
+        Returns the volume, which may still be loading.
+
+        :return: vtkImageData
+        """
+        return self.volume
+
+    def start(self):
+        """
+        Starts reading slices in a background thread,
+        if not already started.
+        """
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.__load, daemon=True)
+        self.thread.start()
+
+    def __load(self):
+        """
+        Runs in the background thread, reading each chunk of
+        slices, and copying it into the volume.
+        """
+        # pylint: disable=broad-except
+        try:
+            z_min = self.whole_extent[4]
+            while self.slices_loaded < self.number_of_slices:
+                first = z_min + self.slices_loaded
+                last = min(first + self.chunk_size,
+                           z_min + self.number_of_slices) - 1
+                self.reader.UpdateExtent((self.whole_extent[0],
+                                          self.whole_extent[1],
+                                          self.whole_extent[2],
+                                          self.whole_extent[3],
+                                          first, last))
+
+                # The reader may return more than was asked for.
+                output = self.reader.GetOutput()
+                read_first = output.GetExtent()[4]
+                read_voxels = self.__get_voxels(output)
+                self.voxels[first - z_min:last - z_min + 1] = \
+                    read_voxels[first - read_first:last - read_first + 1]
+
+                self.slices_loaded = last - z_min + 1
+        except Exception as error:
+            self.error = error
+
+    def update(self):
+        """
+        Marks the volume as modified, if more slices have arrived since
+        the last call, so VTK re-renders it. Call from the GUI thread.
+
+        :return: True if the volume changed
+        :raises IOError: if reading failed in the background thread
+        """
+        if self.error is not None:
+            raise IOError('Failed to read:' + str(self.input_data)) \
+                from self.error
+
+        slices_loaded = self.slices_loaded
+        if slices_loaded == self.slices_shown:
+            return False
+        self.slices_shown = slices_loaded
+        self.volume.Modified()
+        return True
+
+    def is_complete(self):
+        """
+        Returns True once all slices have been read.
+        """
+        return self.slices_loaded == self.number_of_slices
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the background thread finishes, then calls update().
+
+        :param timeout: optional timeout in seconds
+        :return: True if all slices have been read
+        """
+        if self.thread is not None:
+            self.thread.join(timeout)
+        self.update()
+        return self.is_complete()
+
+
+_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def load_volume(input_data, chunk_size=None):
+    """
+    Returns a started VolumeLoader for input_data, re-using a
+    cached one if this path has been loaded before.
+
+    :param input_data: path to DICOM directory, or .nii/.nii.gz file
+    :param chunk_size: number of slices per read, if a new loader is made
+    :return: VolumeLoader
+    """
+    key = os.path.abspath(input_data)
+    with _CACHE_LOCK:
+        loader = _CACHE.get(key)
+        if loader is None or loader.error is not None:
+            loader = VolumeLoader(input_data, chunk_size)
+            _CACHE[key] = loader
+    loader.start()
+    return loader
+
+
+def clear_volume_cache():
+    """
+    Removes all cached volumes, so they are read from disk next time.
+    """
+    with _CACHE_LOCK:
+        _CACHE.clear()
@@ -16,13 +16,56 @@ import sksurgeryvtk.utils.matrix_utils as mu
 # pylint:disable=super-with-arguments
 
 
+def create_reader(filename):
+    """
+    Creates the VTK reader for a surface model file, based on its extension.
+
+    :param filename: .vtk, .stl, .ply or .vtp file
+    :return: VTK reader, with filename set, but not yet updated
+    :raises: ValueError if the file doesn't exist or isn't a supported type
+    """
+    vf.validate_is_file(filename)
+
+    if filename.endswith('.vtk'):
+        reader = vtk.vtkPolyDataReader()
+
+    elif filename.endswith('.stl'):
+        reader = vtk.vtkSTLReader()
+
+    elif filename.endswith('.ply'):
+        reader = vtk.vtkPLYReader()
+
+    elif filename.endswith('.vtp'):
+        reader = vtk.vtkXMLPolyDataReader()
+    else:
+        raise ValueError(
+            'File type not supported for model loading: {}'.format(
+                filename))
+
+    reader.SetFileName(filename)
+    return reader
+
+
+def create_normals_filter():
+    """
+    Creates the vtkPolyDataNormals used for models without normals.
+
+    :return: vtkPolyDataNormals, with no input set
+    """
+    normals = vtk.vtkPolyDataNormals()
+    normals.SetAutoOrientNormals(True)
+    normals.SetFlipNormals(False)
+    return normals
+
+
 class VTKSurfaceModel(vbm.VTKBaseModel):
     """
     Class to represent a VTK surface model. Normally
     read from a file, but could be created on the fly.
     """
+    # pylint: disable=too-many-arguments
     def __init__(self, filename, colour, visibility=True, opacity=1.0,
-                 pickable=True):
+                 pickable=True, polydata=None):
         """
         Creates a new surface model.
 
@@ -31,6 +74,8 @@ class VTKSurfaceModel(vbm.VTKBaseModel):
         :param visibility: boolean, True|False
         :param opacity: float [0,1]
         :param pickable: boolean, True|False
+        :param polydata: optional vtkPolyData, already read from filename,
+            e.g. by parallel_model_reader, so the file isn't read again.
         """
         super(VTKSurfaceModel, self).__init__(colour, visibility, opacity,
                                               pickable)
@@ -43,28 +88,15 @@ class VTKSurfaceModel(vbm.VTKBaseModel):
         self.texture_reader = None
         self.texture = None
 
-        # Works like FactoryMethod. Could be refactored elsewhere.
-        if filename is not None:
-
-            vf.validate_is_file(filename)
-
-            if filename.endswith('.vtk'):
-                self.reader = vtk.vtkPolyDataReader()
+        if filename is not None and polydata is not None:
+            self.source = polydata
 
-            elif filename.endswith('.stl'):
-                self.reader = vtk.vtkSTLReader()
-
-            elif filename.endswith('.ply'):
-                self.reader = vtk.vtkPLYReader()
+            self.source_file = filename
+            self.name = os.path.basename(self.source_file)
 
-            elif filename.endswith('.vtp'):
-                self.reader = vtk.vtkXMLPolyDataReader()
-            else:
-                raise ValueError(
-                    'File type not supported for model loading: {}'.format(
-                        filename))
+        elif filename is not None:
 
-            self.reader.SetFileName(filename)
+            self.reader = create_reader(filename)
             self.reader.Update()
             self.source = self.reader.GetOutput()
 
@@ -80,10 +112,8 @@ class VTKSurfaceModel(vbm.VTKBaseModel):
         # Only create normals if there are none on input
         self.normals = None
         if self.source.GetPointData().GetNormals() is None:
-            self.normals = vtk.vtkPolyDataNormals()
+            self.normals = create_normals_filter()
             self.normals.SetInputData(self.source)
-            self.normals.SetAutoOrientNormals(True)
-            self.normals.SetFlipNormals(False)
         self.transform = vtk.vtkTransform()
         self.transform.Identity()
         self.transform_filter = vtk.vtkTransformPolyDataFilter()
@@ -6,10 +6,12 @@ Module to load VTK surfaces.
 
 import os
 import csv
+import time
 import logging
 from vtk.util import colors
 import sksurgerycore.configuration.configuration_manager as cm
 import sksurgeryvtk.models.vtk_surface_model as sm
+import sksurgeryvtk.models.parallel_model_reader as pmr
 
 LOGGER = logging.getLogger(__name__)
 
@@ -18,7 +20,10 @@ class VTKSurfaceModelDirectoryLoader:
     """
     Class to load all VTK surface models in a directory.
     """
-    def __init__(self, directory_name, defaults_file=None):
+    # pylint: disable=too-many-arguments
+    def __init__(self, directory_name, defaults_file=None,
+                 number_of_workers=1, progress_callback=None,
+                 mesh_cache=None):
         """
         Constructor loads surface models from a given directory.
 
@@ -42,8 +47,17 @@ class VTKSurfaceModelDirectoryLoader:
 
         defaults_file takes precedence over colours.txt if both present.
 
+        If number_of_workers > 1, files are read, and normals computed,
+        in that many worker processes, see parallel_model_reader.
+
         :param directory_name: string, directory name.
         :param defaults_file: filename of json file with default settings
+        :param number_of_workers: number of processes to read files with
+        :param progress_callback: optional function, called as
+            progress_callback(number_done, total, file_name) as each
+            file in the directory is tried
+        :param mesh_cache: optional MeshCache, to store each model after
+            reading and computing normals, and re-use it next time
         :raises: ValueError if directory_name is unreadable.
         """
         if directory_name is None:
@@ -71,10 +85,15 @@ class VTKSurfaceModelDirectoryLoader:
         if directory_name:
             self.get_model_colours(directory_name)
 
+        self.number_of_workers = number_of_workers
+        self.progress_callback = progress_callback
+        self.mesh_cache = mesh_cache
+        self.load_times = {}
+
         self.models = []
         self.get_models(directory_name)
 
-    # pylint: disable=too-many-branches
+    # pylint: disable=too-many-branches, too-many-statements, too-many-locals
     def get_models(self, directory_name):
         """
         Loads models from the given directory.
@@ -87,21 +106,44 @@ class VTKSurfaceModelDirectoryLoader:
         # Reset
         files = []
         self.models = []
+        self.load_times = {}
 
         # This may well throw FileNotFoundError which is fine.
         # If its not valid I want the Exception raised.
         files = os.listdir(directory_name)
         files.sort()
 
+        # Read files in parallel, if requested.
+        read_results = {}
+        if self.number_of_workers > 1:
+            read_results = pmr.read_polydata_files(
+                [os.path.join(directory_name, filename)
+                 for filename in files],
+                self.number_of_workers,
+                self.progress_callback,
+                self.mesh_cache)
+
         # Loop through each file, trying to load it.
         counter = 0
 
-        for filename in files:
+        for number_done, filename in enumerate(files, 1):
 
             full_path = os.path.join(directory_name, filename)
+            start = time.perf_counter()
 
             try:
-                model = sm.VTKSurfaceModel(full_path, (1.0, 1.0, 1.0))
+                read_seconds = 0.0
+                polydata = None
+                if read_results:
+                    polydata, read_seconds = read_results[full_path]
+                    if isinstance(polydata, Exception):
+                        raise polydata
+                elif self.mesh_cache is not None:
+                    polydata = self.mesh_cache.read_polydata_with_normals(
+                        full_path)
+
+                model = sm.VTKSurfaceModel(full_path, (1.0, 1.0, 1.0),
+                                           polydata=polydata)
                 model_name = os.path.splitext(model.get_name())[0]
                 model.set_name(model_name)
 
@@ -154,18 +196,33 @@ class VTKSurfaceModelDirectoryLoader:
 
                 # Finally, add to list, increment counter.
                 self.models.append(model)
-                LOGGER.info("Loaded model from %s", full_path)
+                self.load_times[model_name] = \
+                    read_seconds + time.perf_counter() - start
+                LOGGER.info("Loaded model from %s in %.3f seconds",
+                            full_path, self.load_times[model_name])
                 counter += 1
 
             except ValueError:
                 # Presume wrong type of file.
                 LOGGER.info("Didn't load vtk_surface_model: %s", full_path)
 
+            if self.progress_callback is not None and not read_results:
+                self.progress_callback(number_done, len(files), full_path)
+
         if not self.models:
             LOGGER.info("No valid model files in given directory")
 
         LOGGER.info("Loaded models from %s", directory_name)
 
+    def get_load_times(self):
+        """
+        Returns the time taken to load each model, including reading the
+        file, computing normals and creating the VTKSurfaceModel.
+
+        :return: dictionary of model name to seconds
+        """
+        return dict(self.load_times)
+
     def get_model_colours(self, directory):
         """
         Load colours for each model from a .txt file in the model
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+
+"""
+Writes rendered images, masks and label images to disk, encoding them in
+background threads, along with an index file recording the pose and
+intrinsics of each sample.
+
+Expected usage:
+
+::
+
+    with DatasetWriter('output_dir', image_format='png') as writer:
+        for pose in poses:
+            generator.setup_camera_extrinsics(pose)
+            writer.write(generator.get_image(),
+                         masks=generator.get_masks(),
+                         pose=generator.camera_to_world,
+                         intrinsics=generator.intrinsics)
+"""
+
+# pylint: disable=too-many-instance-attributes, too-many-arguments
+
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import cv2
+
+IMAGE_FORMATS = ['png', 'jpg', 'npy']
+
+
+class DatasetWriter:
+    """
+    Streams samples to a directory. In 'png' and 'jpg' format, each image
+    and mask is written to its own file. In 'npy' format, samples are
+    collected into uncompressed .npz shards of shard_size samples.
+
+    Encoding is done by a pool of threads. If max_pending files or shards
+    are waiting to be encoded, write() blocks until the encoders
+    catch up, so memory use stays bounded.
+
+    Each sample is recorded as one line of JSON in index.jsonl. Samples are
+    numbered from 0, so any existing index.jsonl in output_dir is
+    overwritten, as are its files as each sample index is re-used.
+
+    :param output_dir: directory to write to, created if necessary
+    :param image_format: one of IMAGE_FORMATS
+    :param number_of_threads: number of encoding threads
+    :param max_pending: maximum number of files or shards waiting to be encoded
+    :param jpeg_quality: [0-100] JPEG quality, if image_format is 'jpg'
+    :param shard_size: number of samples per shard, if image_format is 'npy'
+    :param rgb: if True, images are RGB (as rendered by VTK), else BGR
+    """
+    def __init__(self,
+                 output_dir,
+                 image_format='png',
+                 number_of_threads=4,
+                 max_pending=32,
+                 jpeg_quality=95,
+                 shard_size=100,
+                 rgb=True
+                 ):
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError('Invalid image format:' + str(image_format))
+        if number_of_threads < 1:
+            raise ValueError('number_of_threads should be >= 1')
+        if max_pending < 1:
+            raise ValueError('max_pending should be >= 1')
+        if shard_size < 1:
+            raise ValueError('shard_size should be >= 1')
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.output_dir = output_dir
+        self.image_format = image_format
+        self.jpeg_quality = jpeg_quality
+        self.shard_size = shard_size
+        self.rgb = rgb
+
+        self.number_of_samples = 0
+        self.shard_keys = None
+        self.shard = {}
+        self.shard_entries = []
+        self.number_of_shards = 0
+        self.errors = []
+        self.closed = False
+
+        self.max_pending = max_pending
+        self.pending = set()
+        self.executor = ThreadPoolExecutor(max_workers=number_of_threads)
+
+        # Start a new, empty, index.
+        self.index_file_name = os.path.join(output_dir, 'index.jsonl')
+        with open(self.index_file_name, 'w', encoding='utf-8'):
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def __submit(self, function, *args):
+        """
+        Queues function(*args) for the encoding threads,
+        blocking while too many jobs are pending.
+        """
+        if len(self.pending) >= self.max_pending:
+            done, self.pending = wait(self.pending,
+                                      return_when=FIRST_COMPLETED)
+            self.__record_errors(done)
+        self.pending.add(self.executor.submit(function, *args))
+
+    def __record_errors(self, futures):
+        """
+        Records any errors from finished encoding jobs.
+        """
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                self.errors.append(error)
+
+    def __write_index(self, entries):
+        """
+        Appends entries to the index, one line of JSON each.
+        """
+        with open(self.index_file_name, 'a', encoding='utf-8') as index_file:
+            for entry in entries:
+                index_file.write(json.dumps(entry) + '\n')
+
+    def __check_errors(self):
+        """
+        Re-raises the first error from the encoding threads.
+        """
+        if self.errors:
+            raise IOError('Failed to write dataset sample') from self.errors[0]
+
+    def __write_image(self, file_name, image, is_colour):
+        """
+        Runs in an encoding thread, writing one image file.
+        """
+        if is_colour and self.rgb:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        params = []
+        if file_name.endswith('.jpg'):
+            params = [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)]
+        if not cv2.imwrite(file_name, image, params):
+            raise IOError('Failed to write:' + file_name)
+
+    @staticmethod
+    def __write_shard(file_name, shard):
+        """
+        Runs in an encoding thread, writing one shard.
+        """
+        np.savez(file_name, **{key: np.stack(arrays)
+                               for key, arrays in shard.items()})
+
+    def write(self, image, masks=None, labels=None, pose=None,
+              intrinsics=None, metadata=None):
+        """
+        Adds one sample. Arrays are copied, so the caller
+        may re-use them as soon as this returns.
+
+        :param image: [H x W x 3] uint8 image
+        :param masks: optional dictionary of name to [H x W] uint8 mask
+        :param labels: optional [H x W] uint8/uint16 label image
+        :param pose: optional 4x4 numpy ndarray, e.g. camera_to_world
+        :param intrinsics: optional 3x3 numpy ndarray
+        :param metadata: optional dictionary, must be JSON serialisable
+        :return: index of this sample
+        :raises ValueError: if the writer is closed, or in 'npy' format,
+            if the sample doesn't have the same masks and labels as the first
+        """
+        if self.closed:
+            raise ValueError('Cannot write to a closed DatasetWriter')
+        self.__check_errors()
+
+        if not isinstance(image, np.ndarray):
+            raise TypeError('Image is not an np.ndarray')
+
+        index = self.number_of_samples
+        entry = {'index': index}
+        if pose is not None:
+            entry['pose'] = np.asarray(pose).tolist()
+        if intrinsics is not None:
+            entry['intrinsics'] = np.asarray(intrinsics).tolist()
+        if metadata is not None:
+            entry['metadata'] = metadata
+
+        arrays = {'image': image}
+        if labels is not None:
+            arrays['labels'] = labels
+        if masks is not None:
+            for name, mask in masks.items():
+                arrays['mask_' + name] = mask
+
+        if self.image_format == 'npy':
+            self.__add_to_shard(entry, arrays)
+        else:
+            self.__submit_image_files(entry, arrays)
+
+        self.number_of_samples += 1
+        return index
+
+    def __add_to_shard(self, entry, arrays):
+        """
+        Copies a sample's arrays into the current shard,
+        and writes the shard once it is full.
+        """
+        # Every array in a shard is stacked, so they must all be present
+        # for each sample, for one offset to index them all.
+        if self.shard_keys is None:
+            self.shard_keys = set(arrays)
+        elif set(arrays) != self.shard_keys:
+            raise ValueError('Expecting the same masks and labels in each '
+                             'sample:' + str(sorted(self.shard_keys)))
+
+        for key, array in arrays.items():
+            self.shard.setdefault(key, []).append(np.array(array))
+        entry['shard'] = 'shard_{:05d}.npz'.format(self.number_of_shards)
+        entry['offset'] = len(self.shard['image']) - 1
+        self.shard_entries.append(entry)
+
+        if len(self.shard['image']) == self.shard_size:
+            self.__flush_shard()
+
+    def __submit_image_files(self, entry, arrays):
+        """
+        Queues one image file per array of a sample, and indexes it.
+        """
+        for key, array in arrays.items():
+            extension = self.image_format if key == 'image' else 'png'
+            file_name = '{}_{:06d}.{}'.format(key, entry['index'], extension)
+            entry[key] = file_name
+            self.__submit(self.__write_image,
+                          os.path.join(self.output_dir, file_name),
+                          np.array(array),
+                          key == 'image')
+        self.__write_index([entry])
+
+    def write_batch(self, images, poses=None, intrinsics=None):
+        """
+        Adds one sample per image, e.g. from render_batch().
+
+        :param images: [N x H x W x 3] uint8 images
+        :param poses: optional [N x 4 x 4] poses
+        :param intrinsics: optional 3x3 numpy ndarray, shared by all images
+        :return: list of sample indexes
+        """
+        if poses is not None and len(poses) != len(images):
+            raise ValueError('Number of poses does not match number of images')
+        return [self.write(image,
+                           pose=None if poses is None else poses[index],
+                           intrinsics=intrinsics)
+                for index, image in enumerate(images)]
+
+    def __flush_shard(self):
+        """
+        Queues the current shard for writing, and records its entries.
+        """
+        if not self.shard_entries:
+            return
+        file_name = os.path.join(self.output_dir,
+                                 self.shard_entries[0]['shard'])
+        self.__submit(self.__write_shard, file_name, self.shard)
+        self.__write_index(self.shard_entries)
+        self.shard = {}
+        self.shard_entries = []
+        self.number_of_shards += 1
+
+    def close(self):
+        """
+        Writes any partial shard, and waits for all encoding to finish.
+
+        :raises IOError: if any sample failed to write
+        """
+        if self.closed:
+            return
+        self.__flush_shard()
+        self.executor.shutdown(wait=True)
+        self.__record_errors(self.pending)
+        self.pending = set()
+        self.closed = True
+        self.__check_errors()
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+"""
+Draws random, valid poses for VTKLUSSimulator in bulk, using numpy,
+so that rendering time isn't wasted on frames where the anatomy or
+probe is out of view.
+
+Expected usage:
+
+::
+
+    sampler = LUSPoseSampler.from_simulator(simulator,
+                                            anatomy_range=anatomy_range,
+                                            probe_range=probe_range,
+                                            handle_range=(-30, 30))
+    anatomy, probe, angles, locations = sampler.sample(1000)
+    for i in range(1000):
+        simulator.set_pose(anatomy[i], probe[i], angles[i], locations[i])
+"""
+
+# pylint: disable=too-many-instance-attributes, too-many-arguments
+
+import numpy as np
+from vtk.util import numpy_support
+import sksurgeryvtk.utils.matrix_utils as mu
+
+
+def get_triangles_as_numpy(polydata):
+    """
+    Returns the point indexes of each triangle in a vtkPolyData.
+
+    :param polydata: vtkPolyData, containing only triangles
+    :return: [M x 3] numpy ndarray of point indexes
+    :raises ValueError: if any polygon is not a triangle
+    """
+    cells = numpy_support.vtk_to_numpy(polydata.GetPolys().GetData())
+    if cells.size % 4 != 0 \
+            or not np.all(cells.reshape(-1, 4)[:, 0] == 3):
+        raise ValueError('Polydata should only contain triangles, '
+                         'e.g. use vtkTriangleFilter.')
+    return cells.reshape(-1, 4)[:, 1:]
+
+
+def sample_surface_points(points, triangles, number_of_samples,
+                          random_state=None):
+    """
+    Draws points uniformly over a triangulated surface, i.e. each
+    triangle is chosen with probability proportional to its area,
+    then a point is drawn uniformly within that triangle.
+
+    :param points: [N x 3] numpy ndarray of vertices
+    :param triangles: [M x 3] numpy ndarray of vertex indexes
+    :param number_of_samples: number of points to draw
+    :param random_state: optional np.random.RandomState
+    :return: [number_of_samples x 3] numpy ndarray
+    """
+    if random_state is None:
+        random_state = np.random.RandomState()
+
+    corner_0 = points[triangles[:, 0]]
+    corner_1 = points[triangles[:, 1]]
+    corner_2 = points[triangles[:, 2]]
+    areas = 0.5 * np.linalg.norm(np.cross(corner_1 - corner_0,
+                                          corner_2 - corner_0), axis=1)
+    total_area = np.sum(areas)
+    if total_area <= 0:
+        raise ValueError('Surface has zero area')
+
+    chosen = random_state.choice(len(triangles),
+                                 size=number_of_samples,
+                                 p=areas / total_area)
+
+    # Uniform barycentric co-ordinates, by folding the unit square.
+    rand_0 = np.sqrt(random_state.uniform(size=(number_of_samples, 1)))
+    rand_1 = random_state.uniform(size=(number_of_samples, 1))
+    return (1 - rand_0) * corner_0[chosen] \
+        + rand_0 * (1 - rand_1) * corner_1[chosen] \
+        + rand_0 * rand_1 * corner_2[chosen]
+
+
+def _sample_uniform(ranges, number_of_samples, random_state):
+    """
+    Draws [number_of_samples x len(ranges)] values,
+    uniformly between each [min, max] in ranges.
+    """
+    ranges = np.asarray(ranges, dtype=float).reshape(-1, 2)
+    return random_state.uniform(ranges[:, 0], ranges[:, 1],
+                                size=(number_of_samples, ranges.shape[0]))
+
+
+class LUSPoseSampler:
+    """
+    Samples anatomy pose, probe pose, handle angle and a location on the
+    liver surface, as passed to VTKLUSSimulator.set_pose(), and keeps
+    only those samples where the probe and the chosen surface location
+    are in front of the camera, within the clipping range, and project
+    inside the image.
+
+    :param liver_points: [N x 3] vertices of the liver surface
+    :param liver_triangles: [M x 3] vertex indexes of the liver surface
+    :param intrinsics: [3 x 3] camera matrix
+    :param image_size: (width, height) in pixels
+    :param reference_l2c: [4 x 4] reference liver to camera
+    :param reference_p2c: [4 x 4] reference probe to camera
+    :param anatomy_range: 6 x [min, max] for anatomy rx, ry, rz, tx, ty, tz
+    :param probe_range: 6 x [min, max] for probe rx, ry, rz, tx, ty, tz
+    :param handle_range: [min, max] handle angle in degrees
+    :param clipping_range: (near, far) distance from camera in millimetres
+    :param margin: minimum distance from image edge in pixels
+    :param max_contact_distance: if not None, maximum distance in mm from
+        the probe to the chosen surface location
+    :param seed: optional seed for the random number generator
+    """
+    def __init__(self,
+                 liver_points,
+                 liver_triangles,
+                 intrinsics,
+                 image_size,
+                 reference_l2c,
+                 reference_p2c,
+                 anatomy_range=None,
+                 probe_range=None,
+                 handle_range=(0, 0),
+                 clipping_range=(1, 1000),
+                 margin=0,
+                 max_contact_distance=None,
+                 seed=None
+                 ):
+        if len(image_size) != 2:
+            raise ValueError('image_size should be (width, height)')
+
+        self.liver_points = np.asarray(liver_points, dtype=float)
+        self.liver_triangles = np.asarray(liver_triangles, dtype=int)
+        self.intrinsics = np.asarray(intrinsics, dtype=float)
+        self.image_size = image_size
+        self.reference_l2c = np.asarray(reference_l2c, dtype=float)
+        self.reference_p2c = np.asarray(reference_p2c, dtype=float)
+        self.inverse_reference_l2c = np.linalg.inv(self.reference_l2c)
+
+        if anatomy_range is None:
+            anatomy_range = np.zeros((6, 2))
+        if probe_range is None:
+            probe_range = np.zeros((6, 2))
+        if np.asarray(anatomy_range).size != 12 \
+                or np.asarray(probe_range).size != 12:
+            raise ValueError('anatomy_range and probe_range should be 6 x 2')
+        if np.asarray(handle_range).size != 2:
+            raise ValueError('handle_range should be [min, max]')
+
+        self.anatomy_range = anatomy_range
+        self.probe_range = probe_range
+        self.handle_range = handle_range
+        self.clipping_range = clipping_range
+        self.margin = margin
+        self.max_contact_distance = max_contact_distance
+        self.random_state = np.random.RandomState(seed)
+
+    @classmethod
+    def from_simulator(cls, simulator, **kwargs):
+        """
+        Creates a sampler using the liver model, intrinsics, image size,
+        reference poses and clipping range of a VTKLUSSimulator.
+
+        :param simulator: VTKLUSSimulator
+        :param kwargs: other arguments, as for the constructor
+        :return: LUSPoseSampler
+        """
+        liver_model = simulator.model_loader.get_surface_model('liver')
+        liver_model.transform_filter.Update()
+        triangles = get_triangles_as_numpy(
+            liver_model.transform_filter.GetOutput())
+        kwargs.setdefault('clipping_range',
+                          (simulator.clip_near, simulator.clip_far))
+        return cls(liver_model.get_points_as_numpy(),
+                   triangles,
+                   simulator.intrinsics,
+                   (simulator.img.shape[1], simulator.img.shape[0]),
+                   simulator.reference_l2c,
+                   simulator.reference_p2c,
+                   **kwargs)
+
+    def compute_poses(self, anatomy_params, probe_params, locations):
+        """
+        Batched equivalent of VTKLUSSimulator.compute_pose(), returning
+        only the liver and probe poses, as the handle angle affects neither.
+
+        :param anatomy_params: [N x 6] anatomy rx, ry, rz, tx, ty, tz
+        :param probe_params: [N x 6] probe rx, ry, rz, tx, ty, tz
+        :param locations: [N x 3] locations on liver surface
+        :return: ([N x 4 x 4] liver2camera, [N x 4 x 4] probe2camera)
+        """
+        anatomy_params = np.asarray(anatomy_params, dtype=float)
+        rotations = np.zeros_like(anatomy_params)
+        rotations[:, 0:3] = anatomy_params[:, 0:3]
+
+        anatomy_tx = np.matmul(self.reference_l2c,
+                               mu.create_matrices_from_array(rotations))
+        anatomy_tx[:, 0:3, 3] += anatomy_params[:, 3:6]
+
+        p2c = np.tile(self.reference_p2c, (len(anatomy_params), 1, 1))
+        p2c[:, 0:3, 3] = np.asarray(locations, dtype=float) \
+            @ self.reference_l2c[0:3, 0:3].T + self.reference_l2c[0:3, 3]
+        p2l = np.matmul(self.inverse_reference_l2c, p2c)
+
+        probe_tx = mu.create_matrices_from_array(probe_params)
+        probe_to_camera = np.matmul(anatomy_tx, np.matmul(p2l, probe_tx))
+        return anatomy_tx, probe_to_camera
+
+    def is_valid(self, liver2camera, probe2camera, locations):
+        """
+        Checks each sample, returning True where the probe and the
+        surface location are within the clipping range, and project
+        inside the image, and if max_contact_distance is set, where the
+        probe is close enough to the surface location.
+
+        :param liver2camera: [N x 4 x 4] liver to camera
+        :param probe2camera: [N x 4 x 4] probe to camera
+        :param locations: [N x 3] locations on liver surface
+        :return: [N] boolean numpy ndarray
+        """
+        surface_points = np.einsum('nij,nj->ni',
+                                   liver2camera[:, 0:3, 0:3],
+                                   np.asarray(locations, dtype=float)) \
+            + liver2camera[:, 0:3, 3]
+        probe_points = probe2camera[:, 0:3, 3]
+
+        valid = np.ones(len(surface_points), dtype=bool)
+        for points in [surface_points, probe_points]:
+            depth = points[:, 2]
+            valid &= depth >= self.clipping_range[0]
+            valid &= depth <= self.clipping_range[1]
+
+            safe_depth = np.where(depth > 0, depth, 1)
+            pixel_x = self.intrinsics[0, 0] * points[:, 0] / safe_depth \
+                + self.intrinsics[0, 2]
+            pixel_y = self.intrinsics[1, 1] * points[:, 1] / safe_depth \
+                + self.intrinsics[1, 2]
+            valid &= pixel_x >= self.margin
+            valid &= pixel_x < self.image_size[0] - self.margin
+            valid &= pixel_y >= self.margin
+            valid &= pixel_y < self.image_size[1] - self.margin
+
+        if self.max_contact_distance is not None:
+            distance = np.linalg.norm(probe_points - surface_points, axis=1)
+            valid &= distance <= self.max_contact_distance
+
+        return valid
+
+    def sample(self, number_of_poses, batch_size=None, max_batches=100):
+        """
+        Draws number_of_poses valid samples, drawing candidates in
+        batches and rejecting those that fail is_valid().
+
+        :param number_of_poses: number of samples to return
+        :param batch_size: candidates per batch, defaults to 2 x number
+        :param max_batches: maximum number of batches to try
+        :return: ([N x 6] anatomy params, [N x 6] probe params,
+            [N] handle angles, [N x 3] surface locations)
+        :raises RuntimeError: if too few valid samples are found
+        """
+        if number_of_poses < 1:
+            raise ValueError('number_of_poses should be >= 1')
+        if batch_size is None:
+            batch_size = 2 * number_of_poses
+
+        accepted = []
+        number_accepted = 0
+        for _ in range(max_batches):
+            anatomy = _sample_uniform(self.anatomy_range, batch_size,
+                                      self.random_state)
+            probe = _sample_uniform(self.probe_range, batch_size,
+                                    self.random_state)
+            angles = _sample_uniform(self.handle_range, batch_size,
+                                     self.random_state)[:, 0]
+            locations = sample_surface_points(self.liver_points,
+                                              self.liver_triangles,
+                                              batch_size,
+                                              self.random_state)
+
+            l2c, p2c = self.compute_poses(anatomy, probe, locations)
+            valid = self.is_valid(l2c, p2c, locations)
+
+            accepted.append((anatomy[valid], probe[valid],
+                             angles[valid], locations[valid]))
+            number_accepted += np.count_nonzero(valid)
+            if number_accepted >= number_of_poses:
+                break
+
+        if number_accepted < number_of_poses:
+            raise RuntimeError('Only found ' + str(number_accepted)
+                               + ' valid poses, out of '
+                               + str(number_of_poses) + ' requested.')
+
+        return tuple(np.concatenate(arrays)[:number_of_poses]
+                     for arrays in zip(*accepted))
@@ -28,13 +28,51 @@ def create_numpy_matrix_from_vtk(matrix):
     """
     Returns a new numpy 4x4 matrix from a vtkMatrix4x4.
     """
-    validate_vtk_matrix_4x4(matrix)
+    return copy_vtk_matrix_to_numpy(matrix, np.eye(4))
+
+
+def copy_numpy_to_vtk_matrix(array, vtk_matrix):
+    """
+    Copies a numpy 4x4 array into an existing vtkMatrix4x4,
+    in one call, so per-frame code needn't allocate a new matrix.
+
+    :param array: 4x4 numpy ndarray
+    :param vtk_matrix: vtkMatrix4x4 to write to
+    :return: vtk_matrix
+    """
+    if not isinstance(array, np.ndarray):
+        raise TypeError('Invalid array object passed')
+
+    if array.shape != (4, 4):
+        raise ValueError('Input array should be a 4x4 matrix')
+
+    validate_vtk_matrix_4x4(vtk_matrix)
+
+    vtk_matrix.DeepCopy(array.ravel())
+    return vtk_matrix
+
+
+def copy_vtk_matrix_to_numpy(vtk_matrix, array):
+    """
+    Copies a vtkMatrix4x4 into an existing numpy 4x4 array,
+    so per-frame code needn't allocate a new array.
+
+    :param vtk_matrix: vtkMatrix4x4 to read from
+    :param array: 4x4 numpy ndarray to write to
+    :return: array
+    """
+    validate_vtk_matrix_4x4(vtk_matrix)
+
+    if not isinstance(array, np.ndarray):
+        raise TypeError('Invalid array object passed')
+
+    if array.shape != (4, 4):
+        raise ValueError('Output array should be a 4x4 matrix')
 
-    transformation = np.eye(4)
     for i in range(4):
         for j in range(4):
-            transformation[i, j] = matrix.GetElement(i, j)
-    return transformation
+            array[i, j] = vtk_matrix.GetElement(i, j)
+    return array
 
 
 def validate_vtk_matrix_4x4(matrix):
@@ -117,6 +155,77 @@ def create_matrix_from_string(parameter_string, is_in_radians=False):
     return create_matrix_from_list(param_list, is_in_radians)
 
 
+def create_matrices_from_array(params, is_in_radians=False):
+    """
+    Generates an [N x 4 x 4] numpy ndarray from an [N x 6] array of
+    rx,ry,rz,tx,ty,tz in degrees, millimetres, using the same 'zxy'
+    convention as create_matrix_from_list, but computing all N matrices
+    at once, without a Python loop.
+
+    :param params: [N x 6] array, or list of lists of 6 numbers
+    :param is_in_radians: True if radians, False otherwise, default is False
+    :return: [N x 4 x 4] rigid body transforms
+    """
+    params = np.asarray(params, dtype=float)
+    if params.ndim != 2 or params.shape[1] != 6:
+        raise ValueError("Parameters should be [N x 6], not:"
+                         + str(params.shape))
+
+    angles = params[:, 0:3]
+    if not is_in_radians:
+        angles = np.deg2rad(angles)
+    cos = np.cos(angles)
+    sin = np.sin(angles)
+
+    number_of_matrices = params.shape[0]
+    rot_x = np.zeros((number_of_matrices, 3, 3))
+    rot_x[:, 0, 0] = 1
+    rot_x[:, 1, 1] = cos[:, 0]
+    rot_x[:, 1, 2] = -sin[:, 0]
+    rot_x[:, 2, 1] = sin[:, 0]
+    rot_x[:, 2, 2] = cos[:, 0]
+
+    rot_y = np.zeros((number_of_matrices, 3, 3))
+    rot_y[:, 0, 0] = cos[:, 1]
+    rot_y[:, 0, 2] = sin[:, 1]
+    rot_y[:, 1, 1] = 1
+    rot_y[:, 2, 0] = -sin[:, 1]
+    rot_y[:, 2, 2] = cos[:, 1]
+
+    rot_z = np.zeros((number_of_matrices, 3, 3))
+    rot_z[:, 0, 0] = cos[:, 2]
+    rot_z[:, 0, 1] = -sin[:, 2]
+    rot_z[:, 1, 0] = sin[:, 2]
+    rot_z[:, 1, 1] = cos[:, 2]
+    rot_z[:, 2, 2] = 1
+
+    matrices = np.zeros((number_of_matrices, 4, 4))
+    matrices[:, 0:3, 0:3] = np.matmul(np.matmul(rot_z, rot_x), rot_y)
+    matrices[:, 0:3, 3] = params[:, 3:6]
+    matrices[:, 3, 3] = 1
+    return matrices
+
+
+def create_matrices_from_strings(parameter_strings, is_in_radians=False):
+    """
+    Generates an [N x 4 x 4] numpy ndarray from a list of comma separated
+    strings of the format rx,ry,rz,tx,ty,tz in degrees, millimetres.
+
+    :param parameter_strings: list of N strings of rx,ry,rz,tx,ty,tz
+    :param is_in_radians: True if radians, False otherwise, default is False
+    :return: [N x 4 x 4] rigid body transforms
+    """
+    param_lists = []
+    for parameter_string in parameter_strings:
+        params = parameter_string.split(',')
+        if len(params) != 6:
+            raise ValueError("Incorrect extrinsic:" + parameter_string)
+        param_lists.append([float(param) for param in params])
+
+    return create_matrices_from_array(np.reshape(param_lists, (-1, 6)),
+                                      is_in_radians)
+
+
 def calculate_l2r_matrix(left_extrinsics: np.ndarray,
                          right_extrinsics: np.ndarray) -> np.ndarray:
     """
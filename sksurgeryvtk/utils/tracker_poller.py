@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""
+Polls a scikit-surgery tracker in a background thread, so a slow
+tracker doesn't stall the GUI, and a fast one isn't undersampled.
+
+Expected usage:
+
+::
+
+    poller = TrackerPoller(tracker)
+    poller.start()
+    ...
+    # Then, e.g. in a QTimer callback
+    latest = poller.get_latest()
+    if latest is not None and latest[0] != last_sequence:
+        last_sequence, matrix, acquired_time = latest
+        ...
+    ...
+    poller.stop()
+"""
+
+import threading
+import time
+
+
+class TrackerPoller:
+    """
+    Calls tracker.get_frame() repeatedly in a background thread, and
+    publishes the first tool's pose from the most recent frame to a single
+    slot, which readers check without waiting on the tracker. The slot
+    holds one tuple, replaced in a single assignment, so no lock is needed.
+
+    :param tracker: scikit-surgery tracker, providing get_frame()
+    :param poll_interval: seconds to sleep between calls to get_frame()
+    """
+    def __init__(self, tracker, poll_interval=0.001):
+        if poll_interval < 0:
+            raise ValueError('poll_interval should be >= 0')
+
+        self.tracker = tracker
+        self.poll_interval = poll_interval
+        self.latest = None
+        self.number_of_frames = 0
+        self.error = None
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """
+        Starts polling, if not already started.
+        """
+        if self.thread is not None:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.__poll, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops polling, and waits for the thread to finish.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __poll(self):
+        """
+        Runs in the background thread.
+        """
+        # pylint: disable=broad-except
+        try:
+            while self.running:
+                _, _, _, tracking_data, _ = self.tracker.get_frame()
+                acquired_time = time.perf_counter()
+                if tracking_data is not None and len(tracking_data) > 0:
+                    self.number_of_frames += 1
+                    self.latest = (self.number_of_frames,
+                                   tracking_data[0],
+                                   acquired_time)
+                if self.poll_interval > 0:
+                    time.sleep(self.poll_interval)
+        except Exception as error:
+            self.error = error
+            self.running = False
+
+    def get_latest(self):
+        """
+        Returns the most recent pose, without blocking.
+
+        :return: None, if no frame has arrived yet, else a tuple of
+            (sequence number, 4x4 tracking matrix,
+            time.perf_counter() when acquired)
+        :raises RuntimeError: if the tracker failed in the polling thread
+        """
+        if self.error is not None:
+            raise RuntimeError('Tracker polling failed') from self.error
+        return self.latest
@@ -3,6 +3,12 @@
 """
 Module to provide an interlaced stereo window, designed for
 driving things like the Storz 3D laparoscope monitor.
+
+By default, the left, right, interlaced and stacked views are each a
+VTKOverlayWindow. In 'lean' mode, left and right are rendered as two
+viewports of a single offscreen VTKMultiViewportOverlay, and the
+selected view is composed in numpy and displayed as a 2D image,
+so each update needs one render call and one OpenGL context.
 """
 
 # pylint: disable=c-extension-no-member, no-name-in-module, too-many-instance-attributes
@@ -11,26 +17,169 @@ driving things like the Storz 3D laparoscope monitor.
 import cv2
 import numpy as np
 from PySide2 import QtWidgets
+from PySide2.QtGui import QImage, QPixmap
 from PySide2.QtWidgets import QSizePolicy
-import sksurgeryimage.processing.interlace as i
 import sksurgerycore.utilities.validate_matrix as vm
 import sksurgeryvtk.widgets.vtk_overlay_window as ow
+import sksurgeryvtk.widgets.vtk_multi_viewport_overlay as mo
 import sksurgeryvtk.camera.vtk_camera_model as cm
 
 
+def _validate_buffer_shapes(left, right, output):
+    """
+    Checks left, right and output are all the same shape.
+    """
+    if left.shape != output.shape or right.shape != output.shape:
+        raise ValueError('left, right and output should have the same shape')
+
+
+def interlace_to_buffer(left, right, output):
+    """
+    Writes the even rows of left and the odd rows of right into the
+    corresponding rows of output, in place, using strided views.
+
+    :param left: left RGB image, same shape as output
+    :param right: right RGB image, same shape as output
+    :param output: pre-allocated image, with any number of rows
+    :return: output
+    """
+    _validate_buffer_shapes(left, right, output)
+    output[0::2] = left[0::2]
+    output[1::2] = right[1::2]
+    return output
+
+
+def stack_to_buffer(left, right, output):
+    """
+    Writes the even rows of left into the top half of output, and the
+    odd rows of right into the bottom half, in place, using strided views.
+    If the number of rows is odd, the top half has the extra row.
+
+    :param left: left RGB image, same shape as output
+    :param right: right RGB image, same shape as output
+    :param output: pre-allocated image, with any number of rows
+    :return: output
+    """
+    _validate_buffer_shapes(left, right, output)
+    split = (output.shape[0] + 1) // 2
+    output[:split] = left[0::2]
+    output[split:] = right[1::2]
+    return output
+
+
+def _get_buffer(buffer, shape):
+    """
+    Returns buffer if it has the right shape, or else a new uint8 array.
+    """
+    if buffer.shape != shape:
+        return np.empty(shape, dtype=np.uint8)
+    return buffer
+
+
 class VTKStereoInterlacedWindow(QtWidgets.QWidget):
     """
     Class to contain a pair of VTKOverlayWindows, stacked with a QLabel widget
     containing the resulting interlaced picture.
+
+    If lean is True, left and right are rendered offscreen in one
+    render window, and the selected view is shown in a QLabel. In this
+    mode, the views do not respond to mouse interaction.
+
+    :param lean: if True, use a single offscreen render window
     """
+    # pylint: disable=too-many-arguments
     def __init__(self,
                  offscreen=False,
                  left_camera_matrix=None,
                  right_camera_matrix=None,
-                 clipping_range=(1, 10000)
+                 clipping_range=(1, 10000),
+                 lean=False
                  ):
 
         super().__init__()
+
+        self.lean = lean
+        self.is_rendering = False
+        self.is_dirty = True
+        self.left_image = None
+        self.right_image = None
+        self.displayed_image = None
+
+        self.stacked = QtWidgets.QStackedWidget()
+
+        if lean:
+            self.__create_lean_widgets(left_camera_matrix,
+                                       right_camera_matrix,
+                                       clipping_range)
+        else:
+            self.__create_widgets(offscreen,
+                                  left_camera_matrix,
+                                  right_camera_matrix,
+                                  clipping_range)
+
+        self.stacked.setContentsMargins(0, 0, 0, 0)
+
+        # Set Qt Size Policy
+        self.size_policy = \
+            QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.stacked.setSizePolicy(self.size_policy)
+        self.setSizePolicy(self.size_policy)
+
+        self.layout = QtWidgets.QVBoxLayout()
+        self.layout.setContentsMargins(0, 0, 0, 0)
+        self.layout.setSpacing(0)
+        self.layout.addWidget(self.stacked)
+        self.setLayout(self.layout)
+        self.setContentsMargins(0, 0, 0, 0)
+
+        # Pre-allocated, re-used while the window size is unchanged.
+        self.interlaced = np.eye(1)
+        self.interlaced_swapped = np.eye(1)
+        self.stacked_image = np.eye(1)
+        self.left_camera_to_world = np.eye(4)
+        self.left_to_right = np.eye(4)
+
+        self.default_viewer_index = 3
+        self.viewer_index = self.default_viewer_index
+        self.set_current_viewer_index(self.default_viewer_index)
+
+    def __create_lean_widgets(self,
+                              left_camera_matrix,
+                              right_camera_matrix,
+                              clipping_range):
+        """
+        Creates one offscreen render window, with left and right viewports,
+        and a QLabel to display the composed image.
+        """
+        self.left_widget = None
+        self.right_widget = None
+        self.interlaced_widget = None
+        self.stacked_stereo_widget = None
+
+        self.stereo_overlay = mo.VTKMultiViewportOverlay(
+            2, clipping_range=clipping_range)
+        if left_camera_matrix is not None:
+            self.stereo_overlay.set_camera_matrix(0, left_camera_matrix)
+        if right_camera_matrix is not None:
+            self.stereo_overlay.set_camera_matrix(1, right_camera_matrix)
+
+        self.display_widget = QtWidgets.QLabel()
+        self.display_widget.setScaledContents(True)
+        self.display_widget.setMinimumSize(1, 1)
+        self.display_widget.setContentsMargins(0, 0, 0, 0)
+        self.stacked.addWidget(self.display_widget)
+
+    def __create_widgets(self,
+                         offscreen,
+                         left_camera_matrix,
+                         right_camera_matrix,
+                         clipping_range):
+        """
+        Creates a VTKOverlayWindow for each of the 4 views.
+        """
+        self.stereo_overlay = None
+        self.display_widget = None
+
         self.left_widget = ow.VTKOverlayWindow(
             offscreen=offscreen,
             camera_matrix=left_camera_matrix,
@@ -46,9 +195,6 @@ class VTKStereoInterlacedWindow(QtWidgets.QWidget):
 
         self.right_widget.setContentsMargins(0, 0, 0, 0)
 
-        self.left_rescaled = None
-        self.right_rescaled = None
-
         self.interlaced_widget = ow.VTKOverlayWindow(
             offscreen=offscreen
             )
@@ -60,49 +206,43 @@ class VTKStereoInterlacedWindow(QtWidgets.QWidget):
             )
         self.stacked_stereo_widget.setContentsMargins(0, 0, 0, 0)
 
-        self.stacked = QtWidgets.QStackedWidget()
         self.stacked.addWidget(self.left_widget)
         self.stacked.addWidget(self.right_widget)
         self.stacked.addWidget(self.interlaced_widget)
         self.stacked.addWidget(self.stacked_stereo_widget)
-        self.stacked.setContentsMargins(0, 0, 0, 0)
-
-        # Set Qt Size Policy
-        self.size_policy = \
-            QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.stacked.setSizePolicy(self.size_policy)
-        self.setSizePolicy(self.size_policy)
-
-        self.layout = QtWidgets.QVBoxLayout()
-        self.layout.setContentsMargins(0, 0, 0, 0)
-        self.layout.setSpacing(0)
-        self.layout.addWidget(self.stacked)
-        self.setLayout(self.layout)
-        self.setContentsMargins(0, 0, 0, 0)
-
-        self.interlaced = np.eye(1)
-        self.interlaced_swapped = np.eye(1)
-        self.left_camera_to_world = np.eye(4)
-        self.left_to_right = np.eye(4)
-
-        self.default_viewer_index = 3
-        self.stacked.setCurrentIndex(self.default_viewer_index)
 
     # pylint: disable=invalid-name
     def paintEvent(self, ev):
         """
-        Ensure that the interlaced image is recomputed.
+        Recomputes the interlaced or stacked image, only if something
+        changed since it was last composed. In lean mode, the QLabel
+        already holds the composed image, so nothing is rendered.
         """
         super(VTKStereoInterlacedWindow, self).paintEvent(ev)
-        self.render()
+        if not self.lean and self.is_dirty:
+            self.render()
 
     # pylint: disable=invalid-name
     def resizeEvent(self, ev):
         """
-        Ensure that the interlaced image is recomputed.
+        Ensure that the interlaced image is recomputed,
+        as left and right are rendered at the new size.
         """
         super(VTKStereoInterlacedWindow, self).resizeEvent(ev)
-        self.render()
+        if not self.lean:
+            self.__mark_changed()
+
+    def __mark_changed(self):
+        """
+        Called when the images, cameras or models change. In lean mode,
+        renders and composes straight away. Otherwise, the composed view
+        is recomputed once, on the next paint.
+        """
+        if self.lean:
+            self.render()
+            return
+        self.is_dirty = True
+        self.update()
 
     def set_current_viewer_index(self, viewer_index):
         """
@@ -116,7 +256,12 @@ class VTKStereoInterlacedWindow(QtWidgets.QWidget):
 
         :param viewer_index: index of viewer, as above.
         """
-        self.stacked.setCurrentIndex(viewer_index)
+        self.viewer_index = viewer_index
+        if not self.lean:
+            self.stacked.setCurrentIndex(viewer_index)
+
+        # Views are only updated when shown, so update the new one.
+        self.__mark_changed()
 
     def set_view_to_interlaced(self):
         """ Sets the current view to interlaced. """
@@ -146,22 +291,39 @@ class VTKStereoInterlacedWindow(QtWidgets.QWidget):
         if right_image.shape[0] % 2 != 0:
             raise ValueError('right image does not have an even number of rows')
 
-        self.left_widget.set_video_image(left_image)
-        self.right_widget.set_video_image(right_image)
+        if self.lean:
+            self.stereo_overlay.set_video_image(0, left_image)
+            self.stereo_overlay.set_video_image(1, right_image)
+            if self.stereo_overlay.tile_size != (left_image.shape[1],
+                                                 left_image.shape[0]):
+                self.stereo_overlay.GetRenderWindow().SetSize(
+                    2 * left_image.shape[1], left_image.shape[0])
+                self.stereo_overlay.update_layout()
+        else:
+            self.left_widget.set_video_image(left_image)
+            self.right_widget.set_video_image(right_image)
+        self.__mark_changed()
+
+    def __update_current_view(self):
+        """
+        Updates the interlaced or stacked image, only if that is the
+        current view. Others are updated when they are selected.
+        """
+        if self.viewer_index not in (2, 3):
+            return
         self.__update_left_right()
-        self.__update_interlaced()
-        self.__update_stacked()
+        if self.viewer_index == 2:
+            self.__update_interlaced()
+        else:
+            self.__update_stacked()
 
     def __update_left_right(self):
         """
         Update and grab current scene from left and right widgets.
         """
 
-        left = self.left_widget.convert_scene_to_numpy_array()
-        right = self.right_widget.convert_scene_to_numpy_array()
-
-        self.left_rescaled = cv2.resize(left, (0, 0), fx=1, fy=0.5)
-        self.right_rescaled = cv2.resize(right, (0, 0), fx=1, fy=0.5)
+        self.left_image = self.left_widget.convert_scene_to_numpy_array()
+        self.right_image = self.right_widget.convert_scene_to_numpy_array()
 
     def __update_interlaced(self):
         """
@@ -169,10 +331,9 @@ class VTKStereoInterlacedWindow(QtWidgets.QWidget):
         grabbing the current scene from those widgets, interlacing it and
         placing it as the background on the interlaced widget.
         """
-        self.interlaced = i.interlace_to_new(self.left_rescaled,
-                                             self.right_rescaled)
-
-        self.interlaced_widget.set_video_image(self.interlaced)
+        self.interlaced = _get_buffer(self.interlaced, self.left_image.shape)
+        interlace_to_buffer(self.left_image, self.right_image, self.interlaced)
+        self.interlaced_widget.set_video_image(self.interlaced, is_rgb=True)
 
     def __update_stacked(self):
         """
@@ -180,8 +341,11 @@ class VTKStereoInterlacedWindow(QtWidgets.QWidget):
         grabbing the current scene from those widgets, stacking it and
         placing it as the background on the stacked_stereo widget.
         """
-        stacked_image = i.stack_to_new(self.left_rescaled, self.right_rescaled)
-        self.stacked_stereo_widget.set_video_image(stacked_image)
+        self.stacked_image = _get_buffer(self.stacked_image,
+                                         self.left_image.shape)
+        stack_to_buffer(self.left_image, self.right_image, self.stacked_image)
+        self.stacked_stereo_widget.set_video_image(self.stacked_image,
+                                                   is_rgb=True)
 
     def set_camera_matrices(self, left_camera_matrix, right_camera_matrix):
         """
@@ -190,8 +354,13 @@ class VTKStereoInterlacedWindow(QtWidgets.QWidget):
         :param left_camera_matrix: numpy 3x3 ndarray containing fx, fy, cx, cy
         :param right_camera_matrix: numpy 3x3 ndarray containing fx, fy, cx, cy
         """
-        self.left_widget.set_camera_matrix(left_camera_matrix)
-        self.right_widget.set_camera_matrix(right_camera_matrix)
+        if self.lean:
+            self.stereo_overlay.set_camera_matrix(0, left_camera_matrix)
+            self.stereo_overlay.set_camera_matrix(1, right_camera_matrix)
+        else:
+            self.left_widget.set_camera_matrix(left_camera_matrix)
+            self.right_widget.set_camera_matrix(right_camera_matrix)
+        self.__mark_changed()
 
     def set_left_to_right(self, left_to_right):
         """
@@ -213,8 +382,13 @@ class VTKStereoInterlacedWindow(QtWidgets.QWidget):
         right_camera_to_world = cm.compute_right_camera_pose(
             self.left_camera_to_world, self.left_to_right)
 
-        self.left_widget.set_camera_pose(left_camera_to_world)
-        self.right_widget.set_camera_pose(right_camera_to_world)
+        if self.lean:
+            self.stereo_overlay.set_camera_pose(0, left_camera_to_world)
+            self.stereo_overlay.set_camera_pose(1, right_camera_to_world)
+        else:
+            self.left_widget.set_camera_pose(left_camera_to_world)
+            self.right_widget.set_camera_pose(right_camera_to_world)
+        self.__mark_changed()
 
     def add_vtk_models(self, models):
         """
@@ -224,8 +398,12 @@ class VTKStereoInterlacedWindow(QtWidgets.QWidget):
 
         :param models: vtk_base_model
         """
-        self.left_widget.add_vtk_models(models)
-        self.right_widget.add_vtk_models(models)
+        if self.lean:
+            self.stereo_overlay.add_vtk_models(models)
+        else:
+            self.left_widget.add_vtk_models(models)
+            self.right_widget.add_vtk_models(models)
+        self.__mark_changed()
 
     def add_vtk_actor(self, actor):
         """
@@ -233,21 +411,61 @@ class VTKStereoInterlacedWindow(QtWidgets.QWidget):
 
         :param actor: vtkActor
         """
-        self.left_widget.add_vtk_actor(actor)
-        self.right_widget.add_vtk_actor(actor)
+        if self.lean:
+            self.stereo_overlay.add_vtk_actor(actor)
+        else:
+            self.left_widget.add_vtk_actor(actor)
+            self.right_widget.add_vtk_actor(actor)
+        self.__mark_changed()
+
+    def __render_lean(self):
+        """
+        Renders left and right in one pass, composes the selected
+        view in numpy, and displays it.
+        """
+        views = self.stereo_overlay.get_viewport_images()
+        left, right = views[0], views[1]
+
+        if self.viewer_index == 0:
+            image = left
+        elif self.viewer_index == 1:
+            image = right
+        elif self.viewer_index == 2:
+            self.interlaced = _get_buffer(self.interlaced, left.shape)
+            image = interlace_to_buffer(left, right, self.interlaced)
+        else:
+            self.stacked_image = _get_buffer(self.stacked_image, left.shape)
+            image = stack_to_buffer(left, right, self.stacked_image)
+
+        # QImage does not copy, so keep a reference to the pixels.
+        self.displayed_image = np.ascontiguousarray(image)
+        q_image = QImage(self.displayed_image.data,
+                         self.displayed_image.shape[1],
+                         self.displayed_image.shape[0],
+                         self.displayed_image.strides[0],
+                         QImage.Format_RGB888)
+        self.display_widget.setPixmap(QPixmap.fromImage(q_image))
 
     def render(self):
         """
-        Calls Render on all 3 contained vtk_overlay_windows.
+        Renders the current view only. The interlaced and stacked views
+        render left and right, to compose them. Calls made while already
+        rendering, e.g. from a paintEvent triggered by this render,
+        are ignored.
         """
-        self.left_widget.Render()
-        self.right_widget.Render()
-        self.__update_interlaced()
-        self.interlaced_widget.Render()
-        self.__update_stacked()
-        self.stacked_stereo_widget.Render()
-
-        self.stacked.repaint()
+        if self.is_rendering:
+            return
+        self.is_rendering = True
+        self.is_dirty = False
+        try:
+            if self.lean:
+                self.__render_lean()
+            else:
+                self.__update_current_view()
+                self.stacked.currentWidget().Render()
+                self.stacked.repaint()
+        finally:
+            self.is_rendering = False
 
     def save_scene_to_file(self, file_name):
         """
@@ -257,4 +475,9 @@ class VTKStereoInterlacedWindow(QtWidgets.QWidget):
         """
         self.render()
 
+        if self.lean:
+            cv2.imwrite(file_name,
+                        cv2.cvtColor(self.displayed_image, cv2.COLOR_RGB2BGR))
+            return
+
         self.stacked.currentWidget().save_scene_to_file(file_name)
@@ -7,7 +7,6 @@ models of anatomy along with a laparoscopic ultrasound probe.
 
 import numpy as np
 import vtk
-import sksurgerycore.transforms.matrix as cmu
 import sksurgeryvtk.widgets.vtk_rendering_generator as rg
 import sksurgeryvtk.utils.matrix_utils as vmu
 
@@ -53,6 +52,7 @@ class VTKLUSSimulator(rg.VTKRenderingGenerator):
 
         self.reference_l2c = np.loadtxt(liver2camera_reference_file)
         self.reference_p2c = np.loadtxt(probe2camera_reference_file)
+        self.inverse_reference_l2c = np.linalg.inv(self.reference_l2c)
 
         self.cyl = vtk.vtkCylinderSource()
         self.cyl.SetResolution(88)
@@ -61,17 +61,20 @@ class VTKLUSSimulator(rg.VTKRenderingGenerator):
         self.cyl.SetCenter((0, self.cyl.GetHeight() / 2.0, 0))
         self.cyl.Update()
 
+        # The handle is rotated and offset by the actor matrix, computed
+        # in compute_pose, so the cylinder geometry is never re-filtered.
+        self.handle_offset = np.eye(4)
+        self.handle_offset[0][3] = 0.007877540588378196
+        self.handle_offset[1][3] = 36.24640712738037
+        self.handle_offset[2][3] = -3.8626091003417997
+
+        # Re-used by apply_pose, so each frame updates these in place.
         self.cyl_matrix = vtk.vtkMatrix4x4()
-        self.cyl_matrix.Identity()
-        self.cyl_trans = vtk.vtkTransform()
-        self.cyl_trans.SetMatrix(self.cyl_matrix)
-        self.cyl_transform_filter = vtk.vtkTransformPolyDataFilter()
-        self.cyl_transform_filter.SetInputData(self.cyl.GetOutput())
-        self.cyl_transform_filter.SetTransform(self.cyl_trans)
+        self.anatomy_matrix = vtk.vtkMatrix4x4()
+        self.probe_matrix = vtk.vtkMatrix4x4()
 
         self.cyl_mapper = vtk.vtkPolyDataMapper()
-        self.cyl_mapper.SetInputConnection(
-            self.cyl_transform_filter.GetOutputPort())
+        self.cyl_mapper.SetInputConnection(self.cyl.GetOutputPort())
         self.cyl_mapper.Update()
         self.cyl_actor = vtk.vtkActor()
         self.cyl_actor.SetMapper(self.cyl_mapper)
@@ -89,109 +92,129 @@ class VTKLUSSimulator(rg.VTKRenderingGenerator):
         self.set_clipping_range(clipping_range[0], clipping_range[1])
         self.setup_camera_extrinsics(camera_to_world, left_to_right)
 
-    def set_pose(self,
-                 anatomy_pose_params,
-                 probe_pose_params,
-                 angle_of_handle,
-                 anatomy_location=None
-                 ):
+    def _get_labelled_actors(self):
         """
-        This is the main method to call to setup the pose of all anatomy and
-        for the LUS probe, and the handle.
+        Adds the cylinder representing the probe handle to the 'probe'
+        label, so label images and masks include the handle.
 
-        You can then call get_image() to get the rendered image,
-        or call get_masks() to get a set of rendered masks,
-        and the relevant pose parameters for ML purposes.
-
-        The liver2camera and probe2camera are returned as 4x4 matrices.
-        This is because there are multiple different parameterisations
-        that the user might be working in. e.g. Euler angles, Rodrigues etc.
+        :return: dictionary of model name to list of vtkActor
+        """
+        labelled_actors = super()._get_labelled_actors()
+        labelled_actors['probe'].append(self.cyl_actor)
+        return labelled_actors
+
+    def compute_pose(self,
+                     anatomy_pose_params,
+                     probe_pose_params,
+                     angle_of_handle,
+                     anatomy_location=None
+                     ):
+        """
+        Computes the pose of the anatomy, LUS probe and handle, using
+        numpy only, without updating any actors or rendering. Use this if
+        you only need the matrices, e.g. to filter a large set of poses.
 
         :param anatomy_pose_params: [rx, ry, rz, tx, ty, tz] in deg/mm
         :param probe_pose_params: [rx, ry, rz, tx, ty, tz] in deg/mm
         :param angle_of_handle: angle in deg
         :param anatomy_location: [1x3] location of random point on liver surface
-        :return: [liver2camera4x4, probe2camera4x4, angle, anatomy_location1x3]
+        :return: (liver2camera4x4, probe2camera4x4, handle2camera4x4)
         """
         # The 'anatomy_location' picks a point on the surface and moves
         # the LUS probe to have it's centroid based there. This is in effect
         # updating the so-called 'reference' position of the probe.
         # Subsequent offsets in [rx, ry, rz, tx, ty, tz] are from this new posn.
-        p2c = self.reference_p2c
+        p2c = np.copy(self.reference_p2c)
 
         if anatomy_location is not None:
-            picked = np.zeros((4, 1))
-            picked[0][0] = anatomy_location[0]
-            picked[1][0] = anatomy_location[1]
-            picked[2][0] = anatomy_location[2]
-            picked[3][0] = 1
-            picked_point = self.reference_l2c @ picked
+            picked_point = self.reference_l2c[0:3, 0:3] @ anatomy_location \
+                + self.reference_l2c[0:3, 3]
 
             # This p2c then becomes the 'reference_probe2camera'.
-            p2c[0][3] = picked_point[0]
-            p2c[1][3] = picked_point[1]
-            p2c[2][3] = picked_point[2]
-
-        # First we can compute the angle of the handle.
-        # This applies directly to the data, as it comes out
-        # of the vtkTransformPolyDataFilter, before the actor transformation.
-        probe_offset = np.eye(4)
-        probe_offset[0][3] = 0.007877540588378196
-        probe_offset[1][3] = 36.24640712738037
-        probe_offset[2][3] = -3.8626091003417997
-        r_x = \
-            cmu.construct_rx_matrix(angle_of_handle, is_in_radians=False)
-        rotation_about_x = \
-            cmu.construct_rigid_transformation(r_x, np.zeros((3, 1)))
-        self.cyl_trans.SetMatrix(
-            vmu.create_vtk_matrix_from_numpy(probe_offset @ rotation_about_x))
-        self.cyl_transform_filter.Update()
+            p2c[0:3, 3] = picked_point
+
+        # Anatomy rotation, probe pose and handle rotation, all at once.
+        params = np.zeros((3, 6))
+        params[0, 0:3] = anatomy_pose_params[0:3]
+        params[1, :] = probe_pose_params
+        params[2, 0] = angle_of_handle
+        rotation_tx, probe_tx, rotation_about_x = \
+            vmu.create_matrices_from_array(params, is_in_radians=False)
 
         # Now we compute the transformation for the anatomy.
         # We assume that the anatomy has been normalised (zero-centred).
-        rotation_tx = vmu.create_matrix_from_list([anatomy_pose_params[0],
-                                                   anatomy_pose_params[1],
-                                                   anatomy_pose_params[2],
-                                                   0, 0, 0],
-                                                  is_in_radians=False)
-        translation_tx = vmu.create_matrix_from_list([0, 0, 0,
-                                                      anatomy_pose_params[3],
-                                                      anatomy_pose_params[4],
-                                                      anatomy_pose_params[5]],
-                                                     is_in_radians=False)
-        anatomy_tx = translation_tx @ self.reference_l2c @ rotation_tx
-        full_anatomy_tx_vtk = \
-            vmu.create_vtk_matrix_from_numpy(anatomy_tx)
+        anatomy_tx = self.reference_l2c @ rotation_tx
+        anatomy_tx[0:3, 3] += anatomy_pose_params[3:6]
 
         # Now we compute the position of the probe.
         # We assume that the probe model has been normalised (zero-centred).
-        probe_tx = vmu.create_matrix_from_list(probe_pose_params,
-                                               is_in_radians=False)
-        p2l = np.linalg.inv(self.reference_l2c) @ p2c
-        probe_actor_tx = p2l @ probe_tx
+        p2l = self.inverse_reference_l2c @ p2c
+        full_probe_actor_tx = anatomy_tx @ p2l @ probe_tx
+
+        # The handle is offset from, and rotated about x, in probe space.
+        handle_tx = full_probe_actor_tx @ self.handle_offset @ rotation_about_x
 
-        full_probe_actor_tx = anatomy_tx @ probe_actor_tx
+        return anatomy_tx, full_probe_actor_tx, handle_tx
+
+    def apply_pose(self, liver2camera, probe2camera, handle2camera):
+        """
+        Applies the matrices from compute_pose to the actors,
+        updating the existing VTK matrices in place. Does not render.
+
+        :param liver2camera: 4x4 numpy ndarray, applied to all anatomy
+        :param probe2camera: 4x4 numpy ndarray, applied to the probe
+        :param handle2camera: 4x4 numpy ndarray, applied to the handle
+        """
+        full_anatomy_tx_vtk = \
+            vmu.copy_numpy_to_vtk_matrix(liver2camera, self.anatomy_matrix)
         full_probe_actor_tx_vtk = \
-            vmu.create_vtk_matrix_from_numpy(full_probe_actor_tx)
+            vmu.copy_numpy_to_vtk_matrix(probe2camera, self.probe_matrix)
+        handle_tx_vtk = \
+            vmu.copy_numpy_to_vtk_matrix(handle2camera, self.cyl_matrix)
 
         # This is where we apply transforms to each actor.
-        self.cyl_actor.PokeMatrix(full_probe_actor_tx_vtk)
-        probe_model = self.model_loader.get_surface_model('probe')
-        probe_model.actor.PokeMatrix(full_probe_actor_tx_vtk)
+        self.cyl_actor.PokeMatrix(handle_tx_vtk)
         for model in self.model_loader.get_surface_models():
             if model.get_name() != 'probe':
                 model.actor.PokeMatrix(full_anatomy_tx_vtk)
+            else:
+                model.actor.PokeMatrix(full_probe_actor_tx_vtk)
 
-        # Force re-render
-        self.overlay.Render()
-        self.repaint()
+    def set_pose(self,
+                 anatomy_pose_params,
+                 probe_pose_params,
+                 angle_of_handle,
+                 anatomy_location=None
+                 ):
+        """
+        This is the main method to call to setup the pose of all anatomy and
+        for the LUS probe, and the handle.
 
-        # Return parameters for final solution.
-        liver_model = self.model_loader.get_surface_model('liver')
-        final_l2c = \
-            vmu.create_numpy_matrix_from_vtk(liver_model.actor.GetMatrix())
-        probe_model = self.model_loader.get_surface_model('probe')
-        final_p2c = \
-            vmu.create_numpy_matrix_from_vtk(probe_model.actor.GetMatrix())
+        You can then call get_image() to get the rendered image,
+        or call get_masks() to get a set of rendered masks,
+        and the relevant pose parameters for ML purposes.
+
+        The liver2camera and probe2camera are returned as 4x4 matrices.
+        This is because there are multiple different parameterisations
+        that the user might be working in. e.g. Euler angles, Rodrigues etc.
+
+        This is equivalent to compute_pose(), apply_pose() then rendering.
+
+        :param anatomy_pose_params: [rx, ry, rz, tx, ty, tz] in deg/mm
+        :param probe_pose_params: [rx, ry, rz, tx, ty, tz] in deg/mm
+        :param angle_of_handle: angle in deg
+        :param anatomy_location: [1x3] location of random point on liver surface
+        :return: [liver2camera4x4, probe2camera4x4, angle, anatomy_location1x3]
+        """
+        final_l2c, final_p2c, handle_tx = self.compute_pose(
+            anatomy_pose_params,
+            probe_pose_params,
+            angle_of_handle,
+            anatomy_location)
+
+        self.apply_pose(final_l2c, final_p2c, handle_tx)
+
+        # Force re-render
+        self._render()
 
         return [final_l2c, final_p2c, angle_of_handle, anatomy_location]
@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module to render several calibrated camera views, each with their own
+video background, as tiled viewports of a single vtkRenderWindow.
+
+All viewports share the same actors, so geometry is only uploaded once,
+and all views are read back from the window in a single pixel transfer.
+
+Expected usage:
+
+::
+
+    overlay = VTKMultiViewportOverlay(3, tile_size=(960, 540))
+    overlay.add_vtk_models(list)               # shared by all viewports
+    for i in range(3):
+        overlay.set_video_image(i, images[i])  # np.ndarray, BGR
+        overlay.set_camera_matrix(i, intrinsics[i])
+        overlay.set_camera_pose(i, camera_to_worlds[i])
+    views = overlay.get_viewport_images()      # list of RGB np.ndarray
+"""
+
+# pylint: disable=too-many-instance-attributes, too-many-arguments
+import numpy as np
+import vtk
+from vtk.util.numpy_support import vtk_to_numpy
+
+import sksurgerycore.utilities.validate_matrix as vm
+import sksurgeryvtk.camera.vtk_camera_model as cm
+import sksurgeryvtk.utils.matrix_utils as mu
+
+
+class VTKOverlayViewport:
+    """
+    One viewport of a VTKMultiViewportOverlay, comprising a background
+    renderer showing a video image, and a calibrated foreground renderer.
+
+    :param clipping_range: Near/Far clipping range.
+    :param opencv_style: If True, adopts OpenCV convention, otherwise OpenGL.
+    """
+    def __init__(self, clipping_range=(1, 1000), opencv_style=True):
+
+        self.camera_matrix = None
+        self.camera_to_world = np.eye(4)
+        self.camera_to_world_vtk = vtk.vtkMatrix4x4()
+        self.clipping_range = clipping_range
+        self.opencv_style = opencv_style
+
+        # Pixel rectangle of this tile within the window, (x, y, w, h).
+        self.tile = (0, 0, 1, 1)
+
+        self.input = np.ones((400, 400, 3), dtype=np.uint8)
+        self.rgb_frame = np.copy(self.input[:, :, ::-1])
+        self.image_extent = (0, self.input.shape[1] - 1,
+                             0, self.input.shape[0] - 1, 0, 0)
+
+        self.image_importer = vtk.vtkImageImport()
+        self.image_importer.SetDataScalarTypeToUnsignedChar()
+        self.image_importer.SetNumberOfScalarComponents(3)
+        self.__import_frame()
+
+        self.background_actor = vtk.vtkImageActor()
+        self.background_actor.SetInputData(self.image_importer.GetOutput())
+        self.background_actor.VisibilityOff()
+        self.background_renderer = vtk.vtkRenderer()
+        self.background_renderer.SetLayer(0)
+        self.background_renderer.InteractiveOff()
+        self.background_renderer.AddActor(self.background_actor)
+        self.background_camera = self.background_renderer.GetActiveCamera()
+        self.background_camera.ParallelProjectionOn()
+
+        self.foreground_renderer = vtk.vtkRenderer()
+        self.foreground_renderer.SetLayer(1)
+        self.foreground_renderer.LightFollowCameraOn()
+
+    def __import_frame(self):
+        """
+        Points the image importer at the current RGB frame.
+        """
+        self.image_importer.SetImportVoidPointer(self.rgb_frame.data)
+        self.image_importer.SetDataExtent(self.image_extent)
+        self.image_importer.SetWholeExtent(self.image_extent)
+        self.image_importer.Modified()
+        self.image_importer.Update()
+
+    def set_video_image(self, input_image):
+        """
+        Sets the video image that is used for the background.
+
+        :param input_image: np.ndarray, BGR image.
+        :return: True if the image shape changed
+        """
+        if not isinstance(input_image, np.ndarray):
+            raise TypeError('Input is not an np.ndarray')
+
+        shape_changed = self.input.shape != input_image.shape
+        self.input = input_image
+        self.image_extent = (0, self.input.shape[1] - 1,
+                             0, self.input.shape[0] - 1, 0, 0)
+        self.rgb_frame = np.copy(self.input[:, :, ::-1])
+        self.__import_frame()
+        self.background_actor.VisibilityOn()
+        return shape_changed
+
+    def set_camera_matrix(self, camera_matrix):
+        """
+        Sets the camera intrinsics, used by update_cameras().
+
+        :param camera_matrix: numpy 3x3 ndarray containing fx, fy, cx, cy
+        """
+        vm.validate_camera_matrix(camera_matrix)
+        self.camera_matrix = np.asarray(camera_matrix, dtype=float)
+
+    def set_camera_pose(self, camera_to_world):
+        """
+        Sets the camera position and orientation, from a numpy 4x4 array.
+
+        :param camera_to_world: camera_to_world transform.
+        """
+        vm.validate_rigid_matrix(camera_to_world)
+        self.camera_to_world = camera_to_world
+        vtk_mat = mu.copy_numpy_to_vtk_matrix(camera_to_world,
+                                              self.camera_to_world_vtk)
+        cm.set_camera_pose(self.foreground_renderer.GetActiveCamera(),
+                           vtk_mat,
+                           self.opencv_style)
+
+    def update_cameras(self, window_width, window_height):
+        """
+        Sets the viewports of both renderers from self.tile, then
+        positions the background camera so the image fills the tile, and
+        if a camera_matrix is available, calibrates the foreground camera.
+
+        :param window_width: width of the whole render window in pixels
+        :param window_height: height of the whole render window in pixels
+        """
+        t_x, t_y, t_w, t_h = self.tile
+        self.background_renderer.SetViewport(t_x / window_width,
+                                             t_y / window_height,
+                                             (t_x + t_w) / window_width,
+                                             (t_y + t_h) / window_height)
+
+        i_w = self.input.shape[1]
+        i_h = self.input.shape[0]
+        if i_w / t_w > i_h / t_h:
+            scale = 0.5 * i_w * (t_h / t_w)
+        else:
+            scale = 0.5 * i_h
+        x_c = 0.5 * (i_w - 1)
+        y_c = 0.5 * (i_h - 1)
+        self.background_camera.SetFocalPoint(x_c, y_c, 0.0)
+        self.background_camera.SetPosition(x_c, y_c, -1000)
+        self.background_camera.SetViewUp(0.0, -1.0, 0.0)
+        self.background_camera.SetClippingRange(990, 1010)
+        self.background_camera.SetParallelScale(scale)
+
+        camera_matrix = self.camera_matrix
+        if camera_matrix is None:
+            self.foreground_renderer.SetViewport(
+                self.background_renderer.GetViewport())
+            return
+
+        vpx, vpy, vpw, vph = cm.compute_scissor(t_w, t_h, i_w, i_h, 1)
+        x_min, y_min, x_max, y_max = cm.compute_viewport(window_width,
+                                                         window_height,
+                                                         t_x + vpx,
+                                                         t_y + vpy,
+                                                         vpw,
+                                                         vph)
+        self.foreground_renderer.SetViewport(x_min, y_min, x_max, y_max)
+
+        vtk_cam = self.foreground_renderer.GetActiveCamera()
+        cm.set_camera_intrinsics(self.foreground_renderer,
+                                 vtk_cam,
+                                 i_w,
+                                 i_h,
+                                 camera_matrix[0][0],
+                                 camera_matrix[1][1],
+                                 camera_matrix[0][2],
+                                 camera_matrix[1][2],
+                                 self.clipping_range[0],
+                                 self.clipping_range[1])
+        vtk_cam.SetUseScissor(True)
+        vtk_cam.SetScissorRect(vtk.vtkRecti(t_x + vpx, t_y + vpy, vpw, vph))
+
+
+class VTKMultiViewportOverlay:
+    """
+    Hosts a number of VTKOverlayViewport's, tiled in a grid inside one
+    vtkRenderWindow. By default the window is created offscreen. To show
+    it in a GUI, pass in the render window of e.g. a
+    QVTKRenderWindowInteractor.
+
+    :param number_of_viewports: number of camera views, >= 1.
+    :param tile_size: (width, height) in pixels of each viewport.
+    :param grid: (rows, columns), defaults to a single row.
+    :param render_window: optional vtkRenderWindow to render into.
+    :param clipping_range: Near/Far clipping range.
+    :param opencv_style: If True, adopts OpenCV convention, otherwise OpenGL.
+    :param max_peels: Maximum number of depth peels, 0 to disable peeling.
+    """
+    # pylint: disable=invalid-name
+    def __init__(self,
+                 number_of_viewports,
+                 tile_size=(400, 400),
+                 grid=None,
+                 render_window=None,
+                 clipping_range=(1, 1000),
+                 opencv_style=True,
+                 max_peels=100
+                 ):
+        if number_of_viewports < 1:
+            raise ValueError('number_of_viewports should be >= 1')
+        if grid is None:
+            grid = (1, number_of_viewports)
+        if grid[0] * grid[1] < number_of_viewports:
+            raise ValueError('Grid is too small for number of viewports')
+
+        self.grid = grid
+        self.tile_size = tile_size
+        self.output = None
+
+        if render_window is None:
+            render_window = vtk.vtkRenderWindow()
+            render_window.SetOffScreenRendering(1)
+        self.render_window = render_window
+        self.render_window.AlphaBitPlanesOn()
+        self.render_window.SetMultiSamples(0)
+        self.render_window.SetNumberOfLayers(2)
+        self.render_window.SetSize(tile_size[0] * grid[1],
+                                   tile_size[1] * grid[0])
+
+        self.viewports = []
+        for _ in range(number_of_viewports):
+            viewport = VTKOverlayViewport(clipping_range, opencv_style)
+            if max_peels > 0:
+                viewport.foreground_renderer.UseDepthPeelingOn()
+                viewport.foreground_renderer.SetMaximumNumberOfPeels(
+                    max_peels)
+                viewport.foreground_renderer.SetOcclusionRatio(0.1)
+            self.render_window.AddRenderer(viewport.background_renderer)
+            self.render_window.AddRenderer(viewport.foreground_renderer)
+            self.viewports.append(viewport)
+
+        self.window_to_image = vtk.vtkWindowToImageFilter()
+        self.window_to_image.SetInput(self.render_window)
+        self.window_to_image.SetInputBufferTypeToRGB()
+        self.window_to_image.ReadFrontBufferOff()
+
+        self.update_layout()
+
+    def GetRenderWindow(self):
+        """
+        Returns the vtkRenderWindow containing all viewports.
+
+        :return: vtkRenderWindow
+        """
+        return self.render_window
+
+    def Render(self):
+        """
+        Renders all viewports.
+        """
+        self.render_window.Render()
+
+    def get_number_of_viewports(self):
+        """
+        Returns the number of viewports.
+        """
+        return len(self.viewports)
+
+    def get_viewport(self, index):
+        """
+        Returns a VTKOverlayViewport, e.g. to access its renderers.
+
+        :param index: viewport index
+        :return: VTKOverlayViewport
+        """
+        return self.viewports[index]
+
+    def update_layout(self):
+        """
+        Recomputes each tile from the current window size,
+        and updates the background and foreground cameras.
+        Call this if you resize the render window yourself.
+        """
+        width, height = self.render_window.GetSize()
+        tile_w = width // self.grid[1]
+        tile_h = height // self.grid[0]
+        self.tile_size = (tile_w, tile_h)
+
+        for index, viewport in enumerate(self.viewports):
+            row = index // self.grid[1]
+            col = index % self.grid[1]
+            # VTK counts rows from the bottom of the window.
+            viewport.tile = (col * tile_w,
+                             (self.grid[0] - 1 - row) * tile_h,
+                             tile_w,
+                             tile_h)
+            viewport.update_cameras(width, height)
+
+    def set_video_image(self, index, input_image):
+        """
+        Sets the background video image of one viewport.
+
+        :param index: viewport index
+        :param input_image: np.ndarray, BGR image
+        """
+        viewport = self.viewports[index]
+        if viewport.set_video_image(input_image):
+            viewport.update_cameras(*self.render_window.GetSize())
+
+    def set_camera_matrix(self, index, camera_matrix):
+        """
+        Sets the camera intrinsics of one viewport.
+
+        :param index: viewport index
+        :param camera_matrix: numpy 3x3 ndarray containing fx, fy, cx, cy
+        """
+        viewport = self.viewports[index]
+        viewport.set_camera_matrix(camera_matrix)
+        viewport.update_cameras(*self.render_window.GetSize())
+
+    def set_camera_pose(self, index, camera_to_world):
+        """
+        Sets the camera pose of one viewport.
+
+        :param index: viewport index
+        :param camera_to_world: 4x4 numpy ndarray, rigid transform
+        """
+        self.viewports[index].set_camera_pose(camera_to_world)
+
+    def add_vtk_models(self, models):
+        """
+        Adds VTK models to the foreground of every viewport.
+        Here, a 'VTK model' is any object that has an attribute called actor
+        that is a vtkActor.
+
+        :param models: list of VTK models.
+        """
+        for model in models:
+            self.add_vtk_actor(model.actor)
+
+    def add_vtk_actor(self, actor):
+        """
+        Adds a vtkActor to the foreground of every viewport. The same
+        actor is shared, so its geometry is only uploaded once.
+
+        :param actor: vtkActor
+        """
+        for viewport in self.viewports:
+            viewport.foreground_renderer.AddActor(actor)
+
+    def convert_scene_to_numpy_array(self):
+        """
+        Renders and reads back the whole window, containing all viewports,
+        in one pixel transfer.
+
+        :return: RGB numpy ndarray of the whole window
+        """
+        self.window_to_image.Modified()
+        self.window_to_image.Update()
+        vtk_image = self.window_to_image.GetOutput()
+        width, height, _ = vtk_image.GetDimensions()
+        vtk_array = vtk_image.GetPointData().GetScalars()
+        np_array = vtk_to_numpy(vtk_array).reshape(
+            height, width, vtk_array.GetNumberOfComponents())
+        self.output = np.flipud(np_array)
+        return self.output
+
+    def get_viewport_images(self):
+        """
+        Renders all viewports, and returns one image per viewport, copied
+        from a single read back of the whole window. The read back re-uses
+        VTK's buffer on the next render, so the tiles are copies, not views.
+
+        :return: list of RGB numpy ndarray, one per viewport
+        """
+        full = self.convert_scene_to_numpy_array()
+        height = full.shape[0]
+        images = []
+        for viewport in self.viewports:
+            t_x, t_y, t_w, t_h = viewport.tile
+            top = height - (t_y + t_h)
+            images.append(full[top:top + t_h, t_x:t_x + t_w].copy())
+        return images
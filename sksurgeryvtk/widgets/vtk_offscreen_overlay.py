@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module to provide a VTK overlay scene, rendered offscreen with no Qt
+dependency, e.g. for headless data generation on a cluster.
+
+Expected usage:
+
+::
+
+    overlay = VTKOffscreenOverlay(1920, 1080)
+    overlay.add_vtk_models(list)       # list of VTK models
+    overlay.set_video_image(image)     # np.ndarray, BGR
+    overlay.set_camera_matrix(ndarray) # Set 3x3 ndarray of camera matrix
+    overlay.set_camera_pose(camera_to_world) # set 4x4 ndarray
+    rendered = overlay.convert_scene_to_numpy_array()
+
+Note: VTK must be able to create an offscreen context without a display,
+e.g. when built with OSMesa or EGL.
+"""
+
+import vtk
+import sksurgeryvtk.widgets.vtk_overlay_base as ob
+
+
+class VTKOffscreenOverlay(ob.VTKOverlayBase):
+    """
+    Provides the same layers, camera calibration and video background
+    as VTKOverlayWindow, but using a plain offscreen vtkRenderWindow,
+    so no QApplication, widget or event loop is needed.
+
+    :param width: width of the render window in pixels.
+    :param height: height of the render window in pixels.
+    :param camera_matrix: Camera extrinsics matrix.
+    :param clipping_range: Near/Far clipping range.
+    :param zbuffer: if True, will only render zbuffer of main renderer.
+    :param opencv_style: If True, adopts OpenCV convention, otherwise OpenGL.
+    :param init_pose: If True, will initialise the camera pose to identity.
+    :param reset_camera: If True, resets camera when a new model is added.
+    :param transparency: see VTKOverlayBase.
+    :param max_peels: Maximum number of depth peels.
+    :param occlusion_ratio: Depth peeling occlusion ratio, 0 is exact.
+    :param target_frame_time: see VTKOverlayBase.
+    """
+    # pylint: disable=too-many-arguments, invalid-name
+    def __init__(self,
+                 width=400,
+                 height=400,
+                 camera_matrix=None,
+                 clipping_range=(1, 1000),
+                 zbuffer=False,
+                 opencv_style=True,
+                 init_pose=False,
+                 reset_camera=True,
+                 transparency='depth_peeling',
+                 max_peels=100,
+                 occlusion_ratio=0.1,
+                 target_frame_time=None
+                ):
+        """
+        Constructs a new VTKOffscreenOverlay.
+        """
+        if width < 1 or height < 1:
+            raise ValueError('Width and height should be >= 1')
+
+        self.render_window = vtk.vtkRenderWindow()
+        self.render_window.SetOffScreenRendering(1)
+        self.render_window.SetSize(int(width), int(height))
+
+        super().__init__(camera_matrix=camera_matrix,
+                         clipping_range=clipping_range,
+                         zbuffer=zbuffer,
+                         opencv_style=opencv_style,
+                         init_pose=init_pose,
+                         reset_camera=reset_camera,
+                         transparency=transparency,
+                         max_peels=max_peels,
+                         occlusion_ratio=occlusion_ratio,
+                         target_frame_time=target_frame_time)
+
+        self._update_video_image_camera()
+        self._update_projection_matrix()
+
+    def GetRenderWindow(self):
+        """
+        Returns the offscreen vtkRenderWindow.
+
+        :return: vtkRenderWindow
+        """
+        return self.render_window
+
+    def Render(self):
+        """
+        Renders the scene immediately.
+        """
+        self.render_window.Render()
+
+    def width(self):
+        """
+        Returns the render window width in pixels.
+        """
+        return self.render_window.GetSize()[0]
+
+    def height(self):
+        """
+        Returns the render window height in pixels.
+        """
+        return self.render_window.GetSize()[1]
+
+    def resize(self, width, height):
+        """
+        Resizes the render window, and updates the background and
+        calibrated foreground cameras accordingly.
+
+        :param width: width in pixels
+        :param height: height in pixels
+        """
+        if width < 1 or height < 1:
+            raise ValueError('Width and height should be >= 1')
+
+        self.render_window.SetSize(int(width), int(height))
+        self._update_video_image_camera()
+        self._update_projection_matrix()
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module to provide a rendering generator for test data generation
+that renders offscreen, with no Qt dependency.
+"""
+
+import sksurgeryvtk.widgets.vtk_rendering_generator_base as rgb
+
+
+class VTKOffscreenRenderingGenerator(rgb.VTKRenderingGeneratorBase):
+    """
+    Same as VTKRenderingGenerator, but renders into a VTKOffscreenOverlay
+    the same size as the background image, so no QApplication or
+    display is needed, e.g. for batch processing on a cluster.
+
+    :param camera_to_world: list of [rx,ry,rz,tx,ty,tz] in degrees/millimetres
+    :param left_to_right: list of [rx,ry,rz,tx,ty,tz] in degrees/millimetres
+    """
@@ -0,0 +1,775 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module to provide the VTK scene setup shared by the overlay windows,
+i.e. a video image in the background, a calibrated VTK scene in the
+foreground and a generic overlay layer on top, independent of any GUI
+toolkit.
+"""
+
+# pylint: disable=too-many-instance-attributes, no-member
+import logging
+import numpy as np
+import cv2
+import vtk
+from vtk.util.numpy_support import vtk_to_numpy
+
+import sksurgerycore.utilities.validate_matrix as vm
+import sksurgeryvtk.camera.vtk_camera_model as cm
+import sksurgeryvtk.camera.vtk_camera_state as cs
+import sksurgeryvtk.utils.matrix_utils as mu
+import sksurgeryvtk.widgets.vtk_overlay_stereo as vos
+
+LOGGER = logging.getLogger(__name__)
+
+TRANSPARENCY_MODES = ['depth_peeling', 'order_independent', 'auto', 'off']
+
+
+class VTKOverlayBase(vos.VTKOverlayStereoMixin):
+    """
+    Base class containing the VTK pipeline of an overlay window. Internally,
+    the window has 3 renderers. The background renderer displays
+    the video image in the background. The foreground renderer
+    displays a VTK scene overlaid on the background. If you make your
+    VTK models semi-transparent you get a merging effect.
+    An additional rendering layer is just for overlays
+    like picture-in-picture ultrasound. VTK's native stereo is provided
+    by VTKOverlayStereoMixin.
+
+    Derived classes must provide GetRenderWindow(), Render(),
+    width() and height(), and must create the render window before
+    calling this constructor.
+
+    :param camera_matrix: Camera extrinsics matrix.
+    :param clipping_range: Near/Far clipping range.
+    :param zbuffer: if True, will only render zbuffer of main renderer.
+    :param opencv_style: If True, adopts OpenCV convention, otherwise OpenGL.
+    :param init_pose: If True, will initialise the camera pose to identity.
+    :param reset_camera: If True, resets camera when a new model is added.
+    :param transparency: One of 'depth_peeling' (default),
+        'order_independent', 'auto' (depth peeling only when a foreground
+        model is translucent) or 'off'.
+    :param max_peels: Maximum number of depth peels.
+    :param occlusion_ratio: Depth peeling occlusion ratio, 0 is exact.
+    :param target_frame_time: If set (seconds), the number of peels is
+        adapted to keep the foreground render time below this target.
+    """
+    # pylint: disable=too-many-arguments, too-many-statements
+    def __init__(self,
+                 camera_matrix=None,
+                 clipping_range=(1, 1000),
+                 zbuffer=False,
+                 opencv_style=True,
+                 init_pose=False,
+                 reset_camera=True,
+                 transparency='depth_peeling',
+                 max_peels=100,
+                 occlusion_ratio=0.1,
+                 target_frame_time=None
+                ):
+        """
+        Sets up the renderers, and adds them to self.GetRenderWindow().
+        """
+        self.camera_matrix = camera_matrix
+        self.camera_to_world = np.eye(4)
+        self.camera_to_world_vtk = vtk.vtkMatrix4x4()
+        self.clipping_range = clipping_range
+        self.aspect_ratio = 1
+        self.zbuffer = zbuffer
+        self.reset_camera = reset_camera
+        self.opencv_style = opencv_style
+
+        self.input = np.ones((400, 400, 3), dtype=np.uint8)
+        self.rgb_frame = None
+
+        # VTK objects initialised later
+        self.foreground_renderer = None
+        self.image_importer = None
+        self.background_shape = None
+        self.image_importer = None
+        self.image_extent = None
+        self.background_actor = None
+        self.background_renderer = None
+        self.background_camera = None
+        self.output = None
+        self.output_halved = None
+        self.vtk_image = None
+        self.vtk_array = None
+        self.window_to_image = None
+        self.window_to_image_output = None
+        self.depth_reader = None
+        self.transparency = None
+        self.max_peels = max_peels
+        self.occlusion_ratio = occlusion_ratio
+        self.min_peels = 4
+        self.target_frame_time = None
+        self.oit_pass = None
+
+        # Native stereo, see VTKOverlayStereoMixin.
+        self.stereo_mode = 'off'
+        self.right_camera_matrix = None
+        self.left_to_right = np.eye(4)
+        self.right_camera_to_world_vtk = vtk.vtkMatrix4x4()
+        self.left_rgb_frame = None
+        self.right_rgb_frame = None
+
+        # Cache keys for background/foreground camera setup, and counters
+        # of how often the cameras were actually (re)configured.
+        self.video_camera_key = None
+        self.projection_key = None
+        self.projection_matrices = (None, None)
+        self.video_camera_update_count = 0
+        self.projection_update_count = 0
+
+        # Cached projection of each eye, keyed by is_left, for native
+        # stereo, and the key of the one currently set on the camera.
+        self.stereo_projections = {}
+        self.stereo_projection_key = None
+        self.stereo_projection_update_count = 0
+
+        # Enable VTK Depth peeling settings for render window.
+        self.GetRenderWindow().AlphaBitPlanesOn()
+        self.GetRenderWindow().SetMultiSamples(0)
+
+        # Three layers used, one for the background, one for VTK models,
+        # and one for other overlay (e.g. text)
+        self.GetRenderWindow().SetNumberOfLayers(3)
+
+        # Use an image importer to import the video image.
+        self.background_shape = self.input.shape
+        self.image_extent = (0, self.background_shape[1] - 1,
+                             0, self.background_shape[0] - 1, 0, 0)
+        self.image_importer = vtk.vtkImageImport()
+        self.image_importer.SetDataScalarTypeToUnsignedChar()
+        self.image_importer.SetNumberOfScalarComponents(3)
+        self.image_importer.SetDataExtent(self.image_extent)
+        self.image_importer.SetWholeExtent(self.image_extent)
+
+        self.set_video_image(self.input)
+
+        # Create and setup background (video) renderer.
+        self.background_actor = vtk.vtkImageActor()
+        self.background_actor.SetInputData(self.image_importer.GetOutput())
+        self.background_actor.VisibilityOff()
+        self.background_renderer = vtk.vtkRenderer()
+        self.background_renderer.SetLayer(0)
+        self.background_renderer.InteractiveOff()
+        self.background_renderer.AddActor(self.background_actor)
+        self.background_camera = self.background_renderer.GetActiveCamera()
+        self.background_camera.ParallelProjectionOn()
+        self.background_renderer.AddObserver('StartEvent',
+                                             self._on_background_start)
+
+        # Create and setup foreground (VTK scene) renderer.
+        self.foreground_renderer = vtk.vtkRenderer()
+        self.foreground_renderer.SetLayer(1)
+        self.foreground_renderer.LightFollowCameraOn()
+        self.foreground_renderer.AddObserver('StartEvent',
+                                             self._on_foreground_start)
+        self.foreground_renderer.AddObserver('EndEvent',
+                                             self._on_foreground_end)
+        self.set_transparency(transparency, max_peels, occlusion_ratio)
+        self.set_adaptive_transparency(target_frame_time)
+
+        # Crate and setup generic overlay renderer.
+        self.generic_overlay_renderer = vtk.vtkRenderer()
+        self.generic_overlay_renderer.SetLayer(2)
+
+        # Hook VTK world up to window
+        # The ordering of these statements is important. If we want the
+        # be able to move the camera around the foreground (or move the)
+        # foreground objects using RenderWindowInteractor, the forground
+        # should be added last.
+        if not self.zbuffer:
+            self.GetRenderWindow().AddRenderer(self.background_renderer)
+            self.GetRenderWindow().AddRenderer(self.generic_overlay_renderer)
+            self.GetRenderWindow().AddRenderer(self.foreground_renderer)
+        else:
+            self.GetRenderWindow().AddRenderer(self.foreground_renderer)
+
+        # Set default position to origin.
+        if init_pose:
+            default_pose = np.eye(4)
+            self.set_camera_pose(default_pose)
+
+    def set_video_image(self, input_image, is_rgb=False):
+        """
+        Set the video image that is used for the background.
+
+        If is_rgb is True, and the image is contiguous uint8, it is used
+        directly, without a copy, so the caller must not re-allocate it,
+        but may update it in place and call this method again.
+
+        :param input_image: np.ndarray, BGR, or RGB if is_rgb is True
+        :param is_rgb: True if input_image is already RGB
+        """
+        if not isinstance(input_image, np.ndarray):
+            raise TypeError('Input is not an np.ndarray')
+
+        if self.input.shape != input_image.shape:
+            self.background_actor.VisibilityOn()
+            self.background_shape = input_image.shape
+            self.image_extent = (0, self.background_shape[1] - 1,
+                                 0, self.background_shape[0] - 1, 0, 0)
+            self.image_importer.SetDataExtent(self.image_extent)
+            self.image_importer.SetWholeExtent(self.image_extent)
+            self._update_video_image_camera()
+            self._update_projection_matrix()
+
+        self.input = input_image
+        if is_rgb and self.input.dtype == np.uint8 \
+                and self.input.flags['C_CONTIGUOUS']:
+            self.rgb_frame = self.input
+        elif is_rgb:
+            self.rgb_frame = np.ascontiguousarray(self.input, dtype=np.uint8)
+        else:
+            self.rgb_frame = np.copy(self.input[:, :, ::-1])
+        self.image_importer.SetImportVoidPointer(self.rgb_frame.data)
+        self.image_importer.SetDataExtent(self.image_extent)
+        self.image_importer.SetWholeExtent(self.image_extent)
+        self.image_importer.Modified()
+        self.image_importer.Update()
+
+    def _update_video_image_camera(self):
+        """
+        Position the background renderer camera, so that the video image
+        is maximised and centralised in the screen. Does nothing if the
+        window size and image extent are unchanged since the last call.
+        """
+        key = (self.width(), self.height(), self.image_extent)
+        if key == self.video_camera_key:
+            return
+        self.video_camera_key = key
+        self.video_camera_update_count += 1
+
+        self.background_camera = self.background_renderer.GetActiveCamera()
+
+        origin = (0, 0, 0)
+        spacing = (1, 1, 1)
+
+        # Works out the number of millimetres to the centre of the image.
+        x_c = origin[0] + 0.5 * (self.image_extent[0] +
+                                 self.image_extent[1]) * spacing[0]
+        y_c = origin[1] + 0.5 * (self.image_extent[2] +
+                                 self.image_extent[3]) * spacing[1]
+
+        # Works out the total size of the image in millimetres.
+        i_w = (self.image_extent[1] - self.image_extent[0] + 1) * spacing[0]
+        i_h = (self.image_extent[3] - self.image_extent[2] + 1) * spacing[1]
+
+        # Works out the ratio of required size to actual size.
+        w_r = i_w / self.width()
+        h_r = i_h / self.height()
+
+        # Then you adjust scale differently depending on whether the
+        # screen is predominantly wider than your image, or taller.
+        if w_r > h_r:
+            scale = 0.5 * i_w * (self.height() / self.width())
+        else:
+            scale = 0.5 * i_h
+
+        self.background_camera.SetFocalPoint(x_c, y_c, 0.0)
+        self.background_camera.SetPosition(x_c, y_c, -1000)
+        self.background_camera.SetViewUp(0.0, -1.0, 0.0)
+        self.background_camera.SetClippingRange(990, 1010)
+        self.background_camera.SetParallelProjection(True)
+        self.background_camera.SetParallelScale(scale)
+
+    def _update_projection_matrix(self):
+        """
+        If a camera_matrix is available, then we are using a calibrated camera.
+        This method recomputes the projection matrix, dependent on window size.
+        The result is cached, so nothing is recomputed if the window size,
+        image size, intrinsics and clipping range are unchanged.
+
+        :return: opengl_mat, vtk_mat as from set_camera_intrinsics
+        """
+        opengl_mat = None
+        vtk_mat = None
+
+        if self.camera_matrix is not None:
+
+            if self.input is None:
+                raise ValueError('Camera matrix is provided, but no image.')
+
+            key = (self.width(),
+                   self.height(),
+                   self.input.shape[1],
+                   self.input.shape[0],
+                   float(self.camera_matrix[0][0]),
+                   float(self.camera_matrix[1][1]),
+                   float(self.camera_matrix[0][2]),
+                   float(self.camera_matrix[1][2]),
+                   float(self.clipping_range[0]),
+                   float(self.clipping_range[1]),
+                   self.aspect_ratio)
+
+            if key == self.projection_key:
+                return self.projection_matrices
+
+            self.projection_update_count += 1
+            self.stereo_projection_key = None
+
+            vtk_ren = self.get_foreground_renderer()
+            vtk_cam = self.get_foreground_camera()
+
+            opengl_mat, vtk_mat = \
+                cm.set_camera_intrinsics(vtk_ren,
+                                         vtk_cam,
+                                         self.input.shape[1],
+                                         self.input.shape[0],
+                                         self.camera_matrix[0][0],
+                                         self.camera_matrix[1][1],
+                                         self.camera_matrix[0][2],
+                                         self.camera_matrix[1][2],
+                                         self.clipping_range[0],
+                                         self.clipping_range[1]
+                                         )
+
+            vpx, vpy, vpw, vph = cm.compute_scissor(self.width(),
+                                                    self.height(),
+                                                    self.input.shape[1],
+                                                    self.input.shape[0],
+                                                    self.aspect_ratio
+                                                    )
+
+            x_min, y_min, x_max, y_max = cm.compute_viewport(self.width(),
+                                                             self.height(),
+                                                             vpx,
+                                                             vpy,
+                                                             vpw,
+                                                             vph
+                                                             )
+
+            self.get_foreground_renderer().SetViewport(x_min,
+                                                       y_min,
+                                                       x_max,
+                                                       y_max)
+
+            vtk_rect = vtk.vtkRecti(vpx, vpy, vpw, vph)
+            vtk_cam.SetUseScissor(True)
+            vtk_cam.SetScissorRect(vtk_rect)
+
+            self.projection_key = key
+            self.projection_matrices = (opengl_mat, vtk_mat)
+
+        return opengl_mat, vtk_mat
+
+    def reset_camera_cache(self):
+        """
+        Forces the next update to recompute the background and foreground
+        camera setup, e.g. if you have modified the cameras directly.
+        """
+        self.video_camera_key = None
+        self.projection_key = None
+        self.projection_matrices = (None, None)
+        self.stereo_projections = {}
+        self.stereo_projection_key = None
+
+    def set_camera_matrix(self, camera_matrix):
+        """
+        Sets the camera projection matrix from a numpy 3x3 array.
+        :param camera_matrix: numpy 3x3 ndarray containing fx, fy, cx, cy
+        """
+        vm.validate_camera_matrix(camera_matrix)
+        self.camera_matrix = camera_matrix
+        opengl_mat, vtk_mat = self._update_projection_matrix()
+        self.Render()
+        return opengl_mat, vtk_mat
+
+    def set_camera_pose(self, camera_to_world, render=True):
+        """
+        Sets the camera position and orientation, from a numpy 4x4 array.
+        :param camera_to_world: camera_to_world transform.
+        :param render: if False, doesn't render, e.g. if the caller is
+            about to read back the scene, which renders anyway.
+        """
+        vm.validate_rigid_matrix(camera_to_world)
+        self.camera_to_world = camera_to_world
+        vtk_cam = self.get_foreground_camera()
+        vtk_mat = mu.copy_numpy_to_vtk_matrix(camera_to_world,
+                                              self.camera_to_world_vtk)
+        cm.set_camera_pose(vtk_cam, vtk_mat, self.opencv_style)
+        self._update_right_camera_pose()
+        if render:
+            self.Render()
+
+    def set_transparency(self, mode, max_peels=None, occlusion_ratio=None):
+        """
+        Sets how translucent geometry in the foreground renderer is handled.
+
+        Depth peeling is expensive, especially on software (Mesa) rendering,
+        so it can be replaced by order independent transparency, switched
+        off, or enabled only when a foreground model is translucent ('auto').
+
+        :param mode: one of 'depth_peeling', 'order_independent', 'auto', 'off'
+        :param max_peels: maximum number of peels, None to keep current value
+        :param occlusion_ratio: occlusion ratio, None to keep current value
+        :raises ValueError: if mode is not recognised
+        """
+        if mode not in TRANSPARENCY_MODES:
+            raise ValueError("Invalid transparency mode:" + str(mode))
+
+        if max_peels is not None:
+            if max_peels < 1:
+                raise ValueError("max_peels should be >= 1")
+            self.max_peels = int(max_peels)
+
+        if occlusion_ratio is not None:
+            if occlusion_ratio < 0 or occlusion_ratio > 0.5:
+                raise ValueError("occlusion_ratio should be [0-0.5]")
+            self.occlusion_ratio = occlusion_ratio
+
+        if mode == 'order_independent' and \
+                not hasattr(vtk, 'vtkOrderIndependentTranslucentPass'):
+            LOGGER.warning("Order independent transparency not available "
+                           "in this VTK, falling back to depth peeling.")
+            mode = 'depth_peeling'
+
+        self.transparency = mode
+        renderer = self.foreground_renderer
+        renderer.SetMaximumNumberOfPeels(self.max_peels)
+        renderer.SetOcclusionRatio(self.occlusion_ratio)
+
+        if mode == 'order_independent':
+            if self.oit_pass is None:
+                steps = vtk.vtkRenderStepsPass()
+                oit = vtk.vtkOrderIndependentTranslucentPass()
+                oit.SetTranslucentPass(steps.GetTranslucentPass())
+                steps.SetTranslucentPass(oit)
+                self.oit_pass = steps
+            renderer.UseDepthPeelingOff()
+            renderer.SetPass(self.oit_pass)
+        else:
+            renderer.SetPass(None)
+            renderer.SetUseDepthPeeling(mode != 'off')
+            self._update_auto_transparency()
+
+    def get_transparency(self):
+        """
+        Returns the current transparency mode.
+
+        :return: str, one of TRANSPARENCY_MODES
+        """
+        return self.transparency
+
+    def set_adaptive_transparency(self, target_frame_time, min_peels=4):
+        """
+        Enables/disables adaptive depth peeling. When enabled, the number
+        of peels is halved each time the foreground render takes longer
+        than target_frame_time, and doubled again (up to max_peels) when
+        rendering is comfortably fast. When mouse interaction finishes,
+        the full number of peels is restored.
+
+        :param target_frame_time: seconds, or None to disable
+        :param min_peels: lower limit for the number of peels
+        """
+        if target_frame_time is not None and target_frame_time <= 0:
+            raise ValueError("target_frame_time should be > 0")
+        if min_peels < 1:
+            raise ValueError("min_peels should be >= 1")
+
+        self.target_frame_time = target_frame_time
+        self.min_peels = int(min_peels)
+        self.foreground_renderer.SetMaximumNumberOfPeels(self.max_peels)
+
+    def _update_auto_transparency(self):
+        """
+        In 'auto' mode, only use depth peeling if a visible
+        foreground actor has translucent geometry.
+        """
+        if self.transparency != 'auto':
+            return
+
+        translucent = False
+        actors = self.foreground_renderer.GetActors()
+        actors.InitTraversal()
+        for _ in range(actors.GetNumberOfItems()):
+            actor = actors.GetNextActor()
+            if actor.GetVisibility() and \
+                    actor.HasTranslucentPolygonalGeometry():
+                translucent = True
+                break
+
+        self.foreground_renderer.SetUseDepthPeeling(translucent)
+
+    def _on_foreground_start(self, obj, event):
+        """
+        Observer, called before the foreground renderer renders.
+        """
+        # pylint: disable=unused-argument
+        self._update_auto_transparency()
+        if self.stereo_mode != 'off':
+            self._set_stereo_eye(
+                self.get_foreground_camera().GetLeftEye())
+
+    def _on_foreground_end(self, obj, event):
+        """
+        Observer, called after the foreground renderer renders,
+        to adapt the number of depth peels to the render time.
+        """
+        # pylint: disable=unused-argument
+        if self.stereo_mode != 'off' \
+                and not self.get_foreground_camera().GetLeftEye():
+            # Leave the camera at the left eye, between renders.
+            self._set_stereo_eye(True)
+
+        if self.target_frame_time is None \
+                or not self.foreground_renderer.GetUseDepthPeeling():
+            return
+
+        renderer = self.foreground_renderer
+        peels = renderer.GetMaximumNumberOfPeels()
+        render_time = renderer.GetLastRenderTimeInSeconds()
+
+        if render_time > self.target_frame_time and peels > self.min_peels:
+            renderer.SetMaximumNumberOfPeels(max(self.min_peels, peels // 2))
+        elif render_time < 0.5 * self.target_frame_time \
+                and peels < self.max_peels:
+            renderer.SetMaximumNumberOfPeels(min(self.max_peels, peels * 2))
+
+    def _on_end_interaction(self, obj, event):
+        """
+        Observer, called when the user stops interacting, so that we
+        restore full quality transparency while idle.
+        """
+        # pylint: disable=unused-argument
+        if self.target_frame_time is None:
+            return
+
+        renderer = self.foreground_renderer
+        if renderer.GetMaximumNumberOfPeels() != self.max_peels:
+            renderer.SetMaximumNumberOfPeels(self.max_peels)
+            self.Render()
+
+    def add_vtk_models(self, models, layer=1):
+        """
+        Add VTK models to a renderer.
+        Here, a 'VTK model' is any object that has an attribute called actor
+        that is a vtkActor.
+
+        :param models: list of VTK models.
+        :param layer:  Render layer to add to, default 1 (forground)
+        """
+
+        if layer == 0:
+            raise ValueError("You shouldn't add actors to the backgroud scene")
+
+        if layer == 1:
+            renderer = self.foreground_renderer
+
+        elif layer == 2:
+            renderer = self.generic_overlay_renderer
+
+        else:
+            raise ValueError("Invalid layer specified")
+
+        for model in models:
+            renderer.AddActor(model.actor)
+
+        if self.reset_camera:
+            self.__reset_camera(renderer)
+
+    def add_vtk_actor(self, actor, layer=1):
+        """
+        Add a vtkActor directly.
+
+        :param actor: vtkActor
+        :param layer: Render layer to add to, defualt 1(foreground)
+        """
+
+        if layer == 0:
+            raise ValueError("You shouldn't add actors to the backgroud scene")
+
+        if layer == 1:
+            renderer = self.foreground_renderer
+
+        elif layer == 2:
+            renderer = self.generic_overlay_renderer
+
+        else:
+            raise ValueError("Invalid layer specified")
+
+        renderer.AddActor(actor)
+
+        if self.reset_camera:
+            self.__reset_camera(renderer)
+
+    def __reset_camera(self, renderer):
+        """
+        Resets the camera of renderer to show all actors. This also resets
+        the clipping range, so the cached camera setup is discarded, and
+        any calibrated projection re-applied.
+        """
+        renderer.ResetCamera()
+        self.reset_camera_cache()
+        self._update_projection_matrix()
+
+    def get_foreground_renderer(self):
+        """
+        Returns the foreground vtkRenderer.
+
+        :return: vtkRenderer
+        """
+        return self.foreground_renderer
+
+    def get_foreground_camera(self):
+        """
+        Returns the camera for the foreground renderer.
+
+        :returns: vtkCamera
+        """
+        return self.foreground_renderer.GetActiveCamera()
+
+    def set_foreground_camera(self, camera):
+        """
+        Set the foreground camera to track the view in another window.
+        """
+        self.foreground_renderer.SetActiveCamera(camera)
+        self.reset_camera_cache()
+
+    def convert_scene_to_numpy_array(self):
+        """
+        Convert the current window view to a numpy array.
+
+        :return output: Scene as numpy array
+        """
+        # The read back pipeline is created once and re-executed.
+        if self.window_to_image is None:
+            self.window_to_image = vtk.vtkWindowToImageFilter()
+            self.window_to_image.SetInput(self.GetRenderWindow())
+            if not self.zbuffer:
+                self.window_to_image.SetInputBufferTypeToRGB()
+                self.window_to_image_output = self.window_to_image
+            else:
+                self.window_to_image.SetInputBufferTypeToZBuffer()
+                vtk_scale = vtk.vtkImageShiftScale()
+                vtk_scale.SetInputConnection(
+                    self.window_to_image.GetOutputPort())
+                vtk_scale.SetOutputScalarTypeToUnsignedChar()
+                vtk_scale.SetShift(0)
+                vtk_scale.SetScale(-255)
+                self.window_to_image_output = vtk_scale
+
+        self.window_to_image.Modified()
+        self.window_to_image_output.Update()
+        self.vtk_image = self.window_to_image_output.GetOutput()
+
+        width, height, _ = self.vtk_image.GetDimensions()
+        self.vtk_array = self.vtk_image.GetPointData().GetScalars()
+        number_of_components = self.vtk_array.GetNumberOfComponents()
+
+        np_array = vtk_to_numpy(self.vtk_array).reshape(height,
+                                                        width,
+                                                        number_of_components)
+        self.output = cv2.flip(np_array, flipCode=0)
+        return self.output
+
+    def get_depth_image(self, render=True):
+        """
+        Renders the foreground, and reads its z-buffer, converted to distance
+        along the camera axis, in the units of the clipping range (typically
+        millimetres), for a perspective foreground camera. Pixels with no
+        geometry are set to 0.
+
+        The generic overlay layer clears the depth buffer, so it is switched
+        off for this render, which isn't swapped to the screen.
+
+        :param render: if False, reads the z-buffer of the last render,
+            which must have been done with the generic overlay layer off
+        :return: [H x W] float32 numpy ndarray
+        """
+        render_window = self.GetRenderWindow()
+        if self.depth_reader is None:
+            self.depth_reader = vtk.vtkWindowToImageFilter()
+            self.depth_reader.SetInput(render_window)
+            self.depth_reader.SetInputBufferTypeToZBuffer()
+            self.depth_reader.ReadFrontBufferOff()
+            self.depth_reader.ShouldRerenderOff()
+
+        if render:
+            overlay_draw = self.generic_overlay_renderer.GetDraw()
+            swap_buffers = render_window.GetSwapBuffers()
+            self.generic_overlay_renderer.DrawOff()
+            render_window.SwapBuffersOff()
+            try:
+                render_window.Render()
+            finally:
+                self.generic_overlay_renderer.SetDraw(overlay_draw)
+                render_window.SetSwapBuffers(swap_buffers)
+
+        self.depth_reader.Modified()
+        self.depth_reader.Update()
+
+        vtk_image = self.depth_reader.GetOutput()
+        width, height, _ = vtk_image.GetDimensions()
+        z_buffer = vtk_to_numpy(vtk_image.GetPointData().GetScalars())
+        z_buffer = np.flipud(z_buffer.reshape(height, width))
+
+        near, far = self.get_foreground_camera().GetClippingRange()
+        z_ndc = 2.0 * z_buffer - 1.0
+        depth = (2.0 * near * far) / (far + near - z_ndc * (far - near))
+        depth[z_buffer >= 1.0] = 0
+        return depth.astype(np.float32)
+
+    def save_scene_to_file(self, file_name):
+        """
+        Save's the current screen to file.
+        VTK works in RGB, but OpenCV assumes BGR, so swap the colour
+        space before saving to file.
+        :param file_name: must be compatible with cv2.imwrite()
+        """
+        self.convert_scene_to_numpy_array()
+        self.output = cv2.cvtColor(self.output, cv2.COLOR_RGB2BGR)
+        cv2.imwrite(file_name, self.output)
+
+    def get_camera_state(self):
+        """
+        Get all the necessary variables to allow the camera
+        view to be restored.
+
+        :return: dict of property name to value
+        """
+        camera = self.get_foreground_camera()
+        camera_properties = {}
+
+        for camera_property, _ in cs.CAMERA_STATE_LAYOUT:
+            # e.g. camera.GetPosition(), camera.GetFocalPoint() etc.
+            camera_properties[camera_property] = \
+                getattr(camera, "Get" + camera_property)()
+
+        return camera_properties
+
+    def set_camera_state(self, camera_properties):
+        """
+        Set the camera properties to a particular view poisition/angle etc.
+
+        :param camera_properties: dict, as returned by get_camera_state
+        """
+        camera = self.get_foreground_camera()
+
+        for camera_property, value in camera_properties.items():
+            # e.g. camera.SetPosition(position), camera.SetFocalPoint(...)
+            getattr(camera, "Set" + camera_property)(value)
+
+        self.reset_camera_cache()
+
+    def get_camera_state_array(self, output=None):
+        """
+        Fast alternative to get_camera_state, returning the foreground
+        camera state as a fixed length array, see vtk_camera_state.
+
+        :param output: optional pre-allocated array to fill in
+        :return: 1D numpy ndarray
+        """
+        return cs.get_camera_state_array(self.get_foreground_camera(), output)
+
+    def set_camera_state_array(self, state):
+        """
+        Fast alternative to set_camera_state, taking an array
+        from get_camera_state_array.
+
+        :param state: 1D array, see vtk_camera_state
+        """
+        cs.set_camera_state_array(self.get_foreground_camera(), state)
+        self.reset_camera_cache()
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module to provide VTK's native stereo rendering for the overlay windows,
+as a mixin of VTKOverlayBase, so both eyes are drawn by one Render() call.
+"""
+
+import numpy as np
+
+import sksurgerycore.utilities.validate_matrix as vm
+import sksurgeryvtk.camera.vtk_camera_model as cm
+import sksurgeryvtk.utils.matrix_utils as mu
+
+STEREO_MODES = ['off', 'interlaced', 'side_by_side', 'red_blue',
+                'anaglyph', 'quad_buffer']
+
+
+class VTKOverlayStereoMixin:
+    """
+    Native stereo methods of VTKOverlayBase. The stereo state, e.g.
+    stereo_mode, left_to_right and the video frame of each eye, is
+    initialised by VTKOverlayBase, which also calls _set_stereo_eye()
+    and _update_right_camera_pose() as the camera and renderers change.
+    """
+    def _update_right_camera_pose(self):
+        """
+        Computes the right eye pose, for native stereo.
+        """
+        right_camera_to_world = cm.compute_right_camera_pose(
+            self.camera_to_world, self.left_to_right)
+        mu.copy_numpy_to_vtk_matrix(right_camera_to_world,
+                                    self.right_camera_to_world_vtk)
+
+    def set_stereo_mode(self, mode):
+        """
+        Switches on VTK's own stereo rendering, so one Render() call
+        draws both eyes into this window, with no read back.
+
+        Each eye is rendered with its own intrinsics and pose, see
+        set_stereo_camera_matrices(), set_stereo_left_to_right() and
+        set_stereo_video_images(). The camera pose, as set by
+        set_camera_pose(), is that of the left eye. As each eye's pose is
+        set on every render, interacting with the mouse has no effect.
+
+        'quad_buffer' needs a stereo capable OpenGL context, which usually
+        means the window must be created stereo capable.
+
+        :param mode: one of 'off', 'interlaced', 'side_by_side' (each eye
+            squeezed into half the width), 'red_blue', 'anaglyph',
+            'quad_buffer'
+        :raises ValueError: if mode is not recognised
+        """
+        if mode not in STEREO_MODES:
+            raise ValueError('Invalid stereo mode:' + str(mode))
+
+        self.stereo_mode = mode
+        window = self.GetRenderWindow()
+
+        if mode == 'off':
+            window.StereoRenderOff()
+            self._set_stereo_eye(True)
+            self.image_importer.SetImportVoidPointer(self.rgb_frame.data)
+            self.image_importer.Modified()
+            self.Render()
+            return
+
+        if mode == 'interlaced':
+            window.SetStereoTypeToInterlaced()
+        elif mode == 'side_by_side':
+            window.SetStereoTypeToSplitViewportHorizontal()
+        elif mode == 'red_blue':
+            window.SetStereoTypeToRedBlue()
+        elif mode == 'anaglyph':
+            window.SetStereoTypeToAnaglyph()
+        else:
+            window.SetStereoCapableWindow(1)
+            window.SetStereoTypeToCrystalEyes()
+
+        # Each eye has an explicit pose, so no extra rotation by VTK.
+        self.get_foreground_camera().SetEyeAngle(0)
+        self.background_camera.SetEyeAngle(0)
+        window.StereoRenderOn()
+        self.Render()
+
+    def get_stereo_mode(self):
+        """
+        Returns the current native stereo mode, see set_stereo_mode().
+        """
+        return self.stereo_mode
+
+    def set_stereo_camera_matrices(self, left_camera_matrix,
+                                   right_camera_matrix):
+        """
+        Sets the intrinsics of each eye, for native stereo.
+
+        :param left_camera_matrix: numpy 3x3 ndarray containing fx, fy, cx, cy
+        :param right_camera_matrix: numpy 3x3 ndarray containing fx, fy, cx, cy
+        """
+        vm.validate_camera_matrix(right_camera_matrix)
+        self.right_camera_matrix = right_camera_matrix
+        self.set_camera_matrix(left_camera_matrix)
+
+    def set_stereo_left_to_right(self, left_to_right):
+        """
+        Sets the left to right transform (stereo extrinsics),
+        for native stereo.
+
+        :param left_to_right: 4x4 numpy ndarray, rigid transform
+        """
+        vm.validate_rigid_matrix(left_to_right)
+        self.left_to_right = left_to_right
+        self._update_right_camera_pose()
+        self.Render()
+
+    def set_stereo_video_images(self, left_image, right_image):
+        """
+        Sets the video image of each eye, for native stereo.
+        Images must be the same shape.
+
+        :param left_image: np.ndarray, BGR image
+        :param right_image: np.ndarray, BGR image
+        """
+        if not isinstance(right_image, np.ndarray):
+            raise TypeError('Right image is not an np.ndarray')
+        if left_image.shape != right_image.shape:
+            raise ValueError('Left and right images differ in shape')
+
+        self.set_video_image(left_image)
+        self.left_rgb_frame = self.rgb_frame
+        self.right_rgb_frame = np.copy(right_image[:, :, ::-1])
+
+    def _set_stereo_eye(self, is_left):
+        """
+        Sets the foreground camera pose and intrinsics for one eye.
+        Each eye's projection is computed once, and stored, so it is
+        only recomputed if the window size, image size, intrinsics or
+        clipping range change.
+        """
+        vtk_cam = self.get_foreground_camera()
+        if is_left:
+            cm.set_camera_pose(vtk_cam, self.camera_to_world_vtk,
+                               self.opencv_style)
+            camera_matrix = self.camera_matrix
+        else:
+            cm.set_camera_pose(vtk_cam, self.right_camera_to_world_vtk,
+                               self.opencv_style)
+            camera_matrix = self.right_camera_matrix
+            if camera_matrix is None:
+                camera_matrix = self.camera_matrix
+
+        if camera_matrix is None:
+            return
+
+        renderer = self.foreground_renderer
+        key = (self.width(),
+               self.height(),
+               renderer.GetTiledAspectRatio(),
+               self.input.shape[1],
+               self.input.shape[0],
+               float(camera_matrix[0][0]),
+               float(camera_matrix[1][1]),
+               float(camera_matrix[0][2]),
+               float(camera_matrix[1][2]),
+               float(self.clipping_range[0]),
+               float(self.clipping_range[1]),
+               self.stereo_mode)
+
+        eye_key, projection = self.stereo_projections.get(is_left,
+                                                          (None, None))
+        if key != eye_key:
+            self.stereo_projection_update_count += 1
+            cm.set_camera_intrinsics(renderer,
+                                     vtk_cam,
+                                     self.input.shape[1],
+                                     self.input.shape[0],
+                                     camera_matrix[0][0],
+                                     camera_matrix[1][1],
+                                     camera_matrix[0][2],
+                                     camera_matrix[1][2],
+                                     self.clipping_range[0],
+                                     self.clipping_range[1])
+
+            # The scissor rectangle is in window pixels, so can't be
+            # used when VTK moves each eye into half the window.
+            vtk_cam.SetUseScissor(self.stereo_mode != 'side_by_side')
+
+            projection = (vtk_cam.GetClippingRange(),
+                          vtk_cam.GetWindowCenter(),
+                          vtk_cam.GetViewAngle(),
+                          vtk_cam.GetUserTransform(),
+                          vtk_cam.GetViewShear(),
+                          vtk_cam.GetUseScissor())
+            self.stereo_projections[is_left] = (key, projection)
+            self.stereo_projection_key = key
+            return
+
+        # Both eyes share one camera, so only swap in the stored
+        # projection if the camera has the other eye's.
+        if key == self.stereo_projection_key:
+            return
+        clipping_range, window_center, view_angle, user_transform, \
+            view_shear, use_scissor = projection
+        vtk_cam.SetClippingRange(clipping_range)
+        vtk_cam.SetWindowCenter(window_center[0], window_center[1])
+        vtk_cam.SetViewAngle(view_angle)
+        vtk_cam.SetUserTransform(user_transform)
+        vtk_cam.SetViewShear(view_shear)
+        vtk_cam.SetUseScissor(use_scissor)
+        self.stereo_projection_key = key
+
+    def _on_background_start(self, obj, event):
+        """
+        Observer, called before the background renderer renders, to
+        show the video image of the eye being rendered.
+        """
+        # pylint: disable=unused-argument
+        if self.stereo_mode == 'off' or self.right_rgb_frame is None \
+                or self.rgb_frame is not self.left_rgb_frame:
+            return
+
+        if self.background_camera.GetLeftEye():
+            frame = self.left_rgb_frame
+        else:
+            frame = self.right_rgb_frame
+        self.image_importer.SetImportVoidPointer(frame.data)
+        self.image_importer.Modified()
+        self.image_importer.Update()
+
+    def set_stereo_left(self):
+        """
+        Set the render window to left stereo view.
+        """
+        self.GetRenderWindow().SetStereoTypeToLeft()
+
+    def set_stereo_right(self):
+        """
+        Set the render window to right stereo view.
+        """
+        self.GetRenderWindow().SetStereoTypeToRight()
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module to render test data in parallel, using several worker processes,
+each holding its own VTKOffscreenRenderingGenerator.
+
+Expected usage:
+
+::
+
+    with VTKRenderPool(8, models_file, background_image, intrinsic_file) \\
+            as pool:
+        images, labels = pool.render(poses, labels=True)
+
+Images are returned to the calling process through shared memory,
+in the same order as the poses.
+"""
+
+# pylint: disable=too-many-instance-attributes, too-many-arguments
+
+import multiprocessing
+import queue
+import traceback
+import numpy as np
+import cv2
+import sksurgerycore.configuration.configuration_manager as config
+import sksurgeryvtk.utils.matrix_utils as mu
+import sksurgeryvtk.widgets.vtk_offscreen_rendering_generator as og
+
+# Seconds to wait for a result, before checking the workers are alive.
+RESULT_POLL_INTERVAL = 1.0
+
+
+def _render_worker(generator_args,
+                   generator_kwargs,
+                   image_buffer,
+                   label_buffer,
+                   buffer_shape,
+                   jobs,
+                   results):
+    """
+    Runs in each worker process. Creates a generator, then renders each
+    job into its slot of the shared buffers, until it receives None.
+    """
+    # pylint: disable=broad-except
+    try:
+        generator = og.VTKOffscreenRenderingGenerator(*generator_args,
+                                                      **generator_kwargs)
+    except Exception:
+        results.put((None, traceback.format_exc()))
+        return
+
+    images = np.frombuffer(image_buffer, dtype=np.uint8).reshape(
+        buffer_shape + (3,))
+    labels = np.frombuffer(label_buffer, dtype=np.uint16).reshape(
+        buffer_shape)
+    results.put((None, None))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        slot, pose, pose_type, with_labels = job
+        try:
+            generator.render_batch(pose[np.newaxis], pose_type,
+                                   output=images[slot:slot + 1])
+            if with_labels:
+                labels[slot] = generator.get_label_image()
+            results.put((slot, None))
+        except Exception:
+            results.put((slot, traceback.format_exc()))
+
+
+class VTKRenderPool:
+    """
+    Starts a number of worker processes, each with an offscreen rendering
+    generator built from the same models, background and intrinsics,
+    and distributes poses between them.
+
+    Worker processes are started with the 'spawn' method, as OpenGL
+    contexts can not safely be shared with forked processes.
+
+    :param number_of_workers: number of processes, e.g. number of CPU cores
+    :param models_file: JSON file describing VTK models, in SNAPPY format
+    :param background_image: RGB image to render in background
+    :param intrinsic_file: [3x3] matrix in text file, in numpy format
+    :param camera_to_world: list of [rx,ry,rz,tx,ty,tz] in degrees/millimetres
+    :param left_to_right: list of [rx,ry,rz,tx,ty,tz] in degrees/millimetres
+    :param gaussian_sigma: standard deviation of Gaussian smoothing
+    :param gaussian_window_size: window size of Gaussian kernel (pixels)
+    :param clipping_range: Near/Far clipping range
+    :param slots_per_worker: number of images each worker can have in flight
+    """
+    def __init__(self,
+                 number_of_workers,
+                 models_file,
+                 background_image,
+                 intrinsic_file,
+                 camera_to_world=None,
+                 left_to_right=None,
+                 gaussian_sigma=0.0,
+                 gaussian_window_size=11,
+                 clipping_range=(1, 1000),
+                 slots_per_worker=2
+                 ):
+        if number_of_workers < 1:
+            raise ValueError('number_of_workers should be >= 1')
+        if slots_per_worker < 1:
+            raise ValueError('slots_per_worker should be >= 1')
+
+        img = cv2.imread(background_image)
+        if img is None:
+            raise ValueError('Could not read:' + str(background_image))
+
+        configuration_manager = config.ConfigurationManager(models_file)
+        surfaces = configuration_manager.get_copy()['surfaces']
+        self.label_ids = {name: index + 1
+                          for index, name in enumerate(surfaces.keys())}
+
+        self.number_of_workers = number_of_workers
+        self.generator_args = (models_file, background_image, intrinsic_file)
+        self.generator_kwargs = {'camera_to_world': camera_to_world,
+                                 'left_to_right': left_to_right,
+                                 'gaussian_sigma': gaussian_sigma,
+                                 'gaussian_window_size': gaussian_window_size,
+                                 'clipping_range': clipping_range}
+
+        self.number_of_slots = number_of_workers * slots_per_worker
+        self.buffer_shape = (self.number_of_slots, img.shape[0], img.shape[1])
+        self.context = multiprocessing.get_context('spawn')
+        self.image_buffer = None
+        self.label_buffer = None
+        self.jobs = None
+        self.results = None
+        self.workers = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def get_label_ids(self):
+        """
+        Returns the integer label used for each named model in label
+        images, as VTKRenderingGeneratorBase.get_label_ids().
+
+        :return: dictionary of model name to label
+        """
+        return dict(self.label_ids)
+
+    def start(self):
+        """
+        Starts the worker processes, and waits until all are ready.
+
+        :raises RuntimeError: if a worker fails to start
+        """
+        if self.workers:
+            return
+
+        height, width = self.buffer_shape[1], self.buffer_shape[2]
+        self.image_buffer = self.context.RawArray(
+            'B', self.number_of_slots * height * width * 3)
+        self.label_buffer = self.context.RawArray(
+            'H', self.number_of_slots * height * width)
+        self.jobs = self.context.Queue()
+        self.results = self.context.Queue()
+
+        for _ in range(self.number_of_workers):
+            worker = self.context.Process(target=_render_worker,
+                                          args=(self.generator_args,
+                                                self.generator_kwargs,
+                                                self.image_buffer,
+                                                self.label_buffer,
+                                                self.buffer_shape,
+                                                self.jobs,
+                                                self.results),
+                                          daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+        for _ in range(self.number_of_workers):
+            _, error = self.__get_result()
+            if error is not None:
+                self.close()
+                raise RuntimeError('Render worker failed to start:\n'
+                                   + error)
+
+    def __get_result(self):
+        """
+        Waits for the next (slot, error) result from a worker, checking
+        periodically that all workers are still running, so that a worker
+        that crashes, e.g. in the OpenGL driver, doesn't block forever.
+
+        :raises RuntimeError: if a worker has exited
+        """
+        while True:
+            try:
+                return self.results.get(timeout=RESULT_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+
+            for worker in self.workers:
+                if not worker.is_alive():
+                    # It may have reported an error just before exiting.
+                    try:
+                        return self.results.get(timeout=RESULT_POLL_INTERVAL)
+                    except queue.Empty:
+                        pass
+                    exitcode = worker.exitcode
+                    self.close()
+                    raise RuntimeError('Render worker exited unexpectedly,'
+                                       ' with exit code:' + str(exitcode))
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        for _ in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        self.workers = []
+
+    def render(self, poses, pose_type='camera', labels=False):
+        """
+        Renders one image per pose, in parallel.
+
+        :param poses: [N x 6] array of [rx, ry, rz, tx, ty, tz] in deg/mm,
+            or [N x 4 x 4] array of rigid transforms.
+        :param pose_type: 'camera' or 'model', see render_batch()
+        :param labels: if True, also returns label images
+        :return: [N x H x W x 3] uint8 images, or if labels is True,
+            (images, [N x H x W] uint16 labels)
+        :raises RuntimeError: if rendering fails in a worker,
+            or a worker exits
+        """
+        if pose_type not in ['camera', 'model']:
+            raise ValueError("pose_type should be 'camera' or 'model'")
+
+        poses = np.asarray(poses, dtype=float)
+        if poses.ndim == 2 and poses.shape[1] == 6:
+            # Convert once here, so workers only receive matrices.
+            poses = mu.create_matrices_from_array(poses)
+        elif not (poses.ndim == 3 and poses.shape[1:] == (4, 4)):
+            raise ValueError("poses should be [N x 6] or [N x 4 x 4]")
+
+        self.start()
+
+        images = np.frombuffer(self.image_buffer, dtype=np.uint8).reshape(
+            self.buffer_shape + (3,))
+        label_images = np.frombuffer(self.label_buffer,
+                                     dtype=np.uint16).reshape(
+                                         self.buffer_shape)
+
+        number_of_poses = poses.shape[0]
+        image_output = np.zeros((number_of_poses,) + images.shape[1:],
+                                dtype=np.uint8)
+        label_output = None
+        if labels:
+            label_output = np.zeros((number_of_poses,)
+                                    + label_images.shape[1:],
+                                    dtype=np.uint16)
+
+        free_slots = list(range(self.number_of_slots))
+        slot_to_pose = {}
+        next_pose = 0
+        errors = []
+
+        while next_pose < number_of_poses or slot_to_pose:
+            while free_slots and next_pose < number_of_poses and not errors:
+                slot = free_slots.pop()
+                slot_to_pose[slot] = next_pose
+                self.jobs.put((slot, poses[next_pose], pose_type, labels))
+                next_pose += 1
+
+            if not slot_to_pose:
+                break
+
+            slot, error = self.__get_result()
+            pose_index = slot_to_pose.pop(slot)
+            free_slots.append(slot)
+            if error is not None:
+                errors.append(error)
+                continue
+            image_output[pose_index] = images[slot]
+            if labels:
+                label_output[pose_index] = label_images[slot]
+
+        if errors:
+            raise RuntimeError('Rendering failed:\n' + errors[0])
+
+        if labels:
+            return image_output, label_output
+        return image_output
@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module to provide the GUI independent part of a rendering generator,
+i.e. loading models, background and calibration, setting poses and
+rendering images, label images and masks for test data generation.
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+import os
+import numpy as np
+import cv2
+import vtk
+import sksurgerycore.utilities.file_utilities as fu
+import sksurgerycore.configuration.configuration_manager as config
+import sksurgeryvtk.models.surface_model_loader as sl
+import sksurgeryvtk.camera.vtk_camera_model as cm
+import sksurgeryvtk.utils.matrix_utils as mu
+import sksurgeryvtk.widgets.vtk_offscreen_overlay as oo
+
+
+class VTKRenderingGeneratorBase:
+    """
+    Base class for rendering generators, containing an overlay
+    and a few extra functions to facilitate rendering loops for
+    generating test data.
+
+    By default, this renders into a VTKOffscreenOverlay. Derived classes
+    can override _create_overlay(), e.g. to show the overlay in a widget.
+
+    :param models_file: JSON file describing VTK models, in SNAPPY format
+    :param background_image: RGB image to render in background
+    :param intrinsic_file: [3x3] matrix in text file, in numpy format
+    :param camera_to_world: list of [rx,ry,rz,tx,ty,tz] in degrees/millimetres
+    :param left_to_right: list of [rx,ry,rz,tx,ty,tz] in degrees/millimetres
+    :param zbuffer: if True, renders the z-buffer instead of RGB
+    :param gaussian_sigma: standard deviation of Gaussian smoothing
+    :param gaussian_window_size: window size of Gaussian kernel (pixels)
+    :param clipping_range: Near/Far clipping range
+    """
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+                 models_file,
+                 background_image,
+                 intrinsic_file,
+                 camera_to_world=None,
+                 left_to_right=None,
+                 zbuffer=False,
+                 gaussian_sigma=0.0,
+                 gaussian_window_size=11,
+                 clipping_range=(1, 1000)
+                 ):
+        self.gaussian_sigma = gaussian_sigma
+        self.gaussian_window_size = gaussian_window_size
+
+        self.img = cv2.imread(background_image)
+
+        self.configuration_manager = config.ConfigurationManager(models_file)
+        self.configuration_data = self.configuration_manager.get_copy()
+
+        file = fu.get_absolute_path_of_file(models_file)
+        dirname = os.path.dirname(file)
+
+        self.model_loader = sl.SurfaceModelLoader(self.configuration_data,
+                                                  dirname
+                                                  )
+
+        self.overlay = self._create_overlay(self.img.shape[1],
+                                            self.img.shape[0],
+                                            zbuffer)
+        self.overlay.set_video_image(self.img)
+        self.overlay.add_vtk_models(self.model_loader.get_surface_models())
+
+        self.clip_near = clipping_range[0]
+        self.clip_far = clipping_range[1]
+
+        self.intrinsics = np.loadtxt(intrinsic_file, dtype=np.float)
+        self.setup_intrinsics()
+
+        self.left_camera_to_world = np.eye(4)
+        self.camera_to_world = np.eye(4)
+        self.left_to_right = np.eye(4)
+        self.batch_model_to_world = vtk.vtkMatrix4x4()
+        self.setup_camera_extrinsics(camera_to_world, left_to_right)
+
+    def _create_overlay(self, width, height, zbuffer):
+        """
+        Creates the overlay to render into, sized to the background image.
+
+        :param width: image width in pixels
+        :param height: image height in pixels
+        :param zbuffer: if True, overlay renders z-buffer only
+        :return: a VTKOverlayBase
+        """
+        return oo.VTKOffscreenOverlay(width, height, zbuffer=zbuffer)
+
+    def set_clipping_range(self, minimum, maximum):
+        """
+        Sets the clipping range on the foreground camera.
+
+        :param minimum: minimum in millimetres
+        :param maximum: maximum in millimetres
+        """
+        self.clip_near = minimum
+        self.clip_far = maximum
+        self.overlay.get_foreground_camera().SetClippingRange(minimum, maximum)
+
+    def set_smoothing(self, sigma, window_size):
+        """
+        Sets the Gaussian blur.
+
+        :param sigma: standard deviation of Gaussian function.
+        :param window_size: sets the window size of Gaussian kernel (pixels).
+        """
+        self.gaussian_sigma = sigma
+        self.gaussian_window_size = window_size
+
+    def setup_intrinsics(self):
+        """
+        Set the intrinsics of the foreground vtkCamera.
+        """
+        f_x = self.intrinsics[0, 0]
+        c_x = self.intrinsics[0, 2]
+        f_y = self.intrinsics[1, 1]
+        c_y = self.intrinsics[1, 2]
+        width, height = self.img.shape[1], self.img.shape[0]
+
+        cm.set_camera_intrinsics(self.overlay.get_foreground_renderer(),
+                                 self.overlay.get_foreground_camera(),
+                                 width,
+                                 height,
+                                 f_x,
+                                 f_y,
+                                 c_x,
+                                 c_y,
+                                 self.clip_near,
+                                 self.clip_far)
+
+    def setup_camera_extrinsics(self,
+                                camera_to_world,
+                                left_to_right=None
+                                ):
+        """
+        Decomposes parameter strings into 6DOF
+        parameters, and sets up camera-to-world and left_to_right for stereo.
+
+        :param camera_to_world: list of [rx,ry,rz,tx,ty,tz] in degrees/mm
+        :param left_to_right: list of [rx,ry,rz,tx,ty,tz] in degrees/mm
+        """
+        if camera_to_world is not None:
+            self.left_camera_to_world = mu.create_matrix_from_list(
+                camera_to_world)
+        if left_to_right is not None:
+            self.left_to_right = mu.create_matrix_from_list(left_to_right)
+        self.camera_to_world = cm.compute_right_camera_pose(
+            self.left_camera_to_world,
+            self.left_to_right)
+        self.overlay.set_camera_pose(self.camera_to_world)
+
+    def set_all_model_to_world(self, model_to_world):
+        """
+        Decomposes the model_to_world string into rx,ry,rx,tx,ty,rz,
+        constructs a 4x4 matrix, and applies it to all models.
+
+        :param model_to_world: [4x4] numpy ndarray, rigid transform
+        """
+        if model_to_world is not None:
+            m2w = mu.create_matrix_from_list(model_to_world)
+            vtk_matrix = mu.create_vtk_matrix_from_numpy(m2w)
+            for model in self.model_loader.get_surface_models():
+                model.set_user_matrix(vtk_matrix)
+
+    def set_model_to_worlds(self, dict_of_transforms):
+        """
+        Given a dictionary of transforms, will iterate by name,
+        and apply the transform to the named object.
+        :param dict_of_transforms: {name, [rx, ry, rz, tx, ty, tz]}
+        """
+        if dict_of_transforms is not None:
+            for name in dict_of_transforms:
+                if name in self.model_loader.get_surface_model_names():
+                    model = self.model_loader.get_surface_model(name)
+                    m2w = mu.create_matrix_from_list(dict_of_transforms[name])
+                    vtk_matrix = mu.create_vtk_matrix_from_numpy(m2w)
+                    model.set_user_matrix(vtk_matrix)
+                else:
+                    raise ValueError("'" + name + "' is not in set of models.")
+
+    def _render(self):
+        """
+        Renders the overlay. Derived classes may also update a display.
+        """
+        self.overlay.Render()
+
+    def get_image(self):
+        """
+        Returns the rendered image, with post processing like smoothing.
+        :return: numpy ndarray representing rendered image (RGB)
+        """
+        self._render()
+        img = self.overlay.convert_scene_to_numpy_array()
+        smoothed = img
+        if self.gaussian_sigma > 0:
+            smoothed = cv2.GaussianBlur(img,
+                                        (self.gaussian_window_size,
+                                         self.gaussian_window_size),
+                                        self.gaussian_sigma)
+        return smoothed
+
+    def get_label_ids(self):
+        """
+        Returns the integer label used for each named model in label
+        images. Labels are numbered from 1, and 0 is the background.
+
+        :return: dictionary of model name to label
+        """
+        return {name: index + 1 for index, name
+                in enumerate(self._get_labelled_actors().keys())}
+
+    def _get_labelled_actors(self):
+        """
+        Returns the actors that make up each labelled model. Derived
+        classes can extend this, if a model is rendered with extra actors.
+
+        :return: dictionary of model name to list of vtkActor
+        """
+        return {model.get_name(): [model.actor]
+                for model in self.model_loader.get_surface_models()}
+
+    def get_label_image(self):
+        """
+        Renders a label image, where each pixel contains the label from
+        get_label_ids() of the front-most model, and 0 for background.
+
+        This is done by temporarily rendering every model as an unshaded,
+        opaque, untextured block of a colour encoding its label, so it is
+        independent of the colours, shading and smoothing configured
+        for get_image(). Any other foreground actors are rendered as
+        background, but still occlude.
+
+        :return: [H x W] uint8 numpy ndarray, or uint16 if > 255 models
+        """
+        labels, _ = self.__render_labels(False)
+        return labels
+
+    def __render_labels(self, with_depth):
+        """
+        Renders the label image, as for get_label_image(), and if
+        with_depth is True, reads the depth image from the same render.
+
+        :return: (labels, depth) numpy ndarrays, depth None if not read
+        """
+        if self.overlay.zbuffer:
+            raise ValueError("Can't render labels in zbuffer mode.")
+
+        labelled_actors = self._get_labelled_actors()
+        actor_labels = {}
+        for label, name in enumerate(labelled_actors.keys(), start=1):
+            for actor in labelled_actors[name]:
+                actor_labels[actor.GetAddressAsString('vtkActor')] = label
+
+        saved = []
+        actors = self.overlay.get_foreground_renderer().GetActors()
+        actors.InitTraversal()
+        for _ in range(actors.GetNumberOfItems()):
+            actor = actors.GetNextActor()
+            label = actor_labels.get(actor.GetAddressAsString('vtkActor'), 0)
+            saved.append(self.__set_label_properties(actor, label))
+
+        background_visibility = self.overlay.background_actor.GetVisibility()
+        overlay_visibility = \
+            self.overlay.generic_overlay_renderer.GetDraw()
+        self.overlay.background_actor.VisibilityOff()
+        self.overlay.generic_overlay_renderer.DrawOff()
+
+        depth = None
+        try:
+            img = self.overlay.convert_scene_to_numpy_array()
+            if with_depth:
+                depth = self.overlay.get_depth_image(render=False)
+        finally:
+            self.overlay.background_actor.SetVisibility(background_visibility)
+            self.overlay.generic_overlay_renderer.SetDraw(overlay_visibility)
+            for actor_state in saved:
+                self.__restore_label_properties(*actor_state)
+
+        labels = img[:, :, 0].astype(np.uint16) \
+            | (img[:, :, 1].astype(np.uint16) << 8)
+        if len(labelled_actors) < 256:
+            labels = labels.astype(np.uint8)
+        return labels, depth
+
+    @staticmethod
+    def __set_label_properties(actor, label):
+        """
+        Sets an actor to render as a solid block of colour encoding label,
+        returning what is needed to restore it afterwards.
+        """
+        prop = actor.GetProperty()
+        mapper = actor.GetMapper()
+        state = (actor,
+                 prop.GetColor(),
+                 prop.GetAmbient(),
+                 prop.GetDiffuse(),
+                 prop.GetSpecular(),
+                 prop.GetOpacity(),
+                 actor.GetTexture(),
+                 mapper.GetScalarVisibility() if mapper else None)
+
+        prop.SetColor((label & 255) / 255.0, (label >> 8) / 255.0, 0)
+        prop.SetAmbient(1)
+        prop.SetDiffuse(0)
+        prop.SetSpecular(0)
+        prop.SetOpacity(1)
+        actor.SetTexture(None)
+        if mapper:
+            mapper.ScalarVisibilityOff()
+        return state
+
+    @staticmethod
+    def __restore_label_properties(actor, colour, ambient, diffuse, specular,
+                                   opacity, texture, scalar_visibility):
+        """
+        Restores the actor properties saved by __set_label_properties.
+        """
+        # pylint: disable=too-many-arguments
+        prop = actor.GetProperty()
+        prop.SetColor(colour)
+        prop.SetAmbient(ambient)
+        prop.SetDiffuse(diffuse)
+        prop.SetSpecular(specular)
+        prop.SetOpacity(opacity)
+        actor.SetTexture(texture)
+        if scalar_visibility is not None:
+            actor.GetMapper().SetScalarVisibility(scalar_visibility)
+
+    def get_masks(self):
+        """
+        If we want to render masks for test data for DL models for instance,
+        we typically want distinct masks per model object. This method
+        returns a dictionary of new images corresponding to each named model.
+
+        The masks are derived from get_label_image(), so they do not depend
+        on the model colours, shading or smoothing.
+
+        :return: dictionary of model name to uint8 mask, 255 inside model
+        """
+        return self.__masks_from_labels(self.get_label_image())
+
+    def __masks_from_labels(self, labels):
+        """
+        Splits a label image into one mask per model, in one step.
+
+        :param labels: label image from get_label_image()
+        :return: dictionary of model name to uint8 mask
+        """
+        ids = self.get_label_ids()
+        label_values = np.asarray(list(ids.values()), dtype=labels.dtype)
+        masks = (labels[np.newaxis] ==
+                 label_values[:, np.newaxis, np.newaxis]).astype(np.uint8)
+        masks *= 255
+        return dict(zip(ids.keys(), masks))
+
+    def get_image_labels_and_depth(self):
+        """
+        Returns the smoothed RGB image as from get_image(), the label image
+        as from get_label_image(), and the depth image, as from
+        VTKOverlayBase.get_depth_image(), all for the same poses.
+        The depth is read from the label render, so needs no extra render,
+        and is that of the front-most surface, as every model is opaque.
+
+        :return: (rgb, labels, depth) numpy ndarrays
+        """
+        rgb = self.get_image()
+        labels, depth = self.__render_labels(True)
+        return rgb, labels, depth
+
+    def __set_batch_pose(self, pose, pose_type):
+        """
+        Applies one pose from render_batch.
+
+        :param pose: 4x4 numpy ndarray
+        :param pose_type: 'camera' or 'model'
+        """
+        if pose_type == 'camera':
+            self.left_camera_to_world = pose
+            self.camera_to_world = cm.compute_right_camera_pose(
+                self.left_camera_to_world,
+                self.left_to_right)
+            # No render here, as the read back in render_batch renders.
+            self.overlay.set_camera_pose(self.camera_to_world, render=False)
+        else:
+            mu.copy_numpy_to_vtk_matrix(pose, self.batch_model_to_world)
+            for model in self.model_loader.get_surface_models():
+                model.set_user_matrix(self.batch_model_to_world)
+
+    def render_batch(self, poses, pose_type='camera', masks=False,
+                     output=None):
+        """
+        Renders one image per pose, without repainting any widget.
+
+        Each pose is either the left camera_to_world ('camera'),
+        combined with the current left_to_right, or a model_to_world
+        applied to all models ('model'), as in setup_camera_extrinsics
+        and set_all_model_to_world respectively. Smoothing is applied as
+        in get_image(). The last pose remains set afterwards. Each pose
+        is rendered once, plus once more for the label pass if masks is True.
+
+        :param poses: [N x 6] array of [rx, ry, rz, tx, ty, tz] in deg/mm,
+            or [N x 4 x 4] array of rigid transforms.
+        :param pose_type: 'camera' or 'model'
+        :param masks: if True, also returns masks, as in get_masks()
+        :param output: optional pre-allocated [N x H x W x 3] uint8 array
+        :return: images as [N x H x W x 3] array, or if masks is True,
+            (images, dictionary of model name to [N x H x W] array)
+        """
+        if pose_type not in ['camera', 'model']:
+            raise ValueError("pose_type should be 'camera' or 'model'")
+
+        poses = np.asarray(poses, dtype=float)
+        if poses.ndim == 2 and poses.shape[1] == 6:
+            matrices = mu.create_matrices_from_array(poses)
+        elif poses.ndim == 3 and poses.shape[1:] == (4, 4):
+            matrices = poses
+        else:
+            raise ValueError("poses should be [N x 6] or [N x 4 x 4]")
+
+        number_of_poses = len(matrices)
+        mask_output = {}
+
+        for index, matrix in enumerate(matrices):
+            self.__set_batch_pose(matrix, pose_type)
+            img = self.overlay.convert_scene_to_numpy_array()
+            if self.gaussian_sigma > 0:
+                img = cv2.GaussianBlur(img,
+                                       (self.gaussian_window_size,
+                                        self.gaussian_window_size),
+                                       self.gaussian_sigma)
+
+            if output is None:
+                output = np.zeros((number_of_poses,) + img.shape,
+                                  dtype=img.dtype)
+            elif output.shape[0] < number_of_poses \
+                    or output.shape[1:] != img.shape:
+                raise ValueError("output should be at least "
+                                 + str((number_of_poses,) + img.shape))
+            output[index] = img
+
+            if masks:
+                labels = self.get_label_image()
+                for name, mask in self.__masks_from_labels(labels).items():
+                    if name not in mask_output:
+                        mask_output[name] = np.zeros(
+                            (number_of_poses,) + mask.shape, dtype=np.uint8)
+                    mask_output[name][index] = mask
+
+        if masks:
+            return output, mask_output
+        return output
@@ -2,7 +2,8 @@
 Module to show slice views of volumetric data.
 """
 #pylint:disable=too-many-instance-attributes, no-name-in-module
-import os
+import logging
+import time
 import vtk
 import numpy as np
 from PySide2 import QtWidgets
@@ -10,22 +11,67 @@ from PySide2.QtCore import QTimer
 
 from sksurgeryvtk.widgets.QVTKRenderWindowInteractor \
         import QVTKRenderWindowInteractor
+import sksurgeryvtk.models.volume_loader as vl
+import sksurgeryvtk.utils.tracker_poller as tp
+
+LOGGER = logging.getLogger(__name__)
+
+
+def create_image_property(min=-1000, max=1000):
+    #pylint:disable=redefined-builtin
+    """ Create a vtkImageProperty, with a greyscale vtkLookupTable,
+    which can be shared by several VTKResliceWidgets, so that they all
+    use one lookup table.
+    :param min: minimum of lookup table range
+    :param max: maximum of lookup table range
+    :return: vtkImageProperty """
+    lut = vtk.vtkLookupTable()
+    lut.SetTableRange(min, max)
+    lut.SetHueRange(0, 0)
+    lut.SetSaturationRange(0, 0)
+    lut.SetValueRange(0, 1)
+    lut.Build()
+
+    image_property = vtk.vtkImageProperty()
+    image_property.SetLookupTable(lut)
+    image_property.UseLookupTableScalarRangeOn()
+    image_property.SetInterpolationTypeToLinear()
+    return image_property
 
 
 class VTKResliceWidget(QVTKRenderWindowInteractor):
     """ Widget to show a single slice of Volumetric Data.
+
+    The lookup table is applied by the image actor's property as each
+    slice is drawn, so only the displayed slice is ever coloured.
+
+    If reslice is True, a vtkImageResliceMapper samples just the current
+    plane from the volume, so each view only holds one slice in memory,
+    and the plane can be oblique, see set_reslice_axes().
+
+    If fixed_camera is True, the camera uses a parallel projection, fitted
+    once to the whole volume, so it doesn't need resetting as the slice
+    moves, and the window is only rendered if the slice actually changes.
+
     :param reader: vtkReader class e.g. DICOM/Niftii/gipl
     :param axis: x/y/z axis selection
     :param parent: parent QWidget.
+    :param image_property: optional vtkImageProperty, to share
+        a lookup table with other views, see create_image_property()
+    :param reslice: if True, use a vtkImageResliceMapper
+    :param fixed_camera: if True, fit the camera once per axis
     """
-    def __init__(self, reader, axis, parent):
+    #pylint:disable=too-many-arguments
+    def __init__(self, reader, axis, parent, image_property=None,
+                 reslice=False, fixed_camera=False):
 
         if axis not in ['x', 'y', 'z']:
             raise TypeError('Argument should be x/y/z')
 
         super().__init__(parent)
         self.axis = axis
-        self.position = 0
+        self.position = None
+        self.fixed_camera = fixed_camera
         self.reader = reader
 
          # Calculate the center of the volume
@@ -43,8 +89,30 @@ class VTKResliceWidget(QVTKRenderWindowInteractor):
           self.y_0 + self.y_spacing * 0.5 * (self.y_min + self.y_max),
           self.z_0 + self.z_spacing * 0.5 * (self.z_min + self.z_max)]
 
-        self.actor = vtk.vtkImageActor()
-        self.set_lookup_table_min_max(-1000, 1000)
+        if image_property is None:
+            image_property = create_image_property(-1000, 1000)
+        self.image_property = image_property
+        self.lut = self.image_property.GetLookupTable()
+
+        self.reslice = reslice
+        self.reslice_axes = self._get_axis_aligned_axes()
+        self.slice_plane = None
+
+        if self.reslice:
+            self.slice_plane = vtk.vtkPlane()
+            mapper = vtk.vtkImageResliceMapper()
+            mapper.SetInputConnection(self.reader.GetOutputPort())
+            mapper.SliceFacesCameraOff()
+            mapper.SliceAtFocalPointOff()
+            mapper.SetSlicePlane(self.slice_plane)
+            self.actor = vtk.vtkImageSlice()
+            self.actor.SetMapper(mapper)
+        else:
+            self.actor = vtk.vtkImageActor()
+            self.actor.GetMapper().SetInputConnection(
+                self.reader.GetOutputPort())
+
+        self.actor.SetProperty(self.image_property)
 
         self.text_actor = vtk.vtkTextActor()
         self.text_actor.SetInput(self.axis)
@@ -54,13 +122,18 @@ class VTKResliceWidget(QVTKRenderWindowInteractor):
         self.renderer.AddActor(self.text_actor)
 
         # Move camera so that the slice is in view
-        if axis == "x":
+        if self.reslice:
+            self._update_camera()
+        elif axis == "x":
             self.renderer.GetActiveCamera().Azimuth(90)
-        if axis == "y":
+        elif axis == "y":
             self.renderer.GetActiveCamera().Elevation(90)
 
         self.set_slice_position_mm(0)
-        self.renderer.ResetCamera(self.actor.GetBounds())
+        if self.fixed_camera:
+            self._fit_camera_to_volume()
+        else:
+            self.renderer.ResetCamera(self.actor.GetBounds())
         self.GetRenderWindow().AddRenderer(self.renderer)
 
         # Remove unwanted mouse interaction behaviours
@@ -69,60 +142,130 @@ class VTKResliceWidget(QVTKRenderWindowInteractor):
         for action in actions:
             self._Iren.RemoveObservers(action)
 
+    def _get_axis_aligned_axes(self):
+        """ Return the 4x4 reslice axes for this view's axis, with the
+        origin at the volume origin, and the plane normal in column 2. """
+        axes = np.eye(4)
+        if self.axis == 'x':
+            axes[0:3, 0:3] = [[0, 0, 1], [1, 0, 0], [0, 1, 0]]
+        if self.axis == 'y':
+            axes[0:3, 0:3] = [[-1, 0, 0], [0, 0, 1], [0, 1, 0]]
+        axes[0:3, 3] = [self.x_0, self.y_0, self.z_0]
+        return axes
+
+    def _get_spacing(self):
+        """ Return the voxel spacing along this view's axis. """
+        if self.axis == 'x':
+            return self.x_spacing
+        if self.axis == 'y':
+            return self.y_spacing
+        return self.z_spacing
+
+    def _update_camera(self):
+        """ Point the camera along the normal of the reslice axes,
+        with column 1 of the axes pointing up. """
+        origin = self.reslice_axes[0:3, 3]
+        camera = self.renderer.GetActiveCamera()
+        camera.SetFocalPoint(*origin)
+        camera.SetPosition(*(origin + self.reslice_axes[0:3, 2]))
+        camera.SetViewUp(*self.reslice_axes[0:3, 1])
+
+    def _fit_camera_to_volume(self):
+        """ Fit a parallel projection camera to the whole volume, so
+        every slice along the current axis is in view. """
+        self.renderer.GetActiveCamera().ParallelProjectionOn()
+        self.renderer.ResetCamera(self.reader.GetOutput().GetBounds())
+
+    def set_reslice_axes(self, axes):
+        """ Set an arbitrary, possibly oblique, slice plane.
+        Slice positions are then measured along the plane normal,
+        from the origin of the axes.
+
+        :param axes: 4x4 numpy ndarray, where columns 0 and 1 are the
+            in-plane x and y directions, column 2 is the plane normal,
+            and column 3 is a point on the plane, in mm.
+        :raises ValueError: if the widget was not created with reslice=True
+        """
+        if not self.reslice:
+            raise ValueError('set_reslice_axes needs reslice=True')
+        if not isinstance(axes, np.ndarray):
+            raise TypeError('axes should be a numpy ndarray')
+        if axes.shape != (4, 4):
+            raise ValueError('axes should be a 4x4 matrix')
+
+        self.reslice_axes = axes.astype(float)
+        self._update_camera()
+        if self.fixed_camera:
+            self._fit_camera_to_volume()
+        self.position = None
+        self.set_slice_position_pixels(0)
+
+    def get_reslice_axes(self):
+        """ Return a copy of the current 4x4 reslice axes. """
+        return np.copy(self.reslice_axes)
+
     def set_lookup_table_min_max(self, min, max):
         #pylint:disable=redefined-builtin
         """ Set the minimum/maximum values for the VTK lookup table i.e.
-            change displayed range of intensity values. """
+            change displayed range of intensity values. If the lookup
+            table is shared, this changes all views using it. """
 
-        self.lut = vtk.vtkLookupTable()
         self.lut.SetTableRange(min, max)
-        self.lut.SetHueRange(0, 0)
-        self.lut.SetSaturationRange(0, 0)
-        self.lut.SetValueRange(0, 1)
-        self.lut.Build()
-
-        self.colours = vtk.vtkImageMapToColors()
-        self.colours.SetInputConnection(self.reader.GetOutputPort())
-        self.colours.SetLookupTable(self.lut)
-        self.colours.Update()
-
-        self.actor.GetMapper().SetInputConnection(self.colours.GetOutputPort())
-
+        self.GetRenderWindow().Render()
 
-    def set_slice_position_pixels(self, pos):
-        """ Set the slice position in the volume in pixels """
+    def set_slice_position_pixels(self, pos, render=True):
+        """ Set the slice position in the volume in pixels
+        :param pos: slice index
+        :param render: if False, the caller is responsible for rendering
+        :return: True if the slice was changed """
 
         pos = int(pos)
 
         if self.axis == 'x':
             pos = np.clip(pos, self.x_min, self.x_max)
-            self.actor.SetDisplayExtent(
-                pos, pos, self.y_min, self.y_max, self.z_min, self.z_max)
-
-        if self.axis == 'y':
+        elif self.axis == 'y':
             pos = np.clip(pos, self.y_min, self.y_max)
-            self.actor.SetDisplayExtent(
-                self.x_min, self.x_max, pos, pos, self.z_min, self.z_max)
-
-        if self.axis == 'z':
+        else:
             pos = np.clip(pos, self.z_min, self.z_max)
-            self.actor.SetDisplayExtent(
-                self.x_min, self.x_max, self.y_min, self.y_max, pos, pos)
+
+        if self.fixed_camera and pos == self.position:
+            return False
+
+        if self.reslice:
+            normal = self.reslice_axes[0:3, 2]
+            self.slice_plane.SetNormal(*normal)
+            self.slice_plane.SetOrigin(
+                *(self.reslice_axes[0:3, 3]
+                  + normal * pos * self._get_spacing()))
+        else:
+            if self.axis == 'x':
+                extent = [pos, pos,
+                          self.y_min, self.y_max, self.z_min, self.z_max]
+            elif self.axis == 'y':
+                extent = [self.x_min, self.x_max,
+                          pos, pos, self.z_min, self.z_max]
+            else:
+                extent = [self.x_min, self.x_max,
+                          self.y_min, self.y_max, pos, pos]
+            self.actor.SetDisplayExtent(*extent)
 
         self.position = pos
 
         # Fill widget with slice by moving camera
-        self.renderer.ResetCamera(self.actor.GetBounds())
-        self.GetRenderWindow().Render()
+        if not self.fixed_camera:
+            self.renderer.ResetCamera(self.actor.GetBounds())
 
-    def set_slice_position_mm(self, pos):
-        """ Set the slice position in the volume in mm """
-        if self.axis == 'x':
-            self.set_slice_position_pixels(pos / self.x_spacing)
-        if self.axis == 'y':
-            self.set_slice_position_pixels(pos / self.y_spacing)
-        if self.axis == 'z':
-            self.set_slice_position_pixels(pos / self.z_spacing)
+        if render:
+            self.GetRenderWindow().Render()
+        return True
+
+    def set_slice_position_mm(self, pos, render=True):
+        """ Set the slice position in the volume in mm
+        :param pos: slice position in mm
+        :param render: if False, the caller is responsible for rendering
+        :return: True if the slice was changed """
+        return self.set_slice_position_pixels(pos / self._get_spacing(),
+                                              render)
 
     def get_slice_position(self):
         """ Return the current slice position. """
@@ -163,9 +306,24 @@ class VTKResliceWidget(QVTKRenderWindowInteractor):
 
 class VTKSliceViewer(QtWidgets.QWidget):
     """ Othrogonal slice viewer showing Axial/Sagittal/Coronal views
-    :param input_data: path to volume data """
-
-    def __init__(self, input_data):
+    :param input_data: path to volume data
+    :param reslice: if True, views reslice only the current plane,
+                    see VTKResliceWidget
+    :param fixed_camera: if True, each view's camera is fitted once,
+                    and moving the slices only re-renders the views
+                    whose slice changed, coalesced with the 3D view
+                    into a single update on the next event loop tick
+    :param stream: if True, show the views straight away, and fill them in
+                    as the volume loads in the background, re-using the
+                    volume if this path was loaded before,
+                    see volume_loader.load_volume()
+    :param lod_factor: if > 1, the 3D view shows slices subsampled by this
+                    factor while slices move or the camera is being
+                    dragged, and full resolution slices once idle """
+
+    #pylint:disable=too-many-arguments
+    def __init__(self, input_data, reslice=False, fixed_camera=False,
+                 stream=False, lod_factor=1):
 
         super().__init__()
 
@@ -173,25 +331,35 @@ class VTKSliceViewer(QtWidgets.QWidget):
         self.setLayout(self.layout)
 
         # Start by loading some data.
-        if os.path.isdir(input_data):
-            self.reader = vtk.vtkDICOMImageReader()
-            self.reader.SetDirectoryName(input_data)
-
-        elif input_data.endswith(('.nii', '.nii.gz')):
-            self.reader = vtk.vtkNIFTIImageReader()
-            self.reader.SetFileName(input_data)
-
-        self.reader.Update()
+        self.volume_loader = None
+        if stream:
+            self.volume_loader = vl.load_volume(input_data)
+            self.reader = self.volume_loader.get_output_producer()
+        else:
+            self.reader = vl.create_volume_reader(input_data)
+            self.reader.Update()
 
         self.frame = QtWidgets.QFrame()
 
         self.fourth_panel_renderer = vtk.vtkRenderer()
         self.fourth_panel_renderer.SetBackground(.1, .2, .1)
 
+        self.fixed_camera = fixed_camera
+        self.views_to_render = []
+        self.render_pending = False
+
+        # One lookup table, shared by all views.
+        self.image_property = create_image_property(-1000, 1000)
 
-        self.x_view = VTKResliceWidget(self.reader, 'x', self.frame)
-        self.y_view = VTKResliceWidget(self.reader, 'y', self.frame)
-        self.z_view = VTKResliceWidget(self.reader, 'z', self.frame)
+        self.x_view = VTKResliceWidget(self.reader, 'x', self.frame,
+                                       self.image_property, reslice,
+                                       fixed_camera)
+        self.y_view = VTKResliceWidget(self.reader, 'y', self.frame,
+                                       self.image_property, reslice,
+                                       fixed_camera)
+        self.z_view = VTKResliceWidget(self.reader, 'z', self.frame,
+                                       self.image_property, reslice,
+                                       fixed_camera)
 
         self.layout.addWidget(self.x_view, 0, 0)
         self.layout.addWidget(self.y_view, 0, 1)
@@ -205,18 +373,178 @@ class VTKSliceViewer(QtWidgets.QWidget):
         self.fourth_panel.GetRenderWindow().AddRenderer(
             self.fourth_panel_renderer)
 
-        for view in [self.x_view, self.y_view, self.z_view]:
-            self.fourth_panel_renderer.AddActor(view.actor)
+        self.lod_factor = lod_factor
+        self.full_resolution_actors = []
+        self.low_resolution_actors = []
+        self.idle_timer = None
+        if self.lod_factor > 1:
+            self.__create_level_of_detail()
+        else:
+            for view in [self.x_view, self.y_view, self.z_view]:
+                self.fourth_panel_renderer.AddActor(view.actor)
 
         self.layout.addWidget(self.fourth_panel, 1, 1)
         self.fourth_panel.GetRenderWindow().Render()
 
+        self.load_timer = None
+        if self.volume_loader is not None:
+            self.load_timer = QTimer()
+            self.load_timer.timeout.connect(self.update_loaded_volume)
+            self.load_timer.start(100)
+            self.update_loaded_volume()
+
+    def __create_level_of_detail(self):
+        """ Add full and low resolution copies of each slice to the 3D
+        view, with the low resolution ones taken from a subsampled
+        volume, which only computes the slices being displayed. """
+        self.shrink = vtk.vtkImageShrink3D()
+        self.shrink.SetInputConnection(self.reader.GetOutputPort())
+        self.shrink.SetShrinkFactors(self.lod_factor, self.lod_factor,
+                                     self.lod_factor)
+        self.shrink.AveragingOff()
+        self.shrink.UpdateInformation()
+        self.low_resolution_extent = \
+            self.shrink.GetOutputInformation(0).Get(
+                vtk.vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT())
+
+        for view in [self.x_view, self.y_view, self.z_view]:
+            # Shares the view's mapper, so follows its slice position.
+            full_resolution = vtk.vtkImageSlice()
+            full_resolution.SetMapper(view.actor.GetMapper())
+            full_resolution.SetProperty(self.image_property)
+
+            if view.reslice:
+                mapper = vtk.vtkImageResliceMapper()
+                mapper.SetInputConnection(self.shrink.GetOutputPort())
+                mapper.SliceFacesCameraOff()
+                mapper.SliceAtFocalPointOff()
+                mapper.SetSlicePlane(view.slice_plane)
+                low_resolution = vtk.vtkImageSlice()
+                low_resolution.SetMapper(mapper)
+            else:
+                low_resolution = vtk.vtkImageActor()
+                low_resolution.GetMapper().SetInputConnection(
+                    self.shrink.GetOutputPort())
+            low_resolution.SetProperty(self.image_property)
+            low_resolution.VisibilityOff()
+
+            self.full_resolution_actors.append(full_resolution)
+            self.low_resolution_actors.append(low_resolution)
+            self.fourth_panel_renderer.AddActor(full_resolution)
+            self.fourth_panel_renderer.AddActor(low_resolution)
+
+        self.idle_timer = QTimer()
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(250)
+        self.idle_timer.timeout.connect(self.__show_full_resolution)
+
+        style = vtk.vtkInteractorStyleTrackballCamera()
+        style.AddObserver('StartInteractionEvent',
+                          self.__on_start_interaction)
+        style.AddObserver('EndInteractionEvent', self.__on_end_interaction)
+        self.fourth_panel.SetInteractorStyle(style)
+
+    def __show_low_resolution(self, low_resolution):
+        """ Switch the 3D view between low and full resolution slices. """
+        if low_resolution:
+            self.__update_low_resolution_extents()
+        for full, low in zip(self.full_resolution_actors,
+                             self.low_resolution_actors):
+            full.SetVisibility(not low_resolution)
+            low.SetVisibility(low_resolution)
+
+    def __update_low_resolution_extents(self):
+        """ Move the low resolution slices to match the views. """
+        for view, actor in zip([self.x_view, self.y_view, self.z_view],
+                               self.low_resolution_actors):
+            if view.reslice:
+                continue
+            extent = list(self.low_resolution_extent)
+            index = ['x', 'y', 'z'].index(view.axis)
+            position = np.clip(view.get_slice_position() // self.lod_factor,
+                               extent[2 * index], extent[2 * index + 1])
+            extent[2 * index] = position
+            extent[2 * index + 1] = position
+            actor.SetDisplayExtent(*extent)
+
+    def __show_full_resolution(self):
+        """ Called once idle, to redraw the 3D view at full resolution. """
+        self.__show_low_resolution(False)
+        self.fourth_panel.GetRenderWindow().Render()
+
+    def __on_start_interaction(self, obj, event):
+        #pylint:disable=unused-argument
+        """ Show low resolution slices while the 3D camera is dragged. """
+        self.idle_timer.stop()
+        self.__show_low_resolution(True)
+
+    def __on_end_interaction(self, obj, event):
+        #pylint:disable=unused-argument
+        """ Go back to full resolution once the 3D view is idle. """
+        self.idle_timer.start()
+
+    def render_fourth_panel(self):
+        """ Render the 3D view. With level of detail, this draws low
+        resolution slices, and full resolution ones once idle. """
+        if self.idle_timer is not None:
+            self.__show_low_resolution(True)
+            self.idle_timer.start()
+        self.fourth_panel.GetRenderWindow().Render()
+
+    def update_loaded_volume(self):
+        """ Re-render all views if more of a streamed volume has
+        loaded, and stop checking once it has all been shown,
+        or if reading failed. """
+        try:
+            changed = self.volume_loader.update()
+        except IOError as error:
+            self.load_timer.stop()
+            LOGGER.error("Stopped loading volume: %s", error)
+            return
+
+        if changed:
+            for view in [self.x_view, self.y_view, self.z_view]:
+                view.GetRenderWindow().Render()
+            self.fourth_panel.GetRenderWindow().Render()
+
+        if self.volume_loader.slices_shown \
+                == self.volume_loader.number_of_slices:
+            self.load_timer.stop()
+
     def set_lookup_table_min_max(self, min, max):
         #pylint:disable=redefined-builtin
         """ Set lookup table min/max for all slice views """
-        self.x_view.set_lookup_table_min_max(min, max)
-        self.y_view.set_lookup_table_min_max(min, max)
-        self.z_view.set_lookup_table_min_max(min, max)
+        self.image_property.GetLookupTable().SetTableRange(min, max)
+        for view in [self.x_view, self.y_view, self.z_view]:
+            view.GetRenderWindow().Render()
+        self.fourth_panel.GetRenderWindow().Render()
+
+    def __set_slice_positions(self, positions, in_mm):
+        """ Sets the slice positions without rendering, and queues a
+        single render of any views that changed. """
+        for view, pos in zip([self.x_view, self.y_view, self.z_view],
+                             positions):
+            if in_mm:
+                changed = view.set_slice_position_mm(pos, render=False)
+            else:
+                changed = view.set_slice_position_pixels(pos, render=False)
+            if changed and view not in self.views_to_render:
+                self.views_to_render.append(view)
+
+        if self.views_to_render and not self.render_pending:
+            self.render_pending = True
+            QTimer.singleShot(0, self.render_changed_views)
+
+    def render_changed_views(self):
+        """ Render the slice views whose position changed since the
+        last call, and the 3D view, if any did. """
+        self.render_pending = False
+        if not self.views_to_render:
+            return
+        for view in self.views_to_render:
+            view.GetRenderWindow().Render()
+        self.render_fourth_panel()
+        self.views_to_render = []
 
     def update_slice_positions_mm(self, x_pos, y_pos, z_pos):
         """ Set the slice positions for each view.
@@ -224,10 +552,13 @@ class VTKSliceViewer(QtWidgets.QWidget):
         :param y: slice 2 position
         :param z: slice 3 position
         """
+        if self.fixed_camera:
+            self.__set_slice_positions([x_pos, y_pos, z_pos], True)
+            return
         self.x_view.set_slice_position_mm(x_pos)
         self.y_view.set_slice_position_mm(y_pos)
         self.z_view.set_slice_position_mm(z_pos)
-        self.fourth_panel.GetRenderWindow().Render()
+        self.render_fourth_panel()
 
     def update_slice_positions_pixels(self, x_pos, y_pos, z_pos):
         """ Set the slice positions for each view.
@@ -235,23 +566,27 @@ class VTKSliceViewer(QtWidgets.QWidget):
         :param y: slice 2 position
         :param z: slice 3 position
         """
+        if self.fixed_camera:
+            self.__set_slice_positions([x_pos, y_pos, z_pos], False)
+            return
         self.x_view.set_slice_position_pixels(x_pos)
         self.y_view.set_slice_position_pixels(y_pos)
         self.z_view.set_slice_position_pixels(z_pos)
-        self.fourth_panel.GetRenderWindow().Render()
+        self.render_fourth_panel()
 
     def reset_slice_positions(self):
         """ Set slcie positions to some default values. """
         self.x_view.reset_position()
         self.y_view.reset_position()
         self.z_view.reset_position()
-        self.fourth_panel.GetRenderWindow().Render()
+        self.render_fourth_panel()
 
 
 
 class MouseWheelSliceViewer(VTKSliceViewer):
     """ Orthogonal slice viewer using mouse wheel to
-    control slice position.
+    control slice position. The 3D view is rendered
+    whenever a slice is scrolled, rather than on a timer.
 
     Example usage:
 
@@ -264,28 +599,29 @@ class MouseWheelSliceViewer(VTKSliceViewer):
 
     """
 
-    def __init__(self, input_data):
+    #pylint:disable=too-many-arguments
+    def __init__(self, input_data, reslice=False, fixed_camera=False,
+                 stream=False, lod_factor=1):
 
-        super().__init__(input_data)
+        super().__init__(input_data, reslice, fixed_camera, stream,
+                         lod_factor)
 
-        self.x_view.set_mouse_wheel_callbacks()
-        self.y_view.set_mouse_wheel_callbacks()
-        self.z_view.set_mouse_wheel_callbacks()
+        for view in [self.x_view, self.y_view, self.z_view]:
+            view.set_mouse_wheel_callbacks()
 
-        self.update_rate = 20
+            # Lower priority, so called after the view has moved its slice.
+            for event in ['MouseWheelForwardEvent',
+                          'MouseWheelBackwardEvent']:
+                view.GetRenderWindow().GetInteractor().AddObserver(
+                    event, self.update_fourth_panel, -1.0)
 
-    def update_fourth_panel(self):
+    def update_fourth_panel(self, obj=None, event=None):
+        #pylint:disable=unused-argument
         """ Update 3D view. """
-        self.fourth_panel.GetRenderWindow().Render()
+        self.render_fourth_panel()
 
     def start(self):
-        #pylint:disable=attribute-defined-outside-init, no-member
-        """ Start a timer which will update the 3D view. """
-
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_fourth_panel)
-        self.timer.start(1000.0 / self.update_rate)
-
+        """ Show the viewer. """
         self.show()
         self.reset_slice_positions()
 
@@ -297,6 +633,14 @@ class TrackedSliceViewer(VTKSliceViewer):
     :param input_data: Path to file/folder containing volume data
     :param tracker: scikit-surgery tracker object,
                     used to control slice positions.
+    :param reslice: if True, views reslice only the current plane
+    :param fixed_camera: if True, only render views whose slice changed
+    :param stream: if True, load the volume in the background
+    :param threaded: if True, poll the tracker in a background thread,
+                    see TrackerPoller, and only update the slices when a
+                    new pose has arrived
+    :param movement_threshold: if threaded, minimum distance in mm the
+                    tracked tool must move before the slices are updated
 
     Example usage:
 
@@ -309,15 +653,76 @@ class TrackedSliceViewer(VTKSliceViewer):
     qApp.exec_()
 
     """
-    def __init__(self, input_data, tracker):
+    #pylint:disable=too-many-arguments
+    def __init__(self, input_data, tracker, reslice=False,
+                 fixed_camera=False, stream=False, threaded=False,
+                 movement_threshold=0.0):
 
-        super().__init__(input_data)
+        super().__init__(input_data, reslice, fixed_camera, stream)
         self.tracker = tracker
         self.update_rate = 20
 
+        self.poller = None
+        if threaded:
+            self.poller = tp.TrackerPoller(tracker)
+        self.movement_threshold = movement_threshold
+        self.last_sequence = None
+        self.last_position = None
+        self.latency = None
+        self.acquired_time_to_render = None
+
+    def get_latency(self):
+        """ Return the time in seconds, from the tracker returning the
+        most recently displayed pose, to the changed views having been
+        rendered, or None if no pose has been displayed yet. With
+        fixed_camera, views are rendered from the Qt event loop, so this
+        includes the wait for that render. Only measured if threaded. """
+        return self.latency
+
+    def render_changed_views(self):
+        """ Render the changed views, as VTKSliceViewer, then record
+        the latency of the pose that moved them, if any. """
+        rendering = bool(self.views_to_render)
+        super().render_changed_views()
+        if rendering and self.acquired_time_to_render is not None:
+            self.latency = time.perf_counter() \
+                - self.acquired_time_to_render
+            self.acquired_time_to_render = None
+
+    def __update_position_from_poller(self):
+        """ Set slice positions from the latest pose from the poller,
+        if it is new, and has moved far enough. """
+        latest = self.poller.get_latest()
+        if latest is None or latest[0] == self.last_sequence:
+            return
+        sequence, tracking_matrix, acquired_time = latest
+        self.last_sequence = sequence
+
+        position = np.asarray(tracking_matrix)[0:3, 3]
+        if not np.all(np.isfinite(position)):
+            return
+        if self.last_position is not None and \
+                np.linalg.norm(position - self.last_position) \
+                <= self.movement_threshold:
+            return
+        self.last_position = position
+
+        if self.fixed_camera:
+            # Rendered later, by render_changed_views().
+            self.acquired_time_to_render = acquired_time
+            self.update_slice_positions_mm(*position)
+            return
+
+        self.update_slice_positions_mm(*position)
+        self.latency = time.perf_counter() - acquired_time
+
     def update_position(self):
         """ Get position from tracker and use this
         to set slice positions. """
+        if self.poller is not None:
+            self.__update_position_from_poller()
+            return
+
         _, _, _, tracking_data, _ = self.tracker.get_frame()
 
         if tracking_data is not None:
@@ -332,6 +737,9 @@ class TrackedSliceViewer(VTKSliceViewer):
         """Show the overlay widget and
         set a timer running"""
 
+        if self.poller is not None:
+            self.poller.start()
+
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_position)
         self.timer.start(1000.0 / self.update_rate)
@@ -339,3 +747,10 @@ class TrackedSliceViewer(VTKSliceViewer):
         self.show()
 
         self.reset_slice_positions()
+
+    def stop(self):
+        """ Stop the timer, and the tracker polling thread. """
+        if hasattr(self, 'timer'):
+            self.timer.stop()
+        if self.poller is not None:
+            self.poller.stop()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import numpy as np
+import vtk
+import sksurgeryvtk.camera.vtk_camera_state as cs
+
+
+def test_camera_state_round_trip():
+
+    camera = vtk.vtkCamera()
+    camera.SetPosition(1, 2, 3)
+    camera.SetFocalPoint(4, 5, 60)
+    camera.SetViewUp(0, -1, 0)
+    camera.SetViewAngle(45)
+    camera.SetClippingRange(10, 500)
+
+    state = cs.get_camera_state_array(camera)
+    assert state.shape == (cs.CAMERA_STATE_SIZE,)
+    assert sum(size for _, size in cs.CAMERA_STATE_LAYOUT) \
+        == cs.CAMERA_STATE_SIZE
+
+    other = vtk.vtkCamera()
+    cs.set_camera_state_array(other, state)
+    assert np.allclose(other.GetPosition(), (1, 2, 3))
+    assert np.allclose(other.GetFocalPoint(), (4, 5, 60))
+    assert np.allclose(other.GetClippingRange(), (10, 500))
+    assert np.allclose(cs.get_camera_state_array(other), state)
+
+
+def test_camera_state_invalid_input():
+
+    with pytest.raises(TypeError):
+        cs.get_camera_state_array("banana")
+
+    with pytest.raises(ValueError):
+        cs.get_camera_state_array(vtk.vtkCamera(), np.zeros(3))
+
+    with pytest.raises(ValueError):
+        cs.set_camera_state_array(vtk.vtkCamera(), np.zeros(3))
+
+
+def test_record_and_replay(tmpdir):
+
+    camera = vtk.vtkCamera()
+    recorder = cs.CameraStateRecorder(capacity=2)
+
+    for i in range(5):
+        camera.SetPosition(i, 0, 0)
+        recorder.record(camera, timestamp=float(i))
+
+    assert len(recorder) == 5
+    assert recorder.get_states().shape == (5, cs.CAMERA_STATE_SIZE)
+
+    file_name = str(tmpdir.join('camera_states.npz'))
+    recorder.save(file_name)
+
+    loaded = cs.CameraStateRecorder()
+    loaded.load(file_name)
+    assert np.allclose(loaded.get_states(), recorder.get_states())
+
+    replayed = vtk.vtkCamera()
+    for index, timestamp in loaded.replay(replayed):
+        assert replayed.GetPosition()[0] == index
+        assert timestamp == index
+
+    with pytest.raises(IndexError):
+        loaded.apply(replayed, 5)
+
+
+def test_record_after_loading_empty(tmpdir):
+
+    file_name = str(tmpdir.join('empty_states.npz'))
+    cs.CameraStateRecorder().save(file_name)
+
+    loaded = cs.CameraStateRecorder()
+    loaded.load(file_name)
+    assert len(loaded) == 0
+    assert loaded.get_states().shape == (0, cs.CAMERA_STATE_SIZE)
+
+    camera = vtk.vtkCamera()
+    for i in range(3):
+        camera.SetPosition(i, 0, 0)
+        loaded.record(camera, timestamp=float(i))
+    assert len(loaded) == 3
+    assert loaded.get_states()[2][0] == 2
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import pytest
+import sksurgeryvtk.models.mesh_cache as mc
+from sksurgeryvtk.models.surface_model_loader import SurfaceModelLoader
+from sksurgeryvtk.models.vtk_surface_model_directory_loader \
+    import VTKSurfaceModelDirectoryLoader
+from sksurgerycore.configuration.configuration_manager \
+    import ConfigurationManager
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        mc.MeshCache('tests/output/mesh_cache', max_size_bytes=-1)
+
+
+def test_normals_options_match_filter():
+    options = mc.get_normals_options()
+    assert options['auto_orient_normals'] == 1
+    assert options['flip_normals'] == 0
+    assert options['compute_point_normals'] == 1
+
+
+def test_cache_round_trip(tmpdir):
+    cache = mc.MeshCache(str(tmpdir.join('cache')))
+    model_file = 'tests/data/models/Tumor.ply'
+
+    assert cache.load(model_file) is None
+    polydata = cache.read_polydata_with_normals(model_file)
+    assert polydata.GetPointData().GetNormals() is not None
+    assert cache.get_size() > 0
+
+    cached = cache.load(model_file)
+    assert cached.GetNumberOfPoints() == polydata.GetNumberOfPoints()
+    assert cached.GetNumberOfCells() == polydata.GetNumberOfCells()
+    assert cached.GetPointData().GetNormals() is not None
+
+    # Different options give a different key.
+    assert cache.load(model_file, {'decimation': 0.5}) is None
+
+    with pytest.raises(ValueError):
+        cache.read_polydata_with_normals('tests/data/models/liver_cam.json')
+
+    cache.clear()
+    assert cache.get_size() == 0
+
+
+def test_modified_source_misses(tmpdir):
+    cache = mc.MeshCache(str(tmpdir.join('cache')))
+    model_file = str(tmpdir.join('Tumor.ply'))
+    shutil.copy('tests/data/models/Tumor.ply', model_file)
+
+    cache.read_polydata_with_normals(model_file)
+    assert cache.load(model_file) is not None
+
+    status = os.stat(model_file)
+    os.utime(model_file, ns=(status.st_atime_ns,
+                             status.st_mtime_ns + 1000000000))
+    assert cache.load(model_file) is None
+
+
+def test_least_recently_used_evicted(tmpdir):
+    cache = mc.MeshCache(str(tmpdir.join('cache')))
+    first = 'tests/data/models/Tumor.ply'
+    second = 'tests/data/models/Fiducial.stl'
+
+    cache.read_polydata_with_normals(first)
+    first_size = cache.get_size()
+    os.utime(cache.get_cache_file(first), (0, 0))
+
+    cache.max_size_bytes = first_size
+    cache.read_polydata_with_normals(second)
+    assert cache.load(first) is None
+    assert cache.get_size() <= cache.max_size_bytes
+
+
+def test_loaders_use_cache(tmpdir):
+    cache = mc.MeshCache(str(tmpdir.join('cache')))
+
+    config = ConfigurationManager('tests/data/config/surface_model_two.json')
+    loader = SurfaceModelLoader(config.get_copy(), mesh_cache=cache)
+    assert len(loader.get_surface_model_names()) == 2
+    for surface in loader.get_surface_models():
+        assert cache.load(surface.get_source_file()) is not None
+
+    dir_name = 'tests/data/models/Kidney'
+    serial = VTKSurfaceModelDirectoryLoader(dir_name, mesh_cache=cache)
+    parallel = VTKSurfaceModelDirectoryLoader(dir_name, mesh_cache=cache,
+                                              number_of_workers=2)
+    assert len(serial.models) == len(parallel.models) == 2
+    for model in serial.models:
+        assert cache.load(model.get_source_file()) is not None
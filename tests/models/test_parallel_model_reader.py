@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import numpy as np
+from vtk.util import numpy_support
+import sksurgeryvtk.models.parallel_model_reader as pmr
+
+
+def test_read_adds_normals():
+    polydata = pmr.read_polydata_with_normals('tests/data/models/Tumor.ply')
+    assert polydata.GetNumberOfPoints() > 0
+    assert polydata.GetPointData().GetNormals() is not None
+
+
+def test_marshal_round_trip():
+    polydata = pmr.read_polydata_with_normals('tests/data/models/liver.vtp')
+    copy = pmr.unmarshal_polydata(pmr.marshal_polydata(polydata))
+
+    assert copy.GetNumberOfPoints() == polydata.GetNumberOfPoints()
+    assert copy.GetNumberOfCells() == polydata.GetNumberOfCells()
+    assert np.allclose(
+        numpy_support.vtk_to_numpy(copy.GetPoints().GetData()),
+        numpy_support.vtk_to_numpy(polydata.GetPoints().GetData()))
+
+
+def test_read_files_reports_errors():
+    file_names = ['tests/data/models/Tumor.ply',
+                  'tests/data/models/liver_cam.json']
+    results = pmr.read_polydata_files(file_names, 2)
+
+    polydata, seconds = results['tests/data/models/Tumor.ply']
+    assert polydata.GetNumberOfPoints() > 0
+    assert seconds > 0
+
+    error, _ = results['tests/data/models/liver_cam.json']
+    assert isinstance(error, ValueError)
+
+    with pytest.raises(ValueError):
+        pmr.read_polydata_files(file_names, 0)
@@ -165,3 +165,44 @@ def test_surface_model_loader_with_no_shading():
     loader = SurfaceModelLoader(config)
     assert len(loader.get_surface_models()) == 1
     assert loader.get_surface_model('liver').get_no_shading()
+
+
+def test_surface_model_loader_parallel():
+    config = ConfigurationManager('tests/data/config/surface_model_two.json')
+    config_data = config.get_copy()
+
+    progress = []
+    loader = SurfaceModelLoader(
+        config_data, number_of_workers=2,
+        progress_callback=lambda done, total, name:
+        progress.append((done, total, name)))
+
+    assert len(loader.get_surface_model_names()) == 2
+    assert sorted(done for done, _, _ in progress) == [1, 2]
+    assert {name for _, _, name in progress} \
+        == set(loader.get_surface_model_names())
+    assert set(loader.get_load_times().keys()) \
+        == set(loader.get_surface_model_names())
+
+    for surface in loader.get_surface_models():
+        assert surface.get_number_of_points() > 0
+        assert surface.get_normals_as_numpy() is not None
+
+
+def test_surface_model_loader_parallel_shared_file():
+    # Both surfaces use the same file, which is read once,
+    # but progress is still reported for each surface.
+    config = ConfigurationManager(
+        'tests/data/config/surface_model_two_livers_no_shading.json')
+    config_data = config.get_copy()
+
+    progress = []
+    loader = SurfaceModelLoader(
+        config_data, number_of_workers=2,
+        progress_callback=lambda done, total, name:
+        progress.append((done, total, name)))
+
+    assert [done for done, _, _ in progress] == [1, 2]
+    assert all(total == 2 for _, total, _ in progress)
+    assert {name for _, _, name in progress} \
+        == set(loader.get_surface_model_names())
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+import sksurgeryvtk.models.volume_loader as vl
+
+dicom_path = 'tests/data/dicom/LegoPhantom_10slices'
+
+
+def test_invalid_path():
+    with pytest.raises(ValueError):
+        vl.create_volume_reader('tests/data/models/Prostate.vtk')
+
+
+def _check_streamed_volume(input_data, chunk_size=None):
+
+    reader = vl.create_volume_reader(input_data)
+    reader.Update()
+    expected = numpy_support.vtk_to_numpy(
+        reader.GetOutput().GetPointData().GetScalars())
+
+    loader = vl.VolumeLoader(input_data, chunk_size=chunk_size)
+    assert loader.volume.GetExtent() == reader.GetOutput().GetExtent()
+    assert loader.volume.GetSpacing() == reader.GetOutput().GetSpacing()
+    assert not loader.update()
+
+    loader.start()
+    assert loader.wait(timeout=30)
+    assert loader.slices_shown == loader.number_of_slices
+
+    volume = numpy_support.vtk_to_numpy(
+        loader.get_volume().GetPointData().GetScalars())
+    assert np.array_equal(volume, expected)
+
+
+def test_streamed_volume_matches_reader():
+    _check_streamed_volume(dicom_path)
+
+
+def test_chunked_volume_matches_reader(tmp_path):
+
+    # DICOM is read in one chunk, so write a NIfTI copy to read in chunks.
+    reader = vl.create_volume_reader(dicom_path)
+    nifti_path = str(tmp_path / 'lego.nii')
+    writer = vtk.vtkNIFTIImageWriter()
+    writer.SetInputConnection(reader.GetOutputPort())
+    writer.SetFileName(nifti_path)
+    writer.Write()
+
+    _check_streamed_volume(nifti_path, chunk_size=3)
+
+
+def test_volume_cache():
+
+    vl.clear_volume_cache()
+    first = vl.load_volume(dicom_path)
+    second = vl.load_volume(dicom_path + '/')
+    assert first is second
+
+    vl.clear_volume_cache()
+    third = vl.load_volume(dicom_path)
+    assert third is not first
+    assert third.wait(timeout=30)
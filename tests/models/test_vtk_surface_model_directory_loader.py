@@ -99,4 +99,24 @@ def test_valid_dir_with_defaults_from_json():
 def test_valid_dir_with_colours_model_file_doesnt_exist():
     dir_name = 'tests/data/models/bad_colours'
     with pytest.raises(FileNotFoundError):
-        loader = VTKSurfaceModelDirectoryLoader(dir_name)
\ No newline at end of file
+        loader = VTKSurfaceModelDirectoryLoader(dir_name)
+
+def test_parallel_load_matches_serial():
+    dir_name = 'tests/data/models/Liver'
+    serial = VTKSurfaceModelDirectoryLoader(dir_name)
+
+    progress = []
+    parallel = VTKSurfaceModelDirectoryLoader(
+        dir_name, number_of_workers=2,
+        progress_callback=lambda done, total, name: progress.append(done))
+
+    assert len(parallel.models) == len(serial.models)
+    for serial_model, parallel_model in zip(serial.models, parallel.models):
+        assert parallel_model.get_name() == serial_model.get_name()
+        assert parallel_model.get_colour() == serial_model.get_colour()
+        assert parallel_model.get_number_of_points() \
+            == serial_model.get_number_of_points()
+
+    assert progress == list(range(1, len(os.listdir(dir_name)) + 1))
+    assert set(parallel.get_load_times().keys()) \
+        == {model.get_name() for model in parallel.models}
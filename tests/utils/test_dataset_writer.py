@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import pytest
+import numpy as np
+import cv2
+import sksurgeryvtk.utils.dataset_writer as dw
+
+
+def _read_index(output_dir):
+    with open(os.path.join(output_dir, 'index.jsonl')) as index_file:
+        return [json.loads(line) for line in index_file]
+
+
+def test_invalid_arguments(tmpdir):
+    with pytest.raises(ValueError):
+        dw.DatasetWriter(str(tmpdir), image_format='bmp')
+    with pytest.raises(ValueError):
+        dw.DatasetWriter(str(tmpdir), number_of_threads=0)
+    with pytest.raises(ValueError):
+        dw.DatasetWriter(str(tmpdir), max_pending=0)
+    with dw.DatasetWriter(str(tmpdir)) as writer:
+        with pytest.raises(TypeError):
+            writer.write('not an image')
+
+
+def test_write_png(tmpdir):
+    output_dir = str(tmpdir)
+    image = np.zeros((20, 30, 3), dtype=np.uint8)
+    image[:, :, 0] = 255
+    mask = np.zeros((20, 30), dtype=np.uint8)
+    mask[5:10, 5:10] = 255
+    labels = np.ones((20, 30), dtype=np.uint16) * 300
+    pose = np.eye(4)
+    pose[0, 3] = 10
+    intrinsics = np.eye(3)
+
+    with dw.DatasetWriter(output_dir, number_of_threads=2,
+                          max_pending=1) as writer:
+        for _ in range(5):
+            writer.write(image, masks={'liver': mask}, labels=labels,
+                         pose=pose, intrinsics=intrinsics)
+
+    index = _read_index(output_dir)
+    assert len(index) == 5
+    assert [entry['index'] for entry in index] == list(range(5))
+    assert np.allclose(index[3]['pose'], pose)
+    assert np.allclose(index[3]['intrinsics'], intrinsics)
+
+    written = cv2.imread(os.path.join(output_dir, index[3]['image']))
+    assert written[0, 0, 2] == 255  # RGB in, BGR on disk
+    written_mask = cv2.imread(os.path.join(output_dir, index[3]['mask_liver']),
+                              cv2.IMREAD_UNCHANGED)
+    assert np.array_equal(written_mask, mask)
+    written_labels = cv2.imread(os.path.join(output_dir, index[3]['labels']),
+                                cv2.IMREAD_UNCHANGED)
+    assert np.array_equal(written_labels, labels)
+
+
+def test_write_jpg(tmpdir):
+    output_dir = str(tmpdir)
+    images = np.zeros((3, 20, 30, 3), dtype=np.uint8)
+    poses = np.tile(np.eye(4), (3, 1, 1))
+
+    with dw.DatasetWriter(output_dir, image_format='jpg') as writer:
+        assert writer.write_batch(images, poses=poses) == [0, 1, 2]
+        with pytest.raises(ValueError):
+            writer.write_batch(images, poses=poses[:2])
+
+    index = _read_index(output_dir)
+    assert len(index) == 3
+    assert index[2]['image'].endswith('.jpg')
+    assert os.path.exists(os.path.join(output_dir, index[2]['image']))
+
+
+def test_write_npy_shards(tmpdir):
+    output_dir = str(tmpdir)
+    mask = np.zeros((20, 30), dtype=np.uint8)
+
+    with dw.DatasetWriter(output_dir, image_format='npy',
+                          shard_size=4) as writer:
+        for i in range(10):
+            image = np.ones((20, 30, 3), dtype=np.uint8) * i
+            writer.write(image, masks={'liver': mask})
+
+    index = _read_index(output_dir)
+    assert len(index) == 10
+    assert index[9]['shard'] == 'shard_00002.npz'
+    assert index[9]['offset'] == 1
+
+    with np.load(os.path.join(output_dir, index[5]['shard'])) as shard:
+        assert shard['image'].shape == (4, 20, 30, 3)
+        assert shard['mask_liver'].shape == (4, 20, 30)
+        assert shard['image'][index[5]['offset'], 0, 0, 0] == 5
+
+    with np.load(os.path.join(output_dir, 'shard_00002.npz')) as shard:
+        assert shard['image'].shape[0] == 2
+
+
+def test_npy_samples_need_same_arrays(tmpdir):
+    image = np.zeros((20, 30, 3), dtype=np.uint8)
+    mask = np.zeros((20, 30), dtype=np.uint8)
+
+    with dw.DatasetWriter(str(tmpdir), image_format='npy') as writer:
+        writer.write(image, masks={'liver': mask})
+        with pytest.raises(ValueError):
+            writer.write(image)
+        with pytest.raises(ValueError):
+            writer.write(image, masks={'liver': mask}, labels=mask)
+        assert writer.write(image, masks={'liver': mask}) == 1
+
+
+def test_write_after_close(tmpdir):
+    image = np.zeros((20, 30, 3), dtype=np.uint8)
+    writer = dw.DatasetWriter(str(tmpdir))
+    writer.close()
+    with pytest.raises(ValueError):
+        writer.write(image)
+
+
+def test_rewrite_replaces_index(tmpdir):
+    output_dir = str(tmpdir)
+    images = np.zeros((3, 20, 30, 3), dtype=np.uint8)
+
+    with dw.DatasetWriter(output_dir) as writer:
+        writer.write_batch(images)
+
+    images[1] = 255
+    with dw.DatasetWriter(output_dir) as writer:
+        writer.write_batch(images[:2])
+
+    index = _read_index(output_dir)
+    assert [entry['index'] for entry in index] == [0, 1]
+    written = cv2.imread(os.path.join(output_dir, index[1]['image']))
+    assert np.all(written == 255)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import numpy as np
+import vtk
+import sksurgeryvtk.utils.matrix_utils as mu
+import sksurgeryvtk.utils.lus_pose_sampler as ps
+
+
+def _two_triangles():
+    # Triangle 0 has area 0.5, triangle 1 has area 1.5.
+    points = np.array([[0, 0, 0],
+                       [1, 0, 0],
+                       [0, 1, 0],
+                       [10, 0, 0],
+                       [13, 0, 0],
+                       [10, 1, 0]], dtype=float)
+    triangles = np.array([[0, 1, 2], [3, 4, 5]])
+    return points, triangles
+
+
+def _sampler(**kwargs):
+    points, triangles = _two_triangles()
+    intrinsics = np.array([[500, 0, 320], [0, 500, 240], [0, 0, 1]])
+    reference_l2c = np.eye(4)
+    reference_l2c[2, 3] = 100
+    return ps.LUSPoseSampler(points, triangles, intrinsics, (640, 480),
+                             reference_l2c, np.eye(4), seed=1, **kwargs)
+
+
+def test_triangles_from_polydata():
+    sphere = vtk.vtkSphereSource()
+    sphere.Update()
+    triangles = ps.get_triangles_as_numpy(sphere.GetOutput())
+    assert triangles.shape == (sphere.GetOutput().GetNumberOfPolys(), 3)
+
+
+def test_sampling_is_area_weighted():
+    points, triangles = _two_triangles()
+    samples = ps.sample_surface_points(points, triangles, 20000,
+                                       np.random.RandomState(0))
+    assert samples.shape == (20000, 3)
+    in_second = np.count_nonzero(samples[:, 0] >= 10) / 20000
+    assert 0.72 < in_second < 0.78
+    first = samples[samples[:, 0] < 10]
+    assert np.all(first[:, 0] + first[:, 1] <= 1 + 1e-9)
+
+
+def test_compute_poses_matches_scalar():
+    sampler = _sampler()
+    anatomy = np.array([[10, 20, 30, 1, 2, 3]], dtype=float)
+    probe = np.array([[5, -5, 15, 4, 5, 6]], dtype=float)
+    location = np.array([[0.2, 0.3, 0]])
+
+    l2c, p2c = sampler.compute_poses(anatomy, probe, location)
+
+    # Same sequence of operations as VTKLUSSimulator.compute_pose.
+    expected_l2c = sampler.reference_l2c \
+        @ mu.create_matrix_from_list([10, 20, 30, 0, 0, 0])
+    expected_l2c[0:3, 3] += [1, 2, 3]
+    ref_p2c = np.eye(4)
+    ref_p2c[0:3, 3] = (sampler.reference_l2c @ [0.2, 0.3, 0, 1])[0:3]
+    expected_p2c = expected_l2c @ np.linalg.inv(sampler.reference_l2c) \
+        @ ref_p2c @ mu.create_matrix_from_list(probe[0])
+
+    assert np.allclose(l2c[0], expected_l2c)
+    assert np.allclose(p2c[0], expected_p2c)
+
+
+def test_sample_rejects_out_of_view():
+    anatomy_range = [[0, 0]] * 3 + [[-200, 200], [-200, 200], [-50, 50]]
+    sampler = _sampler(anatomy_range=anatomy_range, margin=10)
+    anatomy, probe, angles, locations = sampler.sample(50)
+    assert anatomy.shape == (50, 6)
+    assert probe.shape == (50, 6)
+    assert angles.shape == (50,)
+    assert locations.shape == (50, 3)
+
+    l2c, p2c = sampler.compute_poses(anatomy, probe, locations)
+    assert np.all(sampler.is_valid(l2c, p2c, locations))
+
+    # Probe is at the surface location, so projects to same place.
+    depth = p2c[:, 2, 3]
+    pixel_x = 500 * p2c[:, 0, 3] / depth + 320
+    assert np.all(pixel_x >= 10)
+    assert np.all(pixel_x < 630)
+
+
+def test_sample_fails_if_nothing_visible():
+    sampler = _sampler(anatomy_range=[[0, 0]] * 5 + [[-500, -400]])
+    with pytest.raises(RuntimeError):
+        sampler.sample(10, max_batches=2)
@@ -76,3 +76,67 @@ def test_numpy_rotation_matches_vtk():
     vtk_matrix = mu.create_numpy_matrix_from_vtk(vtk_matrix)
     assert np.allclose(numpy, vtk_matrix)
 
+
+
+def test_batched_matrices_match_list():
+
+    np.random.seed(0)
+    params = np.zeros((20, 6))
+    params[:, 0:3] = np.random.uniform(-180, 180, (20, 3))
+    params[:, 3:6] = np.random.uniform(-100, 100, (20, 3))
+
+    matrices = mu.create_matrices_from_array(params)
+    assert matrices.shape == (20, 4, 4)
+    for i in range(20):
+        assert np.allclose(matrices[i], mu.create_matrix_from_list(params[i]))
+
+    radians = np.copy(params)
+    radians[:, 0:3] = np.deg2rad(radians[:, 0:3])
+    matrices = mu.create_matrices_from_array(radians, is_in_radians=True)
+    for i in range(20):
+        assert np.allclose(matrices[i],
+                           mu.create_matrix_from_list(radians[i],
+                                                      is_in_radians=True))
+
+
+def test_batched_matrices_from_strings():
+
+    strings = ["10,45,20,1,2,3", "0,0,90,0,0,0"]
+    matrices = mu.create_matrices_from_strings(strings)
+    assert matrices.shape == (2, 4, 4)
+    for i, string in enumerate(strings):
+        assert np.allclose(matrices[i], mu.create_matrix_from_string(string))
+
+
+def test_batched_matrices_invalid():
+
+    with pytest.raises(ValueError):
+        _ = mu.create_matrices_from_array(np.zeros((3, 5)))
+
+    with pytest.raises(ValueError):
+        _ = mu.create_matrices_from_array(np.zeros(6))
+
+    with pytest.raises(ValueError):
+        _ = mu.create_matrices_from_strings(["1,2,3"])
+
+
+def test_copy_in_place():
+
+    numpy_array = np.random.random((4, 4))
+    vtk_matrix = vtk.vtkMatrix4x4()
+    result = mu.copy_numpy_to_vtk_matrix(numpy_array, vtk_matrix)
+    assert result is vtk_matrix
+    for i in range(4):
+        for j in range(4):
+            assert np.isclose(vtk_matrix.GetElement(i, j), numpy_array[i, j])
+
+    output = np.zeros((4, 4))
+    result = mu.copy_vtk_matrix_to_numpy(vtk_matrix, output)
+    assert result is output
+    assert np.allclose(output, numpy_array)
+
+    with pytest.raises(TypeError):
+        mu.copy_numpy_to_vtk_matrix(numpy_array, "banana")
+
+    with pytest.raises(ValueError):
+        mu.copy_vtk_matrix_to_numpy(vtk_matrix, np.zeros((3, 3)))
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+import time
+import pytest
+import numpy as np
+import sksurgeryvtk.utils.tracker_poller as tp
+
+
+class CountingTracker:
+    """ Returns a pose translated by the number of calls so far. """
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    def get_frame(self):
+        if self.fail:
+            raise IOError('Tracker disconnected')
+        self.calls += 1
+        matrix = np.eye(4)
+        matrix[0:3, 3] = self.calls
+        return ['tool'], [time.time()], [self.calls], [matrix], [0.0]
+
+
+def wait_for_frames(poller, number_of_frames):
+    for _ in range(1000):
+        if poller.number_of_frames >= number_of_frames \
+                or poller.error is not None:
+            return
+        time.sleep(0.005)
+
+
+def test_invalid_poll_interval():
+    with pytest.raises(ValueError):
+        tp.TrackerPoller(CountingTracker(), poll_interval=-1)
+
+
+def test_poller_publishes_latest_pose():
+    tracker = CountingTracker()
+    poller = tp.TrackerPoller(tracker)
+    assert poller.get_latest() is None
+
+    poller.start()
+    wait_for_frames(poller, 3)
+    poller.stop()
+
+    sequence, matrix, acquired_time = poller.get_latest()
+    assert sequence == poller.number_of_frames
+    assert sequence >= 3
+    assert matrix[0, 3] == tracker.calls
+    assert acquired_time <= time.perf_counter()
+
+
+def test_poller_reports_tracker_error():
+    poller = tp.TrackerPoller(CountingTracker(fail=True))
+    poller.start()
+    wait_for_frames(poller, 1)
+    poller.stop()
+
+    with pytest.raises(RuntimeError):
+        poller.get_latest()
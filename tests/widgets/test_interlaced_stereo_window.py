@@ -1,11 +1,15 @@
 # -*- coding: utf-8 -*-
 
+import pytest
 import numpy as np
+from PySide2.QtGui import QPaintEvent
 import cv2
 import six
 from sksurgeryvtk.models import vtk_point_model
 import sksurgeryvtk.camera.vtk_camera_model as cam
 import sksurgeryvtk.utils.projection_utils as pu
+import sksurgeryvtk.widgets.vtk_interlaced_stereo_window as sw
+from sksurgeryvtk.widgets.vtk_interlaced_stereo_window import VTKStereoInterlacedWindow
 
 
 def test_stereo_overlay_window(vtk_interlaced_stereo_window):
@@ -95,4 +99,137 @@ def test_stereo_overlay_window(vtk_interlaced_stereo_window):
     assert rms_opencv < 1
 
     widget.save_scene_to_file('tests/output/test_interlaced_stereo_window.png')
-    #app.exec_()
\ No newline at end of file
+    #app.exec_()
+
+def test_lean_stereo_window(setup_vtk_offscreen):
+
+    _, _, app = setup_vtk_offscreen
+
+    widget = VTKStereoInterlacedWindow(lean=True)
+    assert widget.left_widget is None
+    assert widget.interlaced_widget is None
+
+    left_image = np.zeros((100, 200, 3), dtype=np.uint8)
+    left_image[:, :, 2] = 255
+    right_image = np.zeros((100, 200, 3), dtype=np.uint8)
+    right_image[:, :, 1] = 255
+    widget.set_video_images(left_image, right_image)
+    assert widget.stereo_overlay.tile_size == (200, 100)
+
+    widget.set_current_viewer_index(0)
+    widget.render()
+    assert widget.displayed_image.shape == (100, 200, 3)
+    assert widget.displayed_image[50, 100, 0] == 255  # BGR red is RGB red
+
+    widget.set_view_to_interlaced()
+    widget.render()
+    assert widget.displayed_image.shape == (100, 200, 3)
+    assert widget.displayed_image[0, 100, 0] == 255
+    assert widget.displayed_image[1, 100, 1] == 255
+
+    widget.set_view_to_stacked()
+    widget.render()
+    assert widget.displayed_image[25, 100, 0] == 255
+    assert widget.displayed_image[75, 100, 1] == 255
+
+    widget.save_scene_to_file('tests/output/test_lean_stereo_window.png')
+
+
+def test_lean_stereo_window_renders_on_change(setup_vtk_offscreen):
+
+    widget = VTKStereoInterlacedWindow(lean=True)
+    renders = []
+    widget.stereo_overlay.GetRenderWindow().AddObserver(
+        'EndEvent', lambda obj, event: renders.append(event))
+
+    left_image = np.zeros((100, 200, 3), dtype=np.uint8)
+    right_image = np.ones((100, 200, 3), dtype=np.uint8)
+    widget.set_video_images(left_image, right_image)
+    assert widget.displayed_image.shape == (100, 200, 3)
+    rendered = len(renders)
+    assert rendered > 0
+
+    # Painting shows the composed image, without rendering again.
+    widget.paintEvent(QPaintEvent(widget.rect()))
+    assert len(renders) == rendered
+
+    widget.set_camera_poses(np.eye(4))
+    assert len(renders) > rendered
+
+
+def test_only_current_view_updated(vtk_interlaced_stereo_window):
+
+    widget, _, _, app = vtk_interlaced_stereo_window
+
+    left_image = np.zeros((100, 200, 3), dtype=np.uint8)
+    right_image = np.ones((100, 200, 3), dtype=np.uint8)
+
+    widget.set_current_viewer_index(0)
+    widget.set_video_images(left_image, right_image)
+    widget.render()
+    assert widget.interlaced.shape == (1, 1)
+
+    widget.set_view_to_interlaced()
+    widget.render()
+    assert widget.interlaced.shape == widget.left_image.shape
+    buffer = widget.interlaced
+    widget.render()
+    assert widget.interlaced is buffer
+
+    # Render is ignored while already rendering.
+    widget.is_rendering = True
+    widget.interlaced = np.eye(1)
+    widget.render()
+    assert widget.interlaced.shape == (1, 1)
+    widget.is_rendering = False
+
+    # New images are composed once, on the next paint, not on every paint.
+    widget.set_video_images(left_image, right_image)
+    assert widget.is_dirty
+    widget.paintEvent(QPaintEvent(widget.rect()))
+    assert not widget.is_dirty
+    assert widget.interlaced.shape == widget.left_image.shape
+    widget.interlaced = np.eye(1)
+    widget.paintEvent(QPaintEvent(widget.rect()))
+    assert widget.interlaced.shape == (1, 1)
+
+
+def test_compose_to_buffer():
+
+    left = np.zeros((8, 4, 3), dtype=np.uint8)
+    left[:] = np.arange(8).reshape(8, 1, 1)
+    right = left + 100
+    output = np.zeros_like(left)
+
+    result = sw.interlace_to_buffer(left, right, output)
+    assert result is output
+    assert np.array_equal(output[0::2, 0, 0], [0, 2, 4, 6])
+    assert np.array_equal(output[1::2, 0, 0], [101, 103, 105, 107])
+
+    result = sw.stack_to_buffer(left, right, output)
+    assert result is output
+    assert np.array_equal(output[:, 0, 0], [0, 2, 4, 6, 101, 103, 105, 107])
+
+
+def test_compose_to_buffer_any_height():
+
+    # 6 rows is not a multiple of 4, and 7 rows is odd.
+    for height in [6, 7]:
+        left = np.zeros((height, 4, 3), dtype=np.uint8)
+        left[:] = np.arange(height).reshape(height, 1, 1)
+        right = left + 100
+        output = np.zeros_like(left)
+
+        sw.interlace_to_buffer(left, right, output)
+        assert np.array_equal(output[0::2, 0, 0], left[0::2, 0, 0])
+        assert np.array_equal(output[1::2, 0, 0], right[1::2, 0, 0])
+
+        sw.stack_to_buffer(left, right, output)
+        split = (height + 1) // 2
+        assert np.array_equal(output[:split, 0, 0], left[0::2, 0, 0])
+        assert np.array_equal(output[split:, 0, 0], right[1::2, 0, 0])
+
+    assert np.array_equal(output[:, 0, 0], [0, 2, 4, 6, 101, 103, 105])
+
+    with pytest.raises(ValueError):
+        sw.interlace_to_buffer(left, right[:6], output)
@@ -2,6 +2,8 @@
 
 import pytest
 import cv2
+import numpy as np
+import vtk
 import sksurgeryvtk.widgets.vtk_lus_simulator as lus
 
 
@@ -67,3 +69,83 @@ def test_basic_rendering_generator(setup_vtk_err):
                     )
 
 
+
+    # Pose only path should give the same matrices, without rendering.
+    c_l2c, c_p2c, handle = generator.compute_pose([20, 30, 40, 5, 10, 15],
+                                                  [2, 3, 4, 5, 6, 7],
+                                                  -20,
+                                                  position)
+    assert np.allclose(c_l2c, l2c)
+    assert np.allclose(c_p2c, p2c)
+    assert handle.shape == (4, 4)
+
+
+def _vtk_pose(params):
+    """
+    Baseline [rx, ry, rz, tx, ty, tz] to 4x4, built by vtkTransform,
+    which rotates as for vtkProp3D, i.e. M = T * Rz * Rx * Ry.
+    """
+    transform = vtk.vtkTransform()
+    transform.Translate(params[3], params[4], params[5])
+    transform.RotateZ(params[2])
+    transform.RotateX(params[0])
+    transform.RotateY(params[1])
+    matrix = transform.GetMatrix()
+    return np.array([[matrix.GetElement(i, j) for j in range(4)]
+                     for i in range(4)])
+
+
+def test_compute_pose_matches_baseline(setup_vtk_err):
+
+    _, _ = setup_vtk_err
+
+    reference_l2c_file = "tests/data/lus/spp_liver2camera.txt"
+    reference_p2c_file = "tests/data/lus/spp_probe2camera.txt"
+    generator = lus.VTKLUSSimulator(
+        "tests/data/lus/surface_model_liver_probe_test.json",
+        "tests/data/rendering/background-960-x-540-black.png",
+        "tests/data/liver/calib.left.intrinsics.halved.txt",
+        reference_l2c_file,
+        reference_p2c_file)
+
+    reference_l2c = np.loadtxt(reference_l2c_file)
+    reference_p2c = np.loadtxt(reference_p2c_file)
+    anatomy_params = [20, 30, 40, 5, 10, 15]
+    probe_params = [2, 3, 4, 5, 6, 7]
+    angle = -20
+    location = np.array([10.0, -80.0, -28.0])
+    handle_offset = [0.007877540588378196,
+                     36.24640712738037,
+                     -3.8626091003417997]
+
+    # Baseline, computed step by step, as the original set_pose() did.
+    expected_l2c = _vtk_pose([0, 0, 0] + anatomy_params[3:6]) \
+        @ reference_l2c @ _vtk_pose(anatomy_params[0:3] + [0, 0, 0])
+    moved_p2c = np.copy(reference_p2c)
+    moved_p2c[0:3, 3] = (reference_l2c @ np.append(location, 1))[0:3]
+    expected_p2c = expected_l2c @ np.linalg.inv(reference_l2c) \
+        @ moved_p2c @ _vtk_pose(probe_params)
+    expected_handle = expected_p2c @ _vtk_pose([0, 0, 0] + handle_offset) \
+        @ _vtk_pose([angle, 0, 0, 0, 0, 0])
+
+    l2c, p2c, handle = generator.compute_pose(anatomy_params,
+                                              probe_params,
+                                              angle,
+                                              location)
+    assert np.allclose(l2c, expected_l2c)
+    assert np.allclose(p2c, expected_p2c)
+    assert np.allclose(handle, expected_handle)
+
+    # In probe coordinates, the handle is offset, then rotated about x.
+    handle_in_probe = np.linalg.inv(p2c) @ handle
+    cos_a = np.cos(np.radians(angle))
+    sin_a = np.sin(np.radians(angle))
+    assert np.allclose(handle_in_probe[0:3, 3], handle_offset)
+    assert np.allclose(handle_in_probe[0:3, 0:3],
+                       [[1, 0, 0], [0, cos_a, -sin_a], [0, sin_a, cos_a]])
+
+    # Picking a location must not move the reference probe pose.
+    assert np.allclose(generator.reference_p2c, reference_p2c)
+    l2c, p2c, _ = generator.compute_pose([0] * 6, [0] * 6, 0)
+    assert np.allclose(l2c, reference_l2c)
+    assert np.allclose(p2c, reference_p2c)
@@ -131,3 +131,113 @@ def test_mask_generator(setup_vtk_offscreen):
         ssd = np.sum(sqdiff)
         assert ssd < 240000
 
+
+
+def test_render_batch(setup_vtk_offscreen):
+
+    _, _, _ = setup_vtk_offscreen
+
+    generator = rg.VTKRenderingGenerator(
+        "tests/data/config/surface_model_two_livers_no_shading.json",
+        "tests/data/rendering/background-960-x-540.png",
+        "tests/data/liver/calib.left.intrinsics.halved.txt",
+        [0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0],
+        zbuffer=False)
+    generator.setFixedSize(960, 540)
+    generator.show()
+
+    poses = np.zeros((3, 6))
+    poses[:, 5] = [-200, -250, -300]
+
+    renders = []
+    generator.overlay.GetRenderWindow().AddObserver(
+        'EndEvent', lambda obj, event: renders.append(event))
+
+    # One render per pose.
+    images = generator.render_batch(poses)
+    assert images.shape[0] == 3
+    assert images.dtype == np.uint8
+    assert len(renders) == 3
+
+    # Same poses as 4x4, into a pre-allocated array, with masks.
+    matrices = np.tile(np.eye(4), (3, 1, 1))
+    matrices[:, 2, 3] = poses[:, 5]
+    output = np.zeros_like(images)
+    images_4x4, masks = generator.render_batch(matrices,
+                                               masks=True,
+                                               output=output)
+    assert images_4x4 is output
+    assert np.allclose(images, images_4x4)
+
+    # Plus one label render per pose, for the masks.
+    assert len(renders) == 3 + 6
+    assert set(masks.keys()) == {'liver50', 'liver127'}
+    assert masks['liver50'].shape == images.shape[:3]
+
+    with pytest.raises(ValueError):
+        generator.render_batch(np.zeros((3, 5)))
+
+    with pytest.raises(ValueError):
+        generator.render_batch(poses, pose_type='banana')
+
+
+def test_label_image(setup_vtk_offscreen):
+
+    _, _, _ = setup_vtk_offscreen
+
+    generator = rg.VTKRenderingGenerator(
+        "tests/data/config/surface_model_two_livers_no_shading.json",
+        "tests/data/rendering/background-960-x-540.png",
+        "tests/data/liver/calib.left.intrinsics.halved.txt",
+        [0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0],
+        zbuffer=False)
+    generator.setFixedSize(960, 540)
+    generator.show()
+
+    points = generator.model_loader.get_surface_model('liver50')\
+        .get_points_as_numpy()
+    mean = np.mean(points, axis=0)
+    generator.set_model_to_worlds(
+        {'liver50': [0, 0, 0, -mean[0] - 50, -mean[1] - 10, -mean[2] + 210],
+         'liver127': [0, 0, 0, -mean[0] + 50, -mean[1] + 10, -mean[2] + 200]})
+
+    ids = generator.get_label_ids()
+    assert sorted(ids.values()) == [1, 2]
+
+    rgb, labels, depth = generator.get_image_labels_and_depth()
+    assert labels.dtype == np.uint8
+    assert labels.shape == rgb.shape[:2]
+    assert depth.shape == rgb.shape[:2]
+    assert set(np.unique(labels)).issubset({0, 1, 2})
+
+    # The camera is at the origin, looking along +z, so the depth of each
+    # pixel of liver50 lies within the z range of its translated points.
+    assert np.count_nonzero(labels == 1) > 0
+    z_values = points[:, 2] - mean[2] + 210
+    liver_depth = depth[labels == 1]
+    assert np.all(liver_depth > np.min(z_values) - 0.5)
+    assert np.all(liver_depth < np.max(z_values) + 0.5)
+    assert np.all(depth[labels == 0] == 0)
+
+    # The depth is read from the label render, not rendered again.
+    renders = []
+    generator.overlay.GetRenderWindow().AddObserver(
+        'EndEvent', lambda obj, event: renders.append(event))
+    generator.get_image()
+    generator.get_label_image()
+    separate_renders = len(renders)
+    generator.get_image_labels_and_depth()
+    assert len(renders) == 2 * separate_renders
+
+    # Masks are derived from the labels.
+    masks = generator.get_masks()
+    for name, label in ids.items():
+        assert np.array_equal(masks[name] > 0, labels == label)
+
+    # Model colours are restored after the label pass.
+    colour = generator.model_loader.get_surface_model('liver50').get_colour()
+    _ = generator.get_label_image()
+    assert generator.model_loader.get_surface_model('liver50').get_colour() \
+        == colour
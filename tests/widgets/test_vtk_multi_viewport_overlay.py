@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import numpy as np
+import sksurgeryvtk.models.vtk_surface_model as sm
+import sksurgeryvtk.widgets.vtk_multi_viewport_overlay as mvo
+
+
+def test_invalid_viewport_arguments():
+
+    with pytest.raises(ValueError):
+        mvo.VTKMultiViewportOverlay(0)
+
+    with pytest.raises(ValueError):
+        mvo.VTKMultiViewportOverlay(3, grid=(1, 2))
+
+
+def test_tiled_viewports_share_actors():
+
+    overlay = mvo.VTKMultiViewportOverlay(3, tile_size=(160, 120))
+    assert overlay.get_number_of_viewports() == 3
+    assert overlay.GetRenderWindow().GetSize() == (480, 120)
+
+    liver = sm.VTKSurfaceModel('tests/data/models/Liver/liver.vtk',
+                               (1.0, 1.0, 1.0))
+    overlay.add_vtk_models([liver])
+
+    for i in range(3):
+        renderer = overlay.get_viewport(i).foreground_renderer
+        assert renderer.GetActors().GetNumberOfItems() == 1
+        assert overlay.get_viewport(i).tile == (i * 160, 0, 160, 120)
+
+
+def test_viewport_images_from_single_readback():
+
+    overlay = mvo.VTKMultiViewportOverlay(2, tile_size=(160, 120),
+                                          grid=(2, 1))
+    intrinsics = np.loadtxt('tests/data/calibration/calib.left.intrinsic.txt')
+
+    # BGR backgrounds, viewport 0 is blue, viewport 1 is green.
+    for i in range(2):
+        image = np.zeros((120, 160, 3), dtype=np.uint8)
+        image[:, :, i] = 255
+        overlay.set_video_image(i, image)
+        overlay.set_camera_matrix(i, intrinsics)
+        overlay.set_camera_pose(i, np.eye(4))
+
+    views = overlay.get_viewport_images()
+    assert len(views) == 2
+    for view in views:
+        assert view.shape == (120, 160, 3)
+        assert not np.shares_memory(view, overlay.output)
+
+    # Viewport 0 is the top row of the window, so the top of the read back.
+    assert np.array_equal(overlay.output[60, 80], [0, 0, 255])
+    assert np.array_equal(overlay.output[180, 80], [0, 255, 0])
+
+    # Each tile is the RGB background of its own viewport.
+    expected_colours = [[0, 0, 255], [0, 255, 0]]
+    for view, colour in zip(views, expected_colours):
+        interior = view[10:-10, 10:-10].reshape(-1, 3)
+        assert np.all(interior == colour)
+
+    # The tiles are copies, so aren't changed by the next render.
+    image = np.zeros((120, 160, 3), dtype=np.uint8)
+    image[:, :, 2] = 255
+    overlay.set_video_image(0, image)
+    new_views = overlay.get_viewport_images()
+    assert np.array_equal(views[0][60, 80], [0, 0, 255])
+    assert np.array_equal(new_views[0][60, 80], [255, 0, 0])
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import numpy as np
+import vtk
+import sksurgeryvtk.models.vtk_surface_model as sm
+import sksurgeryvtk.widgets.vtk_offscreen_overlay as oo
+
+
+def test_offscreen_overlay_layers():
+
+    overlay = oo.VTKOffscreenOverlay(320, 240)
+
+    assert overlay.width() == 320
+    assert overlay.height() == 240
+    assert overlay.GetRenderWindow().GetOffScreenRendering()
+    assert overlay.GetRenderWindow().GetNumberOfLayers() == 3
+    assert overlay.background_renderer.GetLayer() == 0
+    assert overlay.foreground_renderer.GetLayer() == 1
+    assert overlay.generic_overlay_renderer.GetLayer() == 2
+
+
+def test_offscreen_overlay_invalid_size():
+
+    with pytest.raises(ValueError):
+        oo.VTKOffscreenOverlay(0, 240)
+
+
+def test_offscreen_overlay_render_to_numpy():
+
+    overlay = oo.VTKOffscreenOverlay(320, 240)
+    image = np.zeros((240, 320, 3), dtype=np.uint8)
+    image[:, :, 2] = 255
+    overlay.set_video_image(image)
+
+    liver = sm.VTKSurfaceModel('tests/data/models/Liver/liver.vtk',
+                               (1.0, 1.0, 1.0))
+    overlay.add_vtk_models([liver])
+    overlay.Render()
+
+    output = overlay.convert_scene_to_numpy_array()
+    assert output.shape == (240, 320, 3)
+
+    overlay.resize(160, 120)
+    output = overlay.convert_scene_to_numpy_array()
+    assert output.shape == (120, 160, 3)
+
+
+def test_camera_setup_is_cached():
+
+    overlay = oo.VTKOffscreenOverlay(320, 240)
+    image = np.zeros((240, 320, 3), dtype=np.uint8)
+    overlay.set_video_image(image)
+
+    intrinsics = np.loadtxt('tests/data/calibration/calib.left.intrinsic.txt')
+    overlay.set_camera_matrix(intrinsics)
+    projection_count = overlay.projection_update_count
+    video_count = overlay.video_camera_update_count
+
+    # Same size, so nothing should be recomputed.
+    overlay.resize(320, 240)
+    overlay.set_camera_matrix(intrinsics)
+    assert overlay.projection_update_count == projection_count
+    assert overlay.video_camera_update_count == video_count
+
+    overlay.resize(640, 480)
+    assert overlay.projection_update_count == projection_count + 1
+    assert overlay.video_camera_update_count == video_count + 1
+
+    overlay.reset_camera_cache()
+    overlay.resize(640, 480)
+    assert overlay.projection_update_count == projection_count + 2
+
+
+def test_adding_model_keeps_calibrated_projection():
+
+    overlay = oo.VTKOffscreenOverlay(320, 240, clipping_range=(10, 500))
+    image = np.zeros((240, 320, 3), dtype=np.uint8)
+    overlay.set_video_image(image)
+
+    intrinsics = np.loadtxt('tests/data/calibration/calib.left.intrinsic.txt')
+    overlay.set_camera_matrix(intrinsics)
+    camera = overlay.get_foreground_camera()
+    view_angle = camera.GetViewAngle()
+    window_center = camera.GetWindowCenter()
+    projection_count = overlay.projection_update_count
+
+    # Resetting the camera to fit the model changes the clipping range,
+    # so the calibrated projection should be re-applied.
+    liver = sm.VTKSurfaceModel('tests/data/models/Liver/liver.vtk',
+                               (1.0, 1.0, 1.0))
+    overlay.add_vtk_models([liver])
+    assert overlay.projection_update_count == projection_count + 1
+    assert np.allclose(camera.GetClippingRange(), (10, 500))
+    assert np.isclose(camera.GetViewAngle(), view_angle)
+    assert np.allclose(camera.GetWindowCenter(), window_center)
+
+    # Restoring a camera state also invalidates the cached setup.
+    state = overlay.get_camera_state()
+    overlay.set_camera_state(state)
+    overlay.resize(320, 240)
+    assert overlay.projection_update_count == projection_count + 2
+
+    overlay.set_camera_state_array(overlay.get_camera_state_array())
+    overlay.resize(320, 240)
+    assert overlay.projection_update_count == projection_count + 3
+
+
+def test_offscreen_overlay_native_stereo():
+
+    overlay = oo.VTKOffscreenOverlay(320, 240)
+    left_image = np.zeros((240, 320, 3), dtype=np.uint8)
+    left_image[:, :, 2] = 255
+    right_image = np.zeros((240, 320, 3), dtype=np.uint8)
+    right_image[:, :, 0] = 255
+    overlay.set_stereo_video_images(left_image, right_image)
+
+    intrinsics = np.array([[400, 0, 160], [0, 400, 120], [0, 0, 1]])
+    overlay.set_stereo_camera_matrices(intrinsics, intrinsics)
+    left_to_right = np.eye(4)
+    left_to_right[0, 3] = -5
+    overlay.set_stereo_left_to_right(left_to_right)
+    overlay.set_camera_pose(np.eye(4))
+
+    with pytest.raises(ValueError):
+        overlay.set_stereo_mode('holographic')
+
+    overlay.set_stereo_mode('red_blue')
+    assert overlay.get_stereo_mode() == 'red_blue'
+    assert overlay.GetRenderWindow().GetStereoRender()
+    overlay.Render()
+
+    # Camera is returned to the left eye after rendering.
+    position = overlay.get_foreground_camera().GetPosition()
+    assert np.allclose(position, [0, 0, 0])
+
+    output = overlay.convert_scene_to_numpy_array()
+    assert output.shape == (240, 320, 3)
+
+    overlay.set_stereo_mode('off')
+    assert not overlay.GetRenderWindow().GetStereoRender()
+
+
+def test_native_stereo_renders_each_eye():
+
+    overlay = oo.VTKOffscreenOverlay(320, 240, reset_camera=False)
+
+    # BGR images, left eye red, right eye blue.
+    left_image = np.zeros((240, 320, 3), dtype=np.uint8)
+    left_image[:, :, 2] = 255
+    right_image = np.zeros((240, 320, 3), dtype=np.uint8)
+    right_image[:, :, 0] = 255
+    overlay.set_stereo_video_images(left_image, right_image)
+
+    intrinsics = np.array([[400, 0, 160], [0, 400, 120], [0, 0, 1]])
+    overlay.set_stereo_camera_matrices(intrinsics, intrinsics)
+    left_to_right = np.eye(4)
+    left_to_right[0, 3] = -10
+    overlay.set_stereo_left_to_right(left_to_right)
+    overlay.set_camera_pose(np.eye(4))
+
+    # Unshaded white sphere, off the optical axis, so the eyes differ.
+    sphere = vtk.vtkSphereSource()
+    sphere.SetCenter(20, 0, 100)
+    sphere.SetRadius(5)
+    sphere.SetThetaResolution(32)
+    sphere.SetPhiResolution(32)
+    mapper = vtk.vtkPolyDataMapper()
+    mapper.SetInputConnection(sphere.GetOutputPort())
+    actor = vtk.vtkActor()
+    actor.SetMapper(mapper)
+    actor.GetProperty().SetColor(1, 1, 1)
+    actor.GetProperty().SetAmbient(1)
+    actor.GetProperty().SetDiffuse(0)
+    actor.GetProperty().SetSpecular(0)
+    overlay.add_vtk_actor(actor)
+
+    # Left eye is drawn in the left half, right eye in the right half.
+    overlay.set_stereo_mode('side_by_side')
+    output = overlay.convert_scene_to_numpy_array()
+    left_half = output[:, :160]
+    right_half = output[:, 160:]
+
+    # Each half has the background of its own eye.
+    assert np.array_equal(left_half[120, 10], [255, 0, 0])
+    assert np.array_equal(right_half[120, 10], [0, 0, 255])
+
+    # The right camera is 10mm to the right, so the sphere appears
+    # further left in the right eye.
+    left_columns = np.nonzero(np.all(left_half > 200, axis=2))[1]
+    right_columns = np.nonzero(np.all(right_half > 200, axis=2))[1]
+    assert left_columns.size > 0
+    assert right_columns.size > 0
+    assert np.mean(right_columns) < np.mean(left_columns) - 5
+
+    # Each eye's projection is only computed once, not per render.
+    assert overlay.stereo_projection_update_count == 2
+    overlay.convert_scene_to_numpy_array()
+    assert overlay.stereo_projection_update_count == 2
+
+    # Switching stereo off shows the left image only.
+    overlay.set_stereo_mode('off')
+    output = overlay.convert_scene_to_numpy_array()
+    assert np.array_equal(output[120, 10], [255, 0, 0])
+    assert np.array_equal(output[120, 310], [255, 0, 0])
@@ -167,3 +167,72 @@ def test_add_models_to_overlay_renderer(vtk_overlay_with_gradient_image):
 
     
 
+
+def test_transparency_modes(setup_vtk_overlay_window):
+
+    widget, _, _, _ = setup_vtk_overlay_window
+
+    assert widget.get_transparency() == 'depth_peeling'
+    assert widget.foreground_renderer.GetMaximumNumberOfPeels() == 100
+
+    widget.set_transparency('off')
+    assert not widget.foreground_renderer.GetUseDepthPeeling()
+
+    widget.set_transparency('depth_peeling', max_peels=8, occlusion_ratio=0)
+    assert widget.foreground_renderer.GetUseDepthPeeling()
+    assert widget.foreground_renderer.GetMaximumNumberOfPeels() == 8
+    assert widget.foreground_renderer.GetOcclusionRatio() == 0
+
+    with pytest.raises(ValueError):
+        widget.set_transparency('banana')
+
+    with pytest.raises(ValueError):
+        widget.set_transparency('depth_peeling', max_peels=0)
+
+
+def test_auto_transparency_follows_opacity(setup_vtk_overlay_window):
+
+    widget, _, _, _ = setup_vtk_overlay_window
+    liver = sm.VTKSurfaceModel('tests/data/models/Liver/liver.vtk',
+                               (1.0, 1.0, 1.0))
+    widget.add_vtk_models([liver])
+
+    widget.set_transparency('auto')
+    assert not widget.foreground_renderer.GetUseDepthPeeling()
+
+    liver.set_opacity(0.5)
+    widget.set_transparency('auto')
+    assert widget.foreground_renderer.GetUseDepthPeeling()
+
+
+def test_adaptive_transparency_settings(setup_vtk_overlay_window):
+
+    widget, _, _, _ = setup_vtk_overlay_window
+
+    with pytest.raises(ValueError):
+        widget.set_adaptive_transparency(-1)
+
+    widget.set_adaptive_transparency(0.02, min_peels=2)
+    assert widget.target_frame_time == 0.02
+    assert widget.min_peels == 2
+
+    widget.set_adaptive_transparency(None)
+    assert widget.target_frame_time is None
+
+
+def test_camera_state_dict_and_array(setup_vtk_overlay_window):
+
+    widget, _, _, _ = setup_vtk_overlay_window
+
+    widget.get_foreground_camera().SetPosition(10, 20, 30)
+    state = widget.get_camera_state()
+    state_array = widget.get_camera_state_array()
+
+    widget.get_foreground_camera().SetPosition(0, 0, 0)
+    widget.set_camera_state(state)
+    assert np.allclose(widget.get_foreground_camera().GetPosition(),
+                       (10, 20, 30))
+
+    widget.get_foreground_camera().SetPosition(0, 0, 0)
+    widget.set_camera_state_array(state_array)
+    assert np.allclose(widget.get_camera_state_array(), state_array)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import numpy as np
+import sksurgeryvtk.widgets.vtk_offscreen_rendering_generator as og
+import sksurgeryvtk.widgets.vtk_render_pool as rp
+
+MODELS = "tests/data/config/surface_model_two_livers_no_shading.json"
+BACKGROUND = "tests/data/rendering/background-960-x-540.png"
+INTRINSICS = "tests/data/liver/calib.left.intrinsics.halved.txt"
+
+
+def test_offscreen_rendering_generator():
+
+    generator = og.VTKOffscreenRenderingGenerator(MODELS,
+                                                  BACKGROUND,
+                                                  INTRINSICS,
+                                                  [0, 0, 0, 0, 0, 0],
+                                                  [0, 0, 0, 0, 0, 0])
+    image = generator.get_image()
+    assert image.shape == (540, 960, 3)
+    assert generator.get_label_image().shape == (540, 960)
+
+
+def test_invalid_pool_arguments():
+
+    with pytest.raises(ValueError):
+        rp.VTKRenderPool(0, MODELS, BACKGROUND, INTRINSICS)
+
+    with pytest.raises(ValueError):
+        rp.VTKRenderPool(1, MODELS, "tests/data/banana.png", INTRINSICS)
+
+
+def test_pool_matches_single_generator():
+
+    poses = np.zeros((5, 6))
+    poses[:, 5] = np.linspace(-300, -200, 5)
+
+    generator = og.VTKOffscreenRenderingGenerator(MODELS,
+                                                  BACKGROUND,
+                                                  INTRINSICS)
+    expected = generator.render_batch(poses)
+
+    with rp.VTKRenderPool(2, MODELS, BACKGROUND, INTRINSICS) as pool:
+        assert pool.get_label_ids() == generator.get_label_ids()
+        images, labels = pool.render(poses, labels=True)
+
+        with pytest.raises(ValueError):
+            pool.render(np.zeros((2, 3)))
+
+    assert images.shape == expected.shape
+    assert labels.shape == expected.shape[:3]
+    assert np.allclose(images, expected)
+
+
+def test_pool_raises_if_worker_dies():
+
+    poses = np.zeros((2, 6))
+    poses[:, 5] = -300
+
+    with rp.VTKRenderPool(1, MODELS, BACKGROUND, INTRINSICS) as pool:
+        pool.workers[0].terminate()
+        pool.workers[0].join()
+
+        with pytest.raises(RuntimeError):
+            pool.render(poses)
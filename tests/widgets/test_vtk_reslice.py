@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 from sksurgeryvtk.widgets import vtk_reslice_widget
 
 def test_slice_viewer(qtbot):
@@ -19,3 +20,186 @@ def test_mouse_scroll_slice_viewer(qtbot):
 
     reslice.update_slice_positions_pixels(1,1,1)
 
+
+def test_lookup_table_shared_between_views(qtbot):
+
+    dicom_path = 'tests/data/dicom/LegoPhantom_10slices'
+    reslice = vtk_reslice_widget.VTKSliceViewer(dicom_path)
+
+    qtbot.addWidget(reslice)
+
+    lut = reslice.x_view.lut
+    assert reslice.y_view.lut is lut
+    assert reslice.z_view.lut is lut
+
+    reslice.set_lookup_table_min_max(-100, 500)
+    assert lut.GetTableRange() == (-100, 500)
+
+    # Same lookup table object is updated, not replaced.
+    reslice.x_view.set_lookup_table_min_max(0, 200)
+    assert reslice.z_view.lut is lut
+    assert lut.GetTableRange() == (0, 200)
+
+def test_reslice_mode(qtbot):
+
+    dicom_path = 'tests/data/dicom/LegoPhantom_10slices'
+    reslice = vtk_reslice_widget.VTKSliceViewer(dicom_path, reslice=True)
+
+    qtbot.addWidget(reslice)
+
+    reslice.update_slice_positions_pixels(1, 1, 1)
+    assert reslice.z_view.get_slice_position() == 1
+
+    # Oblique plane, rotated 45 degrees about x.
+    axes = np.eye(4)
+    axes[1:3, 1:3] = [[np.cos(np.pi / 4), -np.sin(np.pi / 4)],
+                      [np.sin(np.pi / 4), np.cos(np.pi / 4)]]
+    reslice.z_view.set_reslice_axes(axes)
+    assert np.allclose(reslice.z_view.slice_plane.GetNormal(), axes[0:3, 2])
+
+    with pytest.raises(ValueError):
+        reslice.z_view.set_reslice_axes(np.eye(3))
+
+def test_reslice_axes_needs_reslice_mode(qtbot):
+
+    dicom_path = 'tests/data/dicom/LegoPhantom_10slices'
+    reslice = vtk_reslice_widget.VTKSliceViewer(dicom_path)
+
+    qtbot.addWidget(reslice)
+
+    with pytest.raises(ValueError):
+        reslice.z_view.set_reslice_axes(np.eye(4))
+
+def test_fixed_camera_only_renders_changed_views(qtbot):
+
+    dicom_path = 'tests/data/dicom/LegoPhantom_10slices'
+    reslice = vtk_reslice_widget.VTKSliceViewer(dicom_path,
+                                                fixed_camera=True)
+
+    qtbot.addWidget(reslice)
+
+    camera = reslice.z_view.renderer.GetActiveCamera()
+    position = camera.GetPosition()
+
+    reslice.update_slice_positions_pixels(0, 0, 1)
+    assert reslice.views_to_render == [reslice.z_view]
+    assert reslice.render_pending
+
+    # Renders are coalesced, until the next event loop tick.
+    reslice.update_slice_positions_pixels(0, 0, 2)
+    assert reslice.views_to_render == [reslice.z_view]
+
+    reslice.render_changed_views()
+    assert reslice.views_to_render == []
+    assert camera.GetPosition() == position
+
+    assert not reslice.z_view.set_slice_position_pixels(2)
+    assert reslice.z_view.set_slice_position_pixels(3)
+
+def test_streamed_slice_viewer(qtbot):
+
+    dicom_path = 'tests/data/dicom/LegoPhantom_10slices'
+    reslice = vtk_reslice_widget.VTKSliceViewer(dicom_path, stream=True)
+
+    qtbot.addWidget(reslice)
+
+    assert reslice.volume_loader.wait(timeout=30)
+    reslice.update_loaded_volume()
+    assert not reslice.load_timer.isActive()
+
+    reslice.update_slice_positions_pixels(1, 1, 1)
+
+def test_failed_load_stops_timer(qtbot, caplog):
+
+    dicom_path = 'tests/data/dicom/LegoPhantom_10slices'
+    reslice = vtk_reslice_widget.VTKSliceViewer(dicom_path, stream=True)
+
+    qtbot.addWidget(reslice)
+
+    assert reslice.volume_loader.wait(timeout=30)
+    reslice.load_timer.start(100)
+    reslice.volume_loader.error = RuntimeError('disk removed')
+
+    reslice.update_loaded_volume()
+    assert not reslice.load_timer.isActive()
+    assert 'Stopped loading volume' in caplog.text
+
+class StaticTracker:
+    """ Always returns the same pose. """
+    def get_frame(self):
+        matrix = np.eye(4)
+        matrix[0:3, 3] = [1, 1, 1]
+        return ['tool'], [0], [0], [matrix], [0.0]
+
+def test_threaded_tracked_slice_viewer(qtbot):
+
+    dicom_path = 'tests/data/dicom/LegoPhantom_10slices'
+    reslice = vtk_reslice_widget.TrackedSliceViewer(dicom_path,
+                                                    StaticTracker(),
+                                                    threaded=True,
+                                                    movement_threshold=0.5)
+
+    qtbot.addWidget(reslice)
+    assert reslice.get_latency() is None
+
+    reslice.poller.start()
+    qtbot.waitUntil(lambda: reslice.poller.get_latest() is not None)
+
+    reslice.update_position()
+    latency = reslice.get_latency()
+    assert latency is not None and latency >= 0
+    assert np.allclose(reslice.last_position, [1, 1, 1])
+
+    # Same position, within threshold, so slices are not updated again.
+    qtbot.waitUntil(lambda: reslice.poller.get_latest()[0]
+                    != reslice.last_sequence)
+    reslice.update_position()
+    assert reslice.get_latency() == latency
+
+    reslice.stop()
+
+def test_threaded_latency_includes_deferred_render(qtbot):
+
+    dicom_path = 'tests/data/dicom/LegoPhantom_10slices'
+    reslice = vtk_reslice_widget.TrackedSliceViewer(dicom_path,
+                                                    StaticTracker(),
+                                                    fixed_camera=True,
+                                                    threaded=True)
+
+    qtbot.addWidget(reslice)
+    reslice.poller.start()
+    qtbot.waitUntil(lambda: reslice.poller.get_latest() is not None)
+
+    # With a fixed camera, the render is queued, so the latency is only
+    # known once the changed views have been rendered.
+    reslice.update_position()
+    assert reslice.render_pending
+    assert reslice.get_latency() is None
+
+    qtbot.waitUntil(lambda: reslice.get_latency() is not None)
+    assert not reslice.render_pending
+    assert reslice.get_latency() >= 0
+
+    reslice.stop()
+
+def test_level_of_detail_in_3d_view(qtbot):
+
+    dicom_path = 'tests/data/dicom/LegoPhantom_10slices'
+    reslice = vtk_reslice_widget.MouseWheelSliceViewer(dicom_path,
+                                                       lod_factor=2)
+
+    qtbot.addWidget(reslice)
+
+    reslice.update_slice_positions_pixels(3, 3, 3)
+    assert reslice.idle_timer.isActive()
+    for full, low in zip(reslice.full_resolution_actors,
+                         reslice.low_resolution_actors):
+        assert not full.GetVisibility()
+        assert low.GetVisibility()
+    assert reslice.low_resolution_actors[2].GetDisplayExtent()[4] == 1
+
+    qtbot.waitUntil(lambda: not reslice.idle_timer.isActive())
+    for full, low in zip(reslice.full_resolution_actors,
+                         reslice.low_resolution_actors):
+        assert full.GetVisibility()
+        assert not low.GetVisibility()